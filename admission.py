@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from blender_jobs import PROFILES
+
+# Admission control for Blender jobs. Each job gets a cost estimate (seconds,
+# cores, memory) read from its script and profile, and only starts once its
+# cores and memory fit under the machine-wide caps. Waiting jobs are ordered
+# for fairness: the session holding the fewest cores and with the least recent
+# work goes first, and within that, small jobs before large ones. Jobs that
+# would wait longer than MAX_WAIT_SECONDS are rejected with an ETA instead of
+# being queued.
+MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "300"))
+MEMORY_FRACTION = 0.75
+STARVATION_SECONDS = 60
+FAIR_SHARE_WINDOW = 600
+
+# Blender startup plus the profile and optimizer passes
+BASE_SECONDS = {"preview": 4.0, "full": 10.0}
+BASE_MEMORY = 400 * 2**20
+OBJECT_MEMORY = 256 * 2**10
+
+CREATION = re.compile(r"primitive_\w+_add|objects\.new\(|\.copy\(\)|\bduplicate\w*\(")
+LOOP = re.compile(r"range\(\s*(?:\d+\s*,\s*)?(\d+)\s*(?:,\s*\d+\s*)?\)")
+FRAME_END = re.compile(r"frame_end\s*=\s*(\d+)")
+SUBDIVISION = re.compile(r"(?:levels|render_levels|subdivisions|number_cuts)\s*=\s*(\d+)")
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, eta):
+        super().__init__(f"{reason} (retry in about {eta:.0f}s)")
+        self.reason = reason
+        self.eta = eta
+
+def system_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return 8 * 2**30
+
+def script_features(script):
+    # Static guesses only: creation calls times the largest literal loop count,
+    # the last frame_end and the deepest subdivision setting in the script
+    loops = [int(count) for count in LOOP.findall(script)]
+    frames = [int(frame) for frame in FRAME_END.findall(script)]
+    levels = [int(level) for level in SUBDIVISION.findall(script)]
+    return {
+        "objects": len(CREATION.findall(script)) * max(loops, default=1),
+        "frames": frames[-1] if frames else 250,
+        "subdivision": min(max(levels, default=0), 6),
+        "keyframes": script.count("keyframe_insert"),
+    }
+
+class CostModel:
+    # Seconds per work unit start from a guess and follow measured jobs
+    def __init__(self, seconds_per_unit=0.002, bytes_per_unit=OBJECT_MEMORY, smoothing=0.2):
+        self.seconds_per_unit = dict.fromkeys(PROFILES, seconds_per_unit)
+        self.bytes_per_unit = dict.fromkeys(PROFILES, bytes_per_unit)
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+
+    def estimate(self, script, profile):
+        settings = PROFILES[profile]
+        features = script_features(script)
+        objects = max(1, round(features["objects"] * settings["count_scale"]))
+        frames = min(features["frames"], settings["max_frames"] or features["frames"])
+        geometry = objects * 4 ** features["subdivision"]
+        # Baking samples every animated object on every frame
+        animation = objects * frames if settings["bake_anim"] and features["keyframes"] else 0
+        units = geometry + animation
+        with self.lock:
+            seconds = BASE_SECONDS[profile] + units * self.seconds_per_unit[profile]
+            memory = BASE_MEMORY + geometry * self.bytes_per_unit[profile]
+        cpus = os.cpu_count() or 1
+        cores = 1 if profile == "preview" else min(cpus, 2 if seconds < 30 else max(2, cpus // 2))
+        return {"profile": profile, "units": units, "geometry": geometry, "seconds": seconds, "cores": cores,
+                "memory_bytes": int(memory), **features}
+
+    def observe(self, cost, result):
+        stats = (result or {}).get("blender") if isinstance(result, dict) else None
+        if not stats or not cost["units"]:
+            return
+        profile = cost["profile"]
+        rate = max(stats["wall_seconds"] - BASE_SECONDS[profile], 0) / cost["units"]
+        with self.lock:
+            self.seconds_per_unit[profile] += self.smoothing * (rate - self.seconds_per_unit[profile])
+            if stats["peak_rss_bytes"]:
+                memory_rate = max(stats["peak_rss_bytes"] - BASE_MEMORY, 0) / cost["geometry"]
+                self.bytes_per_unit[profile] += self.smoothing * (memory_rate - self.bytes_per_unit[profile])
+
+class Ticket:
+    def __init__(self, session, cost, fn, args, kwargs):
+        self.session = session
+        self.cost = cost
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.started = None
+
+    def done(self):
+        return self.future.done()
+
+class AdmissionController:
+    def __init__(self, cpu_slots=None, memory_bytes=None, max_wait=MAX_WAIT_SECONDS, max_queued_per_session=3, model=None):
+        self.cpu_slots = cpu_slots or os.cpu_count() or 1
+        self.memory_bytes = memory_bytes or int(system_memory() * MEMORY_FRACTION)
+        self.max_wait = max_wait
+        self.max_queued_per_session = max_queued_per_session
+        self.model = model or CostModel()
+        self.lock = threading.Lock()
+        self.queue = []
+        self.running = []
+        # (finish time, session, core-seconds) of recent jobs, for fair share
+        self.history = []
+
+    def estimate(self, script, profile):
+        return self.model.estimate(script, profile)
+
+    def submit(self, session, cost, fn, *args, **kwargs):
+        ticket = Ticket(session, cost, fn, args, kwargs)
+        with self.lock:
+            queued = sum(1 for waiting in self.queue if waiting.session == session)
+            if queued >= self.max_queued_per_session:
+                raise AdmissionRejected("too many jobs queued for this session", self._eta(ticket, self._order() + [ticket]))
+            order = self._order(self.queue + [ticket])
+            eta = self._eta(ticket, order)
+            if eta > self.max_wait and (self.queue or self.running):
+                raise AdmissionRejected("the server is saturated", eta - self.max_wait)
+            self.queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def eta(self, ticket):
+        # Seconds until the ticket is expected to start; 0 once it has
+        with self.lock:
+            if ticket.started is not None or ticket not in self.queue:
+                return 0.0
+            return self._eta(ticket, self._order())
+
+    def status(self):
+        with self.lock:
+            return {
+                "running": len(self.running),
+                "queued": len(self.queue),
+                "cores": sum(ticket.cost["cores"] for ticket in self.running),
+                "cpu_slots": self.cpu_slots,
+                "memory_bytes": sum(ticket.cost["memory_bytes"] for ticket in self.running),
+                "memory_limit": self.memory_bytes,
+            }
+
+    def _session_load(self):
+        now = time.monotonic()
+        self.history = [entry for entry in self.history if now - entry[0] < FAIR_SHARE_WINDOW]
+        cores, work = Counter(), Counter()
+        for ticket in self.running:
+            cores[ticket.session] += ticket.cost["cores"]
+        for _, session, core_seconds in self.history:
+            work[session] += core_seconds
+        return cores, work
+
+    def _order(self, tickets=None):
+        cores, work = self._session_load()
+        now = time.monotonic()
+        def key(ticket):
+            starving = now - ticket.submitted > STARVATION_SECONDS
+            return (not starving, cores[ticket.session], work[ticket.session], ticket.cost["seconds"], ticket.submitted)
+        return sorted(self.queue if tickets is None else tickets, key=key)
+
+    def _eta(self, ticket, order):
+        # Core-seconds ahead of the ticket spread over every slot
+        now = time.monotonic()
+        ahead = sum(max(running.cost["seconds"] - (now - running.started), 0) * running.cost["cores"] for running in self.running)
+        for waiting in order:
+            if waiting is ticket:
+                break
+            ahead += waiting.cost["seconds"] * waiting.cost["cores"]
+        return ahead / self.cpu_slots
+
+    def _fits(self, ticket):
+        if not self.running or not ticket.cost["cores"]:
+            # An oversized job still runs on an idle machine, and a job served
+            # from the asset cache never launches Blender
+            return True
+        cores = sum(running.cost["cores"] for running in self.running) + ticket.cost["cores"]
+        memory = sum(running.cost["memory_bytes"] for running in self.running) + ticket.cost["memory_bytes"]
+        return cores <= self.cpu_slots and memory <= self.memory_bytes
+
+    def _dispatch(self):
+        # Called with the lock held. Smaller jobs may backfill around one that
+        # does not fit, unless that one has waited past STARVATION_SECONDS.
+        now = time.monotonic()
+        for ticket in self._order():
+            if self._fits(ticket):
+                self.queue.remove(ticket)
+                self.running.append(ticket)
+                ticket.started = time.monotonic()
+                threading.Thread(target=self._run, args=(ticket,), daemon=True).start()
+            elif now - ticket.submitted > STARVATION_SECONDS:
+                break
+
+    def _run(self, ticket):
+        result = None
+        if ticket.future.set_running_or_notify_cancel():
+            try:
+                result = ticket.fn(*ticket.args, **ticket.kwargs)
+            except BaseException as e:
+                ticket.future.set_exception(e)
+            else:
+                ticket.future.set_result(result)
+        self.model.observe(ticket.cost, result)
+        with self.lock:
+            self.running.remove(ticket)
+            self.history.append((time.monotonic(), ticket.session, (time.monotonic() - ticket.started) * ticket.cost["cores"]))
+            self._dispatch()
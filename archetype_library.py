@@ -0,0 +1,95 @@
+import bpy
+import glob
+import hashlib
+import json
+import os
+
+from asset_cache import code_version
+from seeding import stream
+
+# Pre-built archetypes (one collection each) are written to a .blend file keyed
+# by generator, parameters, seed and code version. The version covers the
+# generator and the local modules it imports (rock_displacement, scatter_nodes,
+# ...), so a change to any of them invalidates the library. Later runs link the
+# collections from that file instead of rebuilding them and place them as
+# collection instances, so a scene with N copies costs K builds plus N empties.
+LIBRARY_DIR = os.environ.get(
+    "ARCHETYPE_LIBRARY_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "blender_thing", "archetypes")
+)
+
+def library_path(generator_path, kind, params, seed, count):
+    generator = os.path.splitext(os.path.basename(generator_path))[0]
+    payload = json.dumps({"kind": kind, "params": params, "seed": seed, "count": count}, sort_keys=True, default=str)
+    key = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(LIBRARY_DIR, f"{generator}-{kind}-{code_version(generator_path)}-{key}.blend")
+
+def prune_stale_versions(generator_path, kind):
+    # Libraries built by an older version of the generator or its modules can
+    # never be hit again
+    generator = os.path.splitext(os.path.basename(generator_path))[0]
+    current = code_version(generator_path)
+    removed = 0
+    for path in glob.glob(os.path.join(LIBRARY_DIR, f"{generator}-{kind}-*.blend")):
+        if os.path.basename(path).split("-")[-2] != current:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def move_to_collection(obj, collection):
+    for owner in list(obj.users_collection):
+        owner.objects.unlink(obj)
+    collection.objects.link(obj)
+
+def build_archetypes(kind, count, build, seed):
+    # build(index, rng) creates the archetype at the origin and returns its
+    # objects; every archetype draws from its own seeded stream
+    collections = []
+    for i in range(count):
+        collection = bpy.data.collections.new(f"{kind}_archetype_{i}")
+        for obj in build(i, stream(seed, kind, i)):
+            move_to_collection(obj, collection)
+        collections.append(collection)
+    return collections
+
+def archetype_index(collection):
+    # "rock_archetype_12" (or "rock_archetype_12.001" after a name clash) -> 12
+    return int(collection.name.rsplit("_", 1)[1].split(".")[0])
+
+def load_archetypes(path, link=True):
+    # Back in build order, so placements pick the same archetype on a hit as on
+    # a miss; name order would put "_10" before "_2"
+    with bpy.data.libraries.load(path, link=link) as (data_from, data_to):
+        data_to.collections = list(data_from.collections)
+    return sorted(data_to.collections, key=archetype_index)
+
+def get_archetypes(generator_path, kind, params, seed, count, build, link=True):
+    # Returns (collections, cache_hit)
+    path = library_path(generator_path, kind, params, seed, count)
+    if os.path.exists(path):
+        return load_archetypes(path, link), True
+
+    prune_stale_versions(generator_path, kind)
+    collections = build_archetypes(kind, count, build, seed)
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    # Write next to the final path and rename so concurrent runs never read a partial file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    bpy.data.libraries.write(temp_path, set(collections), path_remap='RELATIVE_ALL', fake_user=True)
+    os.replace(temp_path, path)
+    return collections, False
+
+def instance_archetypes(collections, placements, name):
+    # placements: (location, z rotation, uniform scale, archetype index) tuples
+    target = bpy.data.collections.new(name)
+    bpy.context.scene.collection.children.link(target)
+    instances = []
+    for i, (location, rotation, scale, index) in enumerate(placements):
+        instance = bpy.data.objects.new(f"{name}_{i}", None)
+        instance.instance_type = 'COLLECTION'
+        instance.instance_collection = collections[index]
+        instance.location = location
+        instance.rotation_euler = (0, 0, rotation)
+        instance.scale = (scale, scale, scale)
+        target.objects.link(instance)
+        instances.append(instance)
+    return instances
@@ -0,0 +1,131 @@
+import ast
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+# Exported assets keyed on (generator, code version, parameters, seed, format),
+# where the code version covers the generator and every repo-local module it
+# imports, directly or through other local modules. Generators are
+# deterministic in those, so a repeat request is served by copying the cached
+# file instead of launching or rebuilding a scene. Each asset has a .json
+# sidecar with whatever metadata the producer stored (reports, manifests); the
+# least recently used assets are evicted once the cache grows past MAX_BYTES.
+CACHE_DIR = os.environ.get(
+    "ASSET_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "blender_thing", "assets")
+)
+MAX_BYTES = int(os.environ.get("ASSET_CACHE_MAX_BYTES", str(4 * 2**30)))
+
+def source_version(source):
+    return hashlib.sha1(source.encode("utf-8") if isinstance(source, str) else source).hexdigest()[:12]
+
+def local_imports(path):
+    # Paths of the modules next to path that it imports, followed transitively
+    directory = os.path.dirname(os.path.abspath(path))
+    found, pending = [], [os.path.abspath(path)]
+    while pending:
+        with open(pending.pop(), "rb") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = os.path.join(directory, name.split(".")[0] + ".py")
+                if os.path.exists(module) and module not in found and module != os.path.abspath(path):
+                    found.append(module)
+                    pending.append(module)
+    return sorted(found)
+
+def code_version(generator_path):
+    digest = hashlib.sha1()
+    for path in [generator_path, *local_imports(generator_path)]:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def asset_key(generator, version, params, seed, export_format):
+    payload = json.dumps({"generator": generator, "version": version, "params": params, "seed": seed,
+                          "format": export_format}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def generator_key(generator_path, params, seed, export_format="fbx"):
+    return asset_key(os.path.basename(generator_path), code_version(generator_path), params, seed, export_format)
+
+def asset_path(key, export_format):
+    return os.path.join(CACHE_DIR, f"{key}.{export_format}")
+
+def lookup(key, export_format):
+    # Returns (path, metadata) or None; a hit counts as a use for eviction
+    path = asset_path(key, export_format)
+    try:
+        with open(f"{path}.json") as f:
+            metadata = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return path, metadata
+
+def store(key, export_format, source_path, metadata=None):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = asset_path(key, export_format)
+    # The sidecar is written last, so a lookup never sees a partial asset
+    shutil.copyfile(source_path, f"{path}.partial")
+    os.replace(f"{path}.partial", path)
+    with open(f"{path}.json.partial", "w") as f:
+        json.dump({"stored": time.time(), **(metadata or {})}, f, default=str)
+    os.replace(f"{path}.json.partial", f"{path}.json")
+    prune()
+    return path
+
+def prune(max_bytes=MAX_BYTES):
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith((".json", ".partial")) or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for stale in (f"{path}.json", path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        total -= size
+        removed += 1
+    return removed
+
+def last_step(generator_path, argv=None):
+    # False when something still needs the built scene after the generator:
+    # the render farm saving it as a .blend, or further --python passes (the
+    # optimizer, a render worker) chained after it on the Blender command line
+    if os.environ.get("RENDER_FARM_PREPARE"):
+        return False
+    argv = sys.argv if argv is None else argv
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+    scripts = [os.path.abspath(value) for option, value in zip(argv, argv[1:])
+               if option in ("--python", "-P", "--python-expr", "--python-text")]
+    generator_path = os.path.abspath(generator_path)
+    return generator_path not in scripts or scripts[-1] == generator_path
+
+def memoize(generator_path, params, seed, export_path, build, export_format="fbx"):
+    # build(export_path) produces the file and may return metadata to keep;
+    # returns (metadata, cache_hit). A generator that is not the last step
+    # always builds, since later passes work on the scene, not the file.
+    key = generator_key(generator_path, params, seed, export_format)
+    cached = lookup(key, export_format) if last_step(generator_path) else None
+    if cached is not None:
+        shutil.copyfile(cached[0], export_path)
+        return cached[1], True
+    metadata = build(export_path) or {}
+    store(key, export_format, export_path, metadata)
+    return metadata, False
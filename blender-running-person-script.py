@@ -1,6 +1,19 @@
 import bpy
+import argparse
 import math
 import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import asset_cache
+import seeding
+import skinning
+
+# Units per second the root moves at speed scale 1 while the run cycle plays
+RUN_SPEED = 2.0
 
 def delete_all_objects():
     bpy.ops.object.select_all(action='SELECT')
@@ -95,6 +108,8 @@ def parent_mesh_to_armature(mesh, armature):
     mesh.parent = armature
     mesh.modifiers.new(name="Armature", type='ARMATURE')
     mesh.modifiers["Armature"].object = armature
+    # Without vertex groups the modifier has nothing to deform
+    skinning.skin_mesh(mesh, armature)
 
 def create_run_animation(armature, num_frames=40):
     bpy.context.scene.frame_end = num_frames
@@ -126,37 +141,192 @@ def create_run_animation(armature, num_frames=40):
     
     bpy.ops.object.mode_set(mode='OBJECT')
 
-# Clear existing objects
-delete_all_objects()
+def build_runner():
+    human_mesh = create_simple_human_mesh()
+    armature = create_armature()
+    parent_mesh_to_armature(human_mesh, armature)
+    create_run_animation(armature)
+    return human_mesh, armature
+
+def create_advance_action(frames):
+    # Root motion shared by every runner: straight ahead (-Y) at RUN_SPEED.
+    # Linear keys, so a scaled NLA strip gives each runner its own speed.
+    fps = bpy.context.scene.render.fps
+    action = bpy.data.actions.new("Advance")
+    empty = bpy.data.objects.new("AdvanceKeys", None)
+    empty.animation_data_create().action = action
+    empty.location = (0, 0, 0)
+    empty.keyframe_insert(data_path="location", frame=0)
+    empty.location = (0, -RUN_SPEED * frames / fps, 0)
+    empty.keyframe_insert(data_path="location", frame=frames)
+    for fcurve in action.fcurves:
+        for keyframe in fcurve.keyframe_points:
+            keyframe.interpolation = 'LINEAR'
+    empty.animation_data.action = None
+    bpy.data.objects.remove(empty)
+    return action
+
+def add_strip(obj, name, action, start, scale, repeat):
+    track = obj.animation_data.nla_tracks.new()
+    track.name = name
+    strip = track.strips.new(name, int(start), action)
+    strip.scale = scale
+    strip.repeat = repeat
+    return strip
+
+def create_runner(mesh, armature, index):
+    # Object-level copies: mesh and armature data stay shared with the template
+    runner = armature.copy()
+    runner.name = f"Runner_{index:04d}"
+    runner.animation_data_clear()
+    body = mesh.copy()
+    body.name = f"Runner_{index:04d}_Body"
+    for collection in armature.users_collection:
+        collection.objects.link(runner)
+        collection.objects.link(body)
+    body.parent = runner
+    body.modifiers["Armature"].object = runner
+    return runner, body
+
+def create_crowd(count, area=30, frames=240, seed=0, speed_range=(0.8, 1.25)):
+    # One rig and run cycle; every runner is a pair of object copies on a root
+    # empty placed at the start of its path, playing the shared actions as NLA
+    # strips with its own time offset and speed scale
+    human_mesh, armature = build_runner()
+    run_action = armature.animation_data.action
+    armature.animation_data.action = None
+    cycle = run_action.frame_range[1] - run_action.frame_range[0]
+    # Long enough that the fastest runner is still moving at the last frame
+    advance_action = create_advance_action(int(frames * speed_range[1]) + 1)
+
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = frames
+
+    runners = []
+    for index in range(count):
+        # One stream per runner: a bigger crowd keeps the runners it already had
+        rng = seeding.stream(seed, "runner", index)
+        runner, body = (armature, human_mesh) if index == 0 else create_runner(human_mesh, armature, index)
+        root = bpy.data.objects.new(f"Runner_{index:04d}_Root", None)
+        scene.collection.objects.link(root)
+        root.location = (rng.uniform(-area / 2, area / 2), rng.uniform(-area / 2, area / 2), 0)
+        root.rotation_euler.z = rng.uniform(0, 2 * math.pi)
+        runner.parent = root
+
+        # A faster runner plays both the cycle and the root motion faster
+        speed = rng.uniform(*speed_range)
+        offset = rng.uniform(0, cycle)
+        runner.animation_data_create()
+        add_strip(runner, "Run", run_action, -offset, 1 / speed, math.ceil((frames + offset) * speed / cycle) + 1)
+        add_strip(runner, "Advance", advance_action, 0, 1 / speed, 1)
+        runners.append((root, runner, body))
+    return runners
+
+def resident_bytes():
+    # Current RSS on Linux; peak RSS elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def export_fbx(export_path, objects):
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in objects:
+        obj.select_set(True)
+    bpy.context.view_layer.objects.active = objects[0]
+    # Only the evaluated timeline: exporting every NLA strip and action as a
+    # separate take would multiply the file by the runner count
+    bpy.ops.export_scene.fbx(filepath=export_path, use_selection=True, bake_anim=True,
+                             bake_anim_use_nla_strips=False, bake_anim_use_all_actions=False)
+
+def benchmark_crowd(counts, frames):
+    rows = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in counts:
+            bpy.ops.wm.read_factory_settings(use_empty=True)
+            bpy.context.scene.render.fps = 24
+            memory = resident_bytes()
+
+            start = time.perf_counter()
+            runners = create_crowd(count, area=max(30, math.sqrt(count) * 3), frames=frames)
+            build_seconds = time.perf_counter() - start
+            bpy.context.view_layer.update()
+            memory = resident_bytes() - memory
+
+            export_path = os.path.join(temp_dir, f"crowd_{count}.fbx")
+            start = time.perf_counter()
+            export_fbx(export_path, [obj for runner in runners for obj in runner])
+            rows.append({
+                "runners": count,
+                "build_seconds": build_seconds,
+                "memory_bytes": memory,
+                "export_seconds": time.perf_counter() - start,
+                "export_bytes": os.path.getsize(export_path),
+                "meshes": len(bpy.data.meshes),
+                "actions": len(bpy.data.actions),
+            })
+
+    print(f"{'runners':>10}{'build s':>10}{'RSS MiB':>10}{'export s':>10}{'fbx MiB':>10}{'meshes':>8}{'actions':>8}")
+    for row in rows:
+        print(f"{row['runners']:>10}{row['build_seconds']:>10.2f}{row['memory_bytes'] / 2**20:>10.1f}"
+              f"{row['export_seconds']:>10.2f}{row['export_bytes'] / 2**20:>10.1f}{row['meshes']:>8}{row['actions']:>8}")
+    return rows
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate an animated running person or a crowd of runners")
+    parser.add_argument("--crowd", type=int, metavar="COUNT", help="Build COUNT runners sharing one mesh, rig and run cycle")
+    parser.add_argument("--frames", type=int, default=240, help="Crowd animation length")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for crowd paths, offsets and speeds")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="COUNT", help="Time crowd build and export at these runner counts (default 10, 100, 1000)")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild instead of reusing a cached export")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def main():
+    args = parse_args()
+
+    if args.benchmark is not None:
+        benchmark_crowd(args.benchmark or (10, 100, 1000), args.frames)
+        return
 
-# Set up the scene
-bpy.context.scene.render.fps = 24
+    file_name = "running_crowd.fbx" if args.crowd else "running_person.fbx"
 
-# Create the human mesh
-human_mesh = create_simple_human_mesh()
+    # Get the path to the desktop
+    desktop_path = os.path.expanduser("~/Desktop")
 
-# Create the armature
-armature = create_armature()
+    # Set the export path
+    export_path = os.path.join(desktop_path, file_name)
 
-# Parent the mesh to the armature
-parent_mesh_to_armature(human_mesh, armature)
+    def build_and_export(path):
+        # Clear existing objects
+        delete_all_objects()
 
-# Create the run animation
-create_run_animation(armature)
+        # Set up the scene
+        bpy.context.scene.render.fps = 24
 
-# Get the path to the desktop
-desktop_path = os.path.expanduser("~/Desktop")
+        if args.crowd:
+            runners = create_crowd(args.crowd, area=max(30, math.sqrt(args.crowd) * 3), frames=args.frames, seed=args.seed)
+            export_objects = [obj for runner in runners for obj in runner]
+        else:
+            # Create the human mesh and armature, parent them and animate the run
+            human_mesh, armature = build_runner()
+            export_objects = [armature, human_mesh]
 
-# Set the export path
-export_path = os.path.join(desktop_path, "running_person.fbx")
+        # Export as FBX
+        export_fbx(path, export_objects)
 
-# Select the armature and mesh
-bpy.ops.object.select_all(action='DESELECT')
-armature.select_set(True)
-human_mesh.select_set(True)
-bpy.context.view_layer.objects.active = armature
+    if args.no_cache:
+        build_and_export(export_path)
+        cache_hit = False
+    else:
+        # Same generator version, parameters and seed: same file
+        params = {"crowd": args.crowd, "frames": args.frames if args.crowd else None}
+        _, cache_hit = asset_cache.memoize(os.path.abspath(__file__), params, args.seed if args.crowd else None, export_path, build_and_export)
 
-# Export as FBX
-bpy.ops.export_scene.fbx(filepath=export_path, use_selection=True, bake_anim=True)
+    print(f"Animated running person {'copied from the asset cache' if cache_hit else 'exported'} as FBX to: {export_path}")
 
-print(f"Animated running person exported as FBX to: {export_path}")
+if __name__ == "__main__":
+    main()
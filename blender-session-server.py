@@ -0,0 +1,91 @@
+import bpy
+import json
+import os
+import runpy
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import profile_pass
+import scene_rebuild
+from asset_cache import code_version, local_imports
+
+# Long-lived Blender process driven by blender_session.py. Each line on stdin is
+# a JSON request naming a generator script, its parameters, an export path and
+# optional thumbnail settings; the scene is kept between requests and only
+# changed components are rebuilt.
+REPLY_PREFIX = "@@session "
+
+generators = {}
+
+def reply(message):
+    sys.stdout.write(REPLY_PREFIX + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+def load_generator(path):
+    # The version covers the generator and the local modules it imports
+    version = code_version(path)
+    cached = generators.get(path)
+    if cached is None or cached[0] != version:
+        # A changed generator or helper invalidates every component it built;
+        # helpers are re-imported so the new code is what runs, except the
+        # modules this server shares with the generator
+        for module in local_imports(path):
+            name = os.path.splitext(os.path.basename(module))[0]
+            if name not in ("profile_pass", "scene_rebuild", "asset_cache"):
+                sys.modules.pop(name, None)
+        cached = (version, runpy.run_path(path, run_name="blender_session"))
+        generators[path] = cached
+    return cached
+
+def default_export(export_path):
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.export_scene.fbx(filepath=export_path, use_selection=True, bake_anim=True)
+
+def handle(request):
+    version, generator = load_generator(request["script"])
+    params = dict(generator.get("DEFAULT_PARAMS", {}))
+    params.update(request.get("params", {}))
+
+    start = time.perf_counter()
+    components = [
+        scene_rebuild.Component(name, scene_rebuild.component_key(params, keys, version), build)
+        for name, keys, build in generator["scene_components"](params)
+    ]
+    report = scene_rebuild.rebuild(components)
+    if "configure_scene" in generator:
+        generator["configure_scene"](params)
+    report["rebuild_seconds"] = time.perf_counter() - start
+
+    export_path = request.get("export")
+    if export_path:
+        start = time.perf_counter()
+        generator.get("export_scene", default_export)(export_path)
+        report["export_seconds"] = time.perf_counter() - start
+        report["export"] = export_path
+
+    thumbnail = request.get("thumbnail")
+    if thumbnail:
+        report["thumbnail_seconds"] = profile_pass.render_thumbnail(bpy.context.scene, **thumbnail)
+        report["thumbnail"] = thumbnail["path"]
+
+    report["objects"] = len(bpy.context.scene.objects)
+    return report
+
+def main():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    reply({"ready": True})
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line == "quit":
+            break
+        try:
+            reply(handle(json.loads(line)))
+        except Exception as e:
+            reply({"error": str(e), "traceback": traceback.format_exc()})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+
+import asset_cache
+import fbx_inspector
+import thumbnail_cache
+from pipeline_metrics import BYTE_BUCKETS, METRICS, JobLog, cache_lookup
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_PRELUDE = os.path.join(APP_DIR, "profile_prelude.py")
+PROFILE_PASS = os.path.join(APP_DIR, "profile_pass.py")
+OPTIMIZER_SCRIPT = os.path.join(APP_DIR, "scene_optimizer.py")
+
+# A preview job returns a small GLB and thumbnail within seconds; the full job
+# produces the baked FBX. Object counts can only be scaled by the generated
+# script itself, so the budget is handed to it through the environment (the
+# prompt in main.py asks for this); frame range and baking are enforced by the
+# post-passes regardless, and the prelude also turns baking off in the script's
+# own exports.
+PROFILES = {
+    "preview": {"count_scale": 0.1, "max_frames": 24, "bake_anim": False, "format": "glb", "thumbnail": True},
+    "full": {"count_scale": 1.0, "max_frames": None, "bake_anim": True, "format": "fbx", "thumbnail": False},
+}
+
+def profile_env(profile, report_path, thumbnail_env=None):
+    settings = PROFILES[profile]
+    env = dict(
+        os.environ,
+        BLENDER_THING_PROFILE=profile,
+        BLENDER_THING_COUNT_SCALE=str(settings["count_scale"]),
+        BLENDER_THING_BAKE_ANIM="1" if settings["bake_anim"] else "0",
+        # Generated scripts read their output path from the arguments, so the
+        # optimizer report location travels in the environment instead
+        SCENE_OPTIMIZER_REPORT=report_path
+    )
+    if settings["max_frames"]:
+        env["BLENDER_THING_MAX_FRAMES"] = str(settings["max_frames"])
+    env.update(thumbnail_env or {})
+    return env
+
+class BlenderUnavailable(RuntimeError):
+    # The Blender executable could not be started at all
+    pass
+
+def _stream_lines(pipe, stream, log, tail):
+    for line in pipe:
+        line = line.rstrip("\n")
+        tail.append(line)
+        log.event("blender_output", stream=stream, line=line)
+    pipe.close()
+
+def run_blender(command, env, log):
+    # Like subprocess.run(check=True), but Blender's stdout and stderr go to the
+    # job log line by line, and the child's CPU time and peak RSS are read from
+    # its rusage when it is reaped
+    start = time.perf_counter()
+    try:
+        process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, errors="replace", bufsize=1)
+    except FileNotFoundError as e:
+        # Told apart from a job whose output file is missing
+        raise BlenderUnavailable(f"Blender executable not found: {command[0]}") from e
+    tail = deque(maxlen=40)
+    readers = [threading.Thread(target=_stream_lines, args=(pipe, stream, log, tail), daemon=True)
+               for pipe, stream in ((process.stdout, "stdout"), (process.stderr, "stderr"))]
+    for reader in readers:
+        reader.start()
+    usage = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    else:
+        process.wait()
+    for reader in readers:
+        reader.join()
+    stats = {
+        "returncode": process.returncode,
+        "wall_seconds": time.perf_counter() - start,
+        # ru_maxrss is in KiB on Linux
+        "cpu_seconds": usage.ru_utime + usage.ru_stime if usage else None,
+        "peak_rss_bytes": usage.ru_maxrss * 1024 if usage else None,
+    }
+    log.event("blender_exit", **stats)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, output="\n".join(tail))
+    return stats
+
+def failure_class(error):
+    # Coarse causes worth separate alerting and capacity numbers
+    if isinstance(error, subprocess.CalledProcessError):
+        if error.returncode < 0:
+            return "blender_killed"
+        if error.output and "Traceback" in error.output:
+            return "script_error"
+        return "blender_error"
+    if isinstance(error, BlenderUnavailable):
+        return "blender_unavailable"
+    if isinstance(error, FileNotFoundError):
+        return "missing_output"
+    if isinstance(error, fbx_inspector.FBXError):
+        return "invalid_export"
+    return type(error).__name__
+
+def observe_job(profile, stats, data_bytes):
+    labels = {"profile": profile}
+    METRICS.inc("jobs_total", labels)
+    METRICS.observe("export_bytes", data_bytes, labels, BYTE_BUCKETS)
+    if stats is None:
+        # Served from the asset cache; no Blender process to measure
+        return
+    METRICS.observe("blender_wall_seconds", stats["wall_seconds"], labels)
+    if stats["cpu_seconds"] is not None:
+        METRICS.observe("blender_cpu_seconds", stats["cpu_seconds"], labels)
+        METRICS.observe("blender_peak_rss_bytes", stats["peak_rss_bytes"], labels, BYTE_BUCKETS)
+
+def job_asset_key(script, profile, seed=0):
+    # A generated script is its own generator; the prelude and post-passes
+    # change the output too, so their code versions are part of the parameters
+    settings = PROFILES[profile]
+    params = {"profile": settings, "passes": [asset_cache.code_version(path) for path in (PROFILE_PRELUDE, PROFILE_PASS, OPTIMIZER_SCRIPT)]}
+    return asset_cache.asset_key("llm_script", asset_cache.source_version(script), params, seed, settings["format"])
+
+def cached_job(script, profile, seed=0):
+    # True when run_blender_job would be answered without launching Blender
+    settings = PROFILES[profile]
+    if asset_cache.lookup(job_asset_key(script, profile, seed), settings["format"]) is None:
+        return False
+    return not settings["thumbnail"] or thumbnail_cache.lookup(thumbnail_cache.spec_key(script, profile=settings, seed=seed)) is not None
+
+def run_blender_job(script, profile="full", job_id=None, submitted=None, threads=None, seed=0):
+    # submitted: perf_counter() when the job was queued, to measure the wait;
+    # threads: Blender's thread count, matching the cores reserved for the job;
+    # seed: value for the global random and numpy RNGs before the script runs
+    log = JobLog(job_id, profile=profile, seed=seed)
+    if submitted is not None:
+        METRICS.observe("job_queue_wait_seconds", time.perf_counter() - submitted, {"profile": profile})
+    log.event("job_started", threads=threads)
+    try:
+        result = _run_blender_job(script, profile, log, threads, seed)
+    except Exception as e:
+        kind = failure_class(e)
+        METRICS.inc("job_failures_total", {"profile": profile, "class": kind})
+        log.event("job_failed", failure_class=kind, error=str(e), output_tail=getattr(e, "output", None))
+        raise
+    observe_job(profile, result["blender"], len(result["data"]))
+    log.event("job_finished", seconds=result["seconds"], export_bytes=len(result["data"]), problems=result["problems"],
+              cached=result["blender"] is None, **(result["blender"] or {}))
+    return result
+
+def _cached_result(asset, thumbnail, start):
+    path, metadata = asset
+    with open(path, "rb") as f:
+        data = f.read()
+    return {
+        "profile": metadata["profile"],
+        "data": data,
+        "file_name": metadata["file_name"],
+        "mime": metadata["mime"],
+        "report": metadata["report"],
+        "inspection": metadata["inspection"],
+        "problems": metadata["problems"],
+        "thumbnail": thumbnail,
+        "thumbnail_seconds": None,
+        "blender": None,
+        "seconds": time.perf_counter() - start,
+    }
+
+def _run_blender_job(script, profile, log, threads=None, seed=0):
+    settings = PROFILES[profile]
+    start = time.perf_counter()
+    # Thumbnails are cached by script, profile and seed; only render on a miss
+    thumbnail_key = thumbnail_cache.spec_key(script, profile=settings, seed=seed) if settings["thumbnail"] else None
+    thumbnail = thumbnail_cache.lookup(thumbnail_key) if thumbnail_key else None
+    if thumbnail_key:
+        cache_lookup("thumbnail", thumbnail is not None, log)
+    # The same script, profile and seed export the same file, so a repeat is
+    # served from the asset cache (together with a cached thumbnail, if any)
+    asset_key = job_asset_key(script, profile, seed)
+    asset = asset_cache.lookup(asset_key, settings["format"])
+    cache_lookup("asset", asset is not None, log)
+    if asset is not None and (thumbnail_key is None or thumbnail is not None):
+        return _cached_result(asset, thumbnail, start)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        script_path = os.path.join(temp_dir, "script.py")
+        with open(script_path, "w") as f:
+            f.write(script)
+
+        output_path = os.path.join(temp_dir, f"output.{settings['format']}")
+        report_path = os.path.join(temp_dir, "optimizer.json")
+        thumbnail_path = os.path.join(temp_dir, "thumbnail.png")
+        thumbnail_report = os.path.join(temp_dir, "thumbnail.json")
+        thumbnail_env = None
+        if thumbnail_key and thumbnail is None:
+            thumbnail_env = thumbnail_cache.render_env(thumbnail_path, thumbnail_report)
+        # The profile pass and the optimizer run in the same Blender process
+        # after the generated script; the optimizer re-exports the scene
+        blender_command = [
+            "blender",
+            "--background",
+            # Exit non-zero on a Python error so it is reported as script_error
+            # rather than as a missing report later
+            "--python-exit-code", "1",
+            # Seeds the RNGs a generated script would use unseeded
+            "--python-expr", f"import random, numpy; random.seed({seed}); numpy.random.seed({seed})",
+            "--python", PROFILE_PRELUDE,
+            "--python", script_path,
+            "--python", PROFILE_PASS,
+            "--python", OPTIMIZER_SCRIPT,
+            "--",
+            output_path
+        ]
+        if threads:
+            blender_command[2:2] = ["--threads", str(threads)]
+        blender_stats = run_blender(blender_command, profile_env(profile, report_path, thumbnail_env), log)
+
+        with open(report_path) as f:
+            report = json.load(f)
+
+        thumbnail_seconds = None
+        if thumbnail_env and os.path.exists(thumbnail_path):
+            with open(thumbnail_path, "rb") as f:
+                thumbnail = f.read()
+            with open(thumbnail_report) as f:
+                thumbnail_seconds = json.load(f)["seconds"]
+            thumbnail_cache.store(thumbnail_key, thumbnail, thumbnail_seconds)
+
+        inspection, problems = None, []
+        if settings["format"] == "fbx":
+            # Checked straight from the file; no second Blender launch
+            inspection = fbx_inspector.inspect(output_path)
+            problems = fbx_inspector.validate(inspection, expect_animation=settings["bake_anim"])
+            zip_path = os.path.join(temp_dir, "output.zip")
+            with zipfile.ZipFile(zip_path, 'w') as zipf:
+                zipf.write(output_path, arcname="output.fbx")
+            data_path, file_name, mime = zip_path, "blender_output.zip", "application/zip"
+        else:
+            data_path, file_name, mime = output_path, "blender_preview.glb", "model/gltf-binary"
+        with open(data_path, "rb") as f:
+            data = f.read()
+        asset_cache.store(asset_key, settings["format"], data_path, {
+            "profile": profile, "file_name": file_name, "mime": mime, "report": report,
+            "inspection": inspection, "problems": problems,
+        })
+
+    return {
+        "profile": profile,
+        "data": data,
+        "file_name": file_name,
+        "mime": mime,
+        "report": report,
+        "inspection": inspection,
+        "problems": problems,
+        "thumbnail": thumbnail,
+        "thumbnail_seconds": thumbnail_seconds,
+        "blender": blender_stats,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import threading
+import time
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender-session-server.py")
+REPLY_PREFIX = "@@session "
+
+class BlenderSessionError(Exception):
+    pass
+
+class BlenderSession:
+    # One warm Blender process; requests are serialized because the scene is shared
+    def __init__(self, blender="blender"):
+        self.process = subprocess.Popen(
+            [blender, "--background", "--factory-startup", "--python", SERVER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._read_reply()
+
+    def _read_reply(self, log=None):
+        # Blender's own output shares stdout with the replies; it goes to the
+        # job log when there is one
+        for line in self.process.stdout:
+            if line.startswith(REPLY_PREFIX):
+                return json.loads(line[len(REPLY_PREFIX):])
+            if log is not None:
+                log.event("blender_output", stream="stdout", line=line.rstrip("\n"))
+        raise BlenderSessionError("Blender session exited unexpectedly")
+
+    def rebuild(self, script, params, export_path=None, thumbnail=None, log=None):
+        # thumbnail: keyword arguments for profile_pass.render_thumbnail, including "path"
+        request = {"script": os.path.abspath(script), "params": params, "export": export_path, "thumbnail": thumbnail}
+        with self.lock:
+            self.last_used = time.monotonic()
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            result = self._read_reply(log)
+        if "error" in result:
+            raise BlenderSessionError(result["error"])
+        return result
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.alive():
+            try:
+                self.process.stdin.write("quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+
+class SessionPool:
+    # One session per user, shut down after idle_timeout seconds without requests
+    def __init__(self, blender="blender", idle_timeout=900):
+        self.blender = blender
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            self._reap_idle()
+            session = self.sessions.get(user_id)
+            if session is None or not session.alive():
+                session = BlenderSession(self.blender)
+                self.sessions[user_id] = session
+            return session
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        for user_id, session in list(self.sessions.items()):
+            if now - session.last_used > self.idle_timeout and not session.lock.locked():
+                session.close()
+                del self.sessions[user_id]
+
+    def close_all(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
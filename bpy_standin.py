@@ -0,0 +1,1011 @@
+import contextlib
+import math
+import os
+import sys
+import types
+
+import numpy as np
+
+# Recording stand-in for the parts of bpy and mathutils the generators use, so
+# they can run under plain Python (e.g. in CI) while bpy_trace.py counts
+# operator calls, property writes, keyframe inserts and datablock creations.
+# Nothing is rendered or evaluated: primitives get plausible vertex and face
+# counts, exports write empty placeholder files, and any attribute the stand-in
+# does not model resolves to a permissive Record that accepts reads, writes
+# and calls. Install it with install(); bpy_trace.py does this for you.
+
+_recorder = None
+
+def record(kind, detail=None):
+    if _recorder is not None:
+        _recorder(kind, detail)
+
+# --- mathutils ---------------------------------------------------------------
+
+class Vector:
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        object.__setattr__(self, "_v", [float(v) for v in values])
+
+    def _axis(index):
+        def get(self):
+            return self._v[index]
+        def set(self, value):
+            record("property_writes")
+            self._v[index] = float(value)
+        return property(get, set)
+
+    x, y, z, w = _axis(0), _axis(1), _axis(2), _axis(3)
+    del _axis
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, index):
+        return self._v[index]
+
+    def __setitem__(self, index, value):
+        record("property_writes")
+        self._v[index] = float(value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({tuple(self._v)})"
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def _zip(self, other, op):
+        if isinstance(other, (int, float)):
+            return type(self)([op(a, other) for a in self._v])
+        return type(self)([op(a, b) for a, b in zip(self._v, other)])
+
+    def __add__(self, other):
+        return self._zip(other, lambda a, b: a + b)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._zip(other, lambda a, b: a - b)
+
+    def __rsub__(self, other):
+        return self._zip(other, lambda a, b: b - a)
+
+    def __mul__(self, other):
+        return self._zip(other, lambda a, b: a * b)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self._zip(other, lambda a, b: a / b)
+
+    def __neg__(self):
+        return type(self)([-a for a in self._v])
+
+    def __matmul__(self, other):
+        return self.dot(other)
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._v, other))
+
+    def cross(self, other):
+        return Vector(np.cross(self._v[:3], list(other)[:3]))
+
+    @property
+    def length(self):
+        return math.sqrt(self.dot(self))
+
+    @property
+    def length_squared(self):
+        return self.dot(self)
+
+    def normalized(self):
+        length = self.length
+        return type(self)([a / length for a in self._v]) if length else self.copy()
+
+    def normalize(self):
+        object.__setattr__(self, "_v", self.normalized()._v)
+
+    def copy(self):
+        return type(self)(self._v)
+
+    def to_tuple(self, precision=-1):
+        return tuple(self._v)
+
+    def to_track_quat(self, track='Y', up='Z'):
+        return Quaternion()
+
+    def to_euler(self, *args):
+        return Euler()
+
+    def to_matrix(self):
+        return Matrix.Identity(3)
+
+    def freeze(self):
+        return self
+
+class Euler(Vector):
+    def __init__(self, values=(0.0, 0.0, 0.0), order='XYZ'):
+        super().__init__(values)
+
+class Quaternion(Vector):
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0), angle=None):
+        super().__init__(values)
+
+class Color(Vector):
+    pass
+
+class Matrix:
+    def __init__(self, rows=None):
+        object.__setattr__(self, "_m", np.identity(4) if rows is None else np.array(rows, dtype=np.float64))
+
+    @classmethod
+    def Identity(cls, size):
+        return cls(np.identity(size))
+
+    @classmethod
+    def Translation(cls, vector):
+        matrix = np.identity(4)
+        matrix[:3, 3] = list(vector)[:3]
+        return cls(matrix)
+
+    @classmethod
+    def Scale(cls, factor, size, axis=None):
+        return cls(np.diag([factor] * (size - 1) + [1.0]) if size == 4 else np.identity(size) * factor)
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        if isinstance(axis, str):
+            axis = {"X": (1, 0, 0), "Y": (0, 1, 0), "Z": (0, 0, 1)}[axis]
+        x, y, z = np.array(axis, dtype=np.float64) / np.linalg.norm(axis)
+        c, s, t = math.cos(angle), math.sin(angle), 1 - math.cos(angle)
+        rotation = np.array([[t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+                             [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+                             [t * x * z - s * y, t * y * z + s * x, t * z * z + c]])
+        matrix = np.identity(size)
+        matrix[:3, :3] = rotation
+        return cls(matrix)
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix(self._m @ other._m)
+        values = list(other)
+        if len(values) == 3 and self._m.shape[0] == 4:
+            return Vector((self._m @ np.array(values + [1.0]))[:3])
+        return Vector(self._m @ np.array(values))
+
+    def __array__(self, dtype=None, copy=None):
+        return self._m.astype(dtype) if dtype is not None else self._m.copy()
+
+    def __iter__(self):
+        return (Vector(row) for row in self._m)
+
+    def __len__(self):
+        return len(self._m)
+
+    def __getitem__(self, index):
+        return Vector(self._m[index])
+
+    def inverted(self):
+        return Matrix(np.linalg.inv(self._m))
+
+    def copy(self):
+        return Matrix(self._m)
+
+    def to_3x3(self):
+        return Matrix(self._m[:3, :3])
+
+    def to_euler(self, *args):
+        return Euler()
+
+    def decompose(self):
+        return Vector(self._m[:3, 3]), Quaternion(), Vector((1, 1, 1))
+
+    @property
+    def translation(self):
+        return Vector(self._m[:3, 3])
+
+# --- permissive records ------------------------------------------------------
+
+class Record:
+    # Anything the stand-in does not model: reads return child records, writes
+    # are counted, calls return records, iteration is empty
+    def __init__(self, path="bpy", **values):
+        object.__setattr__(self, "_path", path)
+        object.__setattr__(self, "_values", dict(values))
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        values = object.__getattribute__(self, "_values")
+        if name not in values:
+            values[name] = Record(f"{self._path}.{name}")
+        return values[name]
+
+    def __setattr__(self, name, value):
+        record("property_writes")
+        if isinstance(getattr(type(self), name, None), property):
+            object.__setattr__(self, name, value)
+        else:
+            self._values[name] = value
+
+    def __call__(self, *args, **kwargs):
+        return Record(f"{self._path}()")
+
+    def __getitem__(self, key):
+        return self._values.setdefault(("item", key), Record(f"{self._path}[{key!r}]"))
+
+    def __setitem__(self, key, value):
+        record("property_writes")
+        self._values[("item", key)] = value
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return True
+
+    def __float__(self):
+        return 0.0
+
+    def __int__(self):
+        return 0
+
+    def __index__(self):
+        return 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __repr__(self):
+        return f"<{self._path}>"
+
+    def keyframe_insert(self, data_path, *args, **kwargs):
+        record("keyframe_inserts", data_path)
+        return True
+
+class Collection:
+    # bpy_prop_collection: ordered, indexable by position or name
+    def __init__(self, factory=None, items=()):
+        self._factory = factory
+        self._items = list(items)
+
+    def new(self, *args, **kwargs):
+        item = self._factory(*args, **kwargs)
+        if isinstance(item, ID):
+            record("datablocks_created", type(item).__name__)
+        self._items.append(item)
+        return item
+
+    def add(self, count=1):
+        for _ in range(count):
+            self._items.append(self._factory())
+
+    def append(self, item):
+        self._items.append(item)
+
+    def link(self, item):
+        if item not in self._items:
+            self._items.append(item)
+
+    def unlink(self, item):
+        if item in self._items:
+            self._items.remove(item)
+
+    def remove(self, item, **kwargs):
+        unlink_everywhere(item)
+
+    def clear(self):
+        self._items.clear()
+
+    def get(self, name, default=None):
+        return next((item for item in self._items if getattr(item, "name", None) == name), default)
+
+    def find(self, name):
+        return next((index for index, item in enumerate(self._items) if getattr(item, "name", None) == name), -1)
+
+    def keys(self):
+        return [item.name for item in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(item.name, item) for item in self._items]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self.get(key)
+            if item is None:
+                raise KeyError(key)
+            return item
+        return self._items[key]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items or (isinstance(item, str) and self.get(item) is not None)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def foreach_get(self, attribute, buffer):
+        record("foreach_calls", attribute)
+        values = np.array([np.ravel(np.asarray(list(getattr(item, attribute)) if isinstance(getattr(item, attribute), Vector)
+                                               else getattr(item, attribute), dtype=np.float64)) for item in self._items])
+        buffer[:] = values.ravel()[:len(buffer)] if values.size else buffer[:0]
+
+    def foreach_set(self, attribute, buffer):
+        record("foreach_calls", attribute)
+        values = np.asarray(buffer, dtype=np.float64).ravel()
+        if not self._items:
+            return
+        width = len(values) // len(self._items)
+        for index, item in enumerate(self._items):
+            chunk = values[index * width:(index + 1) * width]
+            current = getattr(item, attribute, None)
+            if isinstance(current, Vector) or width > 1:
+                object.__setattr__(item, attribute, Vector(chunk))
+            elif isinstance(current, int) and not isinstance(current, bool):
+                object.__setattr__(item, attribute, int(chunk[0]))
+            else:
+                object.__setattr__(item, attribute, float(chunk[0]))
+
+class ID(Record):
+    def __init__(self, name="", *args, **kwargs):
+        super().__init__(f"bpy.data[{name!r}]")
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "_props", {})
+        object.__setattr__(self, "use_fake_user", False)
+
+    def __getitem__(self, key):
+        return self._props[key]
+
+    def __setitem__(self, key, value):
+        record("property_writes")
+        self._props[key] = value
+
+    def __contains__(self, key):
+        return key in self._props
+
+    def get(self, key, default=None):
+        return self._props.get(key, default)
+
+    def keys(self):
+        return list(self._props)
+
+    @property
+    def users(self):
+        return count_users(self)
+
+    def copy(self):
+        duplicate = type(self).__new__(type(self))
+        for name, value in self.__dict__.items():
+            object.__setattr__(duplicate, name, dict(value) if isinstance(value, dict) else value)
+        record("datablocks_created", type(self).__name__)
+        data_collection(self).link(duplicate)
+        return duplicate
+
+    def user_clear(self):
+        pass
+
+    def animation_data_create(self):
+        if self.__dict__.get("animation_data") is None:
+            object.__setattr__(self, "animation_data", AnimData())
+        return self.animation_data
+
+    def animation_data_clear(self):
+        object.__setattr__(self, "animation_data", None)
+
+    def keyframe_insert(self, data_path, index=-1, frame=None, **kwargs):
+        # Like Blender, the first key creates the action
+        record("keyframe_inserts", data_path)
+        animation_data = self.animation_data_create()
+        if animation_data.action is None:
+            animation_data.action = _state.data.actions.new(f"{self.name}Action")
+        fcurve = animation_data.action.fcurves.find(data_path, index) or animation_data.action.fcurves.new(data_path, index=index)
+        fcurve.keyframe_points._items.append(Keyframe(_state.context.scene.frame_current if frame is None else frame))
+        return True
+
+class AnimData(Record):
+    def __init__(self):
+        super().__init__("animation_data", action=None)
+        object.__setattr__(self, "nla_tracks", Collection(NlaTrack))
+
+class NlaTrack(Record):
+    def __init__(self, *args, **kwargs):
+        super().__init__("nla_track", name="NlaTrack")
+        object.__setattr__(self, "strips", Collection(NlaStrip))
+
+class NlaStrip(Record):
+    def __init__(self, name="", start=0, action=None):
+        super().__init__("nla_strip", name=name, frame_start=start, action=action, scale=1.0, repeat=1.0)
+
+class Keyframe(Record):
+    def __init__(self, frame=0.0, value=0.0):
+        super().__init__("keyframe", co=Vector((frame, value)), interpolation='BEZIER')
+
+class KeyframePoints(Collection):
+    def __init__(self):
+        super().__init__(Keyframe)
+
+    def insert(self, frame, value, **kwargs):
+        record("keyframe_inserts", "keyframe_points")
+        self._items.append(Keyframe(frame, value))
+        return self._items[-1]
+
+class FCurve(Record):
+    def __init__(self, data_path="", index=0, **kwargs):
+        super().__init__("fcurve", data_path=data_path, array_index=index)
+        object.__setattr__(self, "keyframe_points", KeyframePoints())
+        object.__setattr__(self, "modifiers", Collection(lambda *args, **kwargs: Record("fcurve_modifier")))
+
+class FCurves(Collection):
+    def __init__(self):
+        super().__init__(FCurve)
+
+    def find(self, data_path, index=0):
+        return next((f for f in self._items if f.data_path == data_path and f.array_index == index), None)
+
+class Action(ID):
+    def __init__(self, name=""):
+        super().__init__(name)
+        object.__setattr__(self, "fcurves", FCurves())
+
+    @property
+    def frame_range(self):
+        frames = [key.co[0] for fcurve in self.fcurves for key in fcurve.keyframe_points]
+        return Vector((min(frames), max(frames))) if frames else Vector((0, 0))
+
+# --- meshes and objects ------------------------------------------------------
+
+class MeshElement(Record):
+    def __init__(self):
+        super().__init__("mesh_element", co=Vector(), normal=Vector((0, 0, 1)), select=False, hide=False,
+                         vertex_index=0, loop_start=0, loop_total=0, material_index=0, color=Vector((1, 1, 1, 1)))
+
+class Mesh(ID):
+    def __init__(self, name=""):
+        super().__init__(name)
+        for collection in ("vertices", "edges", "loops", "polygons"):
+            object.__setattr__(self, collection, Collection(MeshElement))
+        object.__setattr__(self, "materials", Collection())
+        object.__setattr__(self, "attributes", Collection(self._attribute))
+        object.__setattr__(self, "color_attributes", self.attributes)
+        object.__setattr__(self, "uv_layers", Collection(self._attribute))
+        object.__setattr__(self, "shape_keys", None)
+
+    def _attribute(self, name="", type='FLOAT', domain='POINT'):
+        size = len(self.loops) if domain == 'CORNER' else len(self.polygons) if domain == 'FACE' else len(self.vertices)
+        attribute = Record("attribute", name=name, data_type=type, domain=domain)
+        object.__setattr__(attribute, "data", Collection(MeshElement, [MeshElement() for _ in range(size)]))
+        return attribute
+
+    def from_pydata(self, vertices, edges, faces):
+        fill_mesh(self, [Vector(v) for v in vertices], [len(face) for face in faces])
+
+    def update(self, *args, **kwargs):
+        pass
+
+    def validate(self, *args, **kwargs):
+        return False
+
+    def transform(self, matrix):
+        for vertex in self.vertices:
+            object.__setattr__(vertex, "co", matrix @ vertex.co)
+
+def fill_mesh(mesh, positions, face_sizes):
+    vertices = []
+    for position in positions:
+        vertex = MeshElement()
+        object.__setattr__(vertex, "co", Vector(position))
+        object.__setattr__(vertex, "normal", Vector(position).normalized())
+        vertices.append(vertex)
+    polygons, loops = [], []
+    for size in face_sizes:
+        polygon = MeshElement()
+        object.__setattr__(polygon, "loop_start", len(loops))
+        object.__setattr__(polygon, "loop_total", size)
+        polygons.append(polygon)
+        for corner in range(size):
+            loop = MeshElement()
+            object.__setattr__(loop, "vertex_index", (len(loops) + corner) % max(len(vertices), 1))
+            loops.append(loop)
+        loops.extend([])
+    mesh.vertices._items[:] = vertices
+    mesh.polygons._items[:] = polygons
+    mesh.loops._items[:] = loops
+
+class Bone(Record):
+    def __init__(self, name="Bone"):
+        super().__init__("bone", name=name, head=Vector(), tail=Vector((0, 0, 1)), parent=None, use_deform=True, roll=0.0)
+
+    @property
+    def head_local(self):
+        return self.head
+
+    @property
+    def tail_local(self):
+        return self.tail
+
+class Armature(ID):
+    def __init__(self, name=""):
+        super().__init__(name)
+        object.__setattr__(self, "edit_bones", Collection(Bone, [Bone("Bone")]))
+
+    @property
+    def bones(self):
+        return self.edit_bones
+
+class Modifier(Record):
+    def __init__(self, name="", type=""):
+        super().__init__("modifier", name=name, type=type, object=None, node_group=None)
+
+class VertexGroup(Record):
+    def __init__(self, name="Group"):
+        super().__init__("vertex_group", name=name)
+
+    def add(self, indices, weight, type):
+        record("vertex_group_adds")
+
+OBJECT_TYPES = {"Mesh": 'MESH', "Armature": 'ARMATURE', "Camera": 'CAMERA', "Light": 'LIGHT', "Curve": 'CURVE'}
+
+class Object(ID):
+    def __init__(self, name="", data=None):
+        super().__init__(name)
+        for key, value in (("data", data), ("parent", None), ("location", Vector()), ("rotation_euler", Euler()),
+                           ("scale", Vector((1, 1, 1))), ("animation_data", None), ("_selected", False),
+                           ("mode", 'OBJECT'), ("instance_type", 'NONE'), ("instance_collection", None),
+                           ("rotation_mode", 'XYZ'), ("rotation_quaternion", Quaternion())):
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, "modifiers", Collection(Modifier))
+        object.__setattr__(self, "vertex_groups", Collection(VertexGroup))
+        object.__setattr__(self, "constraints", Collection(Modifier))
+        if isinstance(data, Armature):
+            object.__setattr__(self, "pose", Record("pose", bones=PoseBones(self)))
+
+    def __setattr__(self, name, value):
+        if name in ("location", "scale", "rotation_quaternion", "delta_location", "delta_scale"):
+            value = Vector(value) if not isinstance(value, Vector) else value
+        elif name == "rotation_euler":
+            value = Euler(value) if not isinstance(value, Euler) else value
+        super().__setattr__(name, value)
+
+    @property
+    def type(self):
+        return OBJECT_TYPES.get(type(self.data).__name__, 'EMPTY' if self.data is None else 'MESH')
+
+    @property
+    def children(self):
+        return [obj for obj in _state.data.objects if obj.parent is self]
+
+    @property
+    def children_recursive(self):
+        result = []
+        for child in self.children:
+            result.append(child)
+            result.extend(child.children_recursive)
+        return result
+
+    @property
+    def matrix_world(self):
+        local = Matrix.Translation(self.location) @ Matrix(np.diag(list(self.scale) + [1.0]))
+        return self.parent.matrix_world @ local if self.parent is not None else local
+
+    @property
+    def users_collection(self):
+        return [collection for collection in all_collections() if self in collection.objects._items]
+
+    @property
+    def material_slots(self):
+        materials = getattr(self.data, "materials", [])
+        return [Record("material_slot", material=material) for material in materials]
+
+    @property
+    def bound_box(self):
+        points = np.array([list(v.co) for v in getattr(self.data, "vertices", [])] or [[0.0, 0.0, 0.0]])
+        low, high = points.min(axis=0), points.max(axis=0)
+        return [[(low, high)[i >> 2 & 1][0], (low, high)[i >> 1 & 1][1], (low, high)[i & 1][2]] for i in range(8)]
+
+    def copy(self):
+        duplicate = super().copy()
+        object.__setattr__(duplicate, "modifiers", Collection(Modifier, [Modifier(m.name, m.type) for m in self.modifiers]))
+        object.__setattr__(duplicate, "vertex_groups", Collection(VertexGroup, list(self.vertex_groups)))
+        object.__setattr__(duplicate, "location", self.location.copy())
+        object.__setattr__(duplicate, "rotation_euler", self.rotation_euler.copy())
+        object.__setattr__(duplicate, "scale", self.scale.copy())
+        object.__setattr__(duplicate, "_selected", False)
+        return duplicate
+
+    def select_set(self, state):
+        object.__setattr__(self, "_selected", bool(state))
+
+    def select_get(self):
+        return self._selected
+
+    def hide_set(self, state):
+        pass
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    def to_mesh(self, *args, **kwargs):
+        return self.data
+
+    def to_mesh_clear(self):
+        pass
+
+class PoseBone(Record):
+    def __init__(self, owner, name):
+        super().__init__("pose_bone", name=name, location=Vector(), rotation_quaternion=Quaternion(),
+                         rotation_euler=Euler(), scale=Vector((1, 1, 1)))
+        object.__setattr__(self, "_owner", owner)
+
+    def keyframe_insert(self, data_path, *args, **kwargs):
+        # Keys land in the armature object's action, as in Blender
+        return self._owner.keyframe_insert(f'pose.bones["{self.name}"].{data_path}', *args, **kwargs)
+
+class PoseBones(Collection):
+    def __init__(self, owner):
+        super().__init__()
+        object.__setattr__(self, "_owner", owner)
+
+    def _sync(self):
+        names = [bone.name for bone in self._owner.data.edit_bones]
+        known = {bone.name: bone for bone in self._items}
+        self._items[:] = [known.get(name) or PoseBone(self._owner, name) for name in names]
+
+    def __getitem__(self, key):
+        self._sync()
+        return super().__getitem__(key)
+
+    def __iter__(self):
+        self._sync()
+        return super().__iter__()
+
+    def __len__(self):
+        self._sync()
+        return super().__len__()
+
+class BlendCollection(ID):
+    def __init__(self, name=""):
+        super().__init__(name)
+        object.__setattr__(self, "objects", Collection())
+        object.__setattr__(self, "children", Collection())
+        object.__setattr__(self, "hide_render", False)
+
+    @property
+    def all_objects(self):
+        objects = list(self.objects)
+        for child in self.children:
+            objects.extend(obj for obj in child.all_objects if obj not in objects)
+        return objects
+
+class NodeTree(ID):
+    def __init__(self, name="", type='ShaderNodeTree'):
+        super().__init__(name)
+        object.__setattr__(self, "nodes", Collection(lambda type="", **kwargs: Record("node", bl_idname=type, name=type, mute=False)))
+        object.__setattr__(self, "links", Collection(lambda *args, **kwargs: Record("link")))
+
+class Material(ID):
+    def __init__(self, name=""):
+        super().__init__(name)
+        tree = NodeTree(f"{name} Nodes")
+        tree.nodes._items.append(Record("node", name="Principled BSDF"))
+        tree.nodes._items.append(Record("node", name="Material Output"))
+        object.__setattr__(self, "node_tree", tree)
+
+class Scene(ID):
+    def __init__(self, name="Scene"):
+        super().__init__(name)
+        for key, value in (("collection", BlendCollection("Scene Collection")), ("camera", None), ("frame_start", 1),
+                           ("frame_end", 250), ("frame_current", 1), ("world", None)):
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, "render", Record("render", fps=24, resolution_x=1920, resolution_y=1080,
+                                                  resolution_percentage=100, filepath="/tmp/", engine='BLENDER_EEVEE'))
+
+    @property
+    def objects(self):
+        return Collection(items=self.collection.all_objects)
+
+    def frame_set(self, frame, subframe=0.0):
+        record("frame_set")
+        object.__setattr__(self, "frame_current", frame)
+
+# --- bpy.data, bpy.context, bpy.ops ------------------------------------------
+
+DATA_TYPES = {
+    "objects": Object, "meshes": Mesh, "materials": Material, "actions": Action, "armatures": Armature,
+    "collections": BlendCollection, "node_groups": NodeTree, "scenes": Scene,
+    "cameras": type("Camera", (ID,), {}), "lights": type("Light", (ID,), {}),
+    "curves": type("Curve", (ID,), {}), "images": type("Image", (ID,), {}), "textures": type("Texture", (ID,), {}),
+    "worlds": type("World", (ID,), {}),
+}
+
+class Libraries(Record):
+    # .blend libraries live in memory for the process; write() leaves an empty
+    # file so callers that rename or stat it keep working
+    written = {}
+
+    def __init__(self):
+        super().__init__("bpy.data.libraries")
+
+    def write(self, filepath, datablocks, **kwargs):
+        Libraries.written[os.path.abspath(filepath)] = list(datablocks)
+        with open(filepath, "wb"):
+            pass
+
+    @contextlib.contextmanager
+    def load(self, filepath, link=False, **kwargs):
+        # Files are often written to a temporary name and renamed into place
+        path = os.path.abspath(filepath)
+        blocks = next((blocks for written, blocks in Libraries.written.items()
+                       if written == path or written.startswith(path + ".")), [])
+        data_from = Record("data_from", collections=[block for block in blocks if isinstance(block, BlendCollection)])
+        data_to = Record("data_to", collections=[])
+        yield data_from, data_to
+        object.__setattr__(data_to, "_values", dict(data_to._values, collections=[
+            block if isinstance(block, BlendCollection) else _state.data.collections.get(block)
+            for block in data_to.collections]))
+
+class Data(Record):
+    def __init__(self):
+        super().__init__("bpy.data", filepath="")
+        for name, factory in DATA_TYPES.items():
+            object.__setattr__(self, name, Collection(factory))
+        object.__setattr__(self, "libraries", Libraries())
+
+    def batch_remove(self, ids):
+        for block in list(ids):
+            unlink_everywhere(block)
+
+    def orphans_purge(self, *args, **kwargs):
+        return 0
+
+class Context(Record):
+    def __init__(self, data):
+        super().__init__("bpy.context")
+        scene = data.scenes.new("Scene")
+        view_layer = Record("view_layer")
+        object.__setattr__(view_layer, "objects", Record("view_layer.objects", active=None))
+        object.__setattr__(view_layer, "update", lambda: record("view_layer_updates"))
+        object.__setattr__(self, "scene", scene)
+        object.__setattr__(self, "view_layer", view_layer)
+        object.__setattr__(self, "preferences", Record("preferences"))
+        object.__setattr__(self, "_overrides", {})
+
+    def __getattr__(self, name):
+        overrides = object.__getattribute__(self, "_overrides")
+        if name in overrides:
+            return overrides[name]
+        if name in ("active_object", "object"):
+            return self.view_layer.objects.active
+        if name in ("selected_objects", "selected_editable_objects"):
+            return [obj for obj in self.scene.objects if obj.select_get()]
+        if name == "collection":
+            return self.scene.collection
+        return super().__getattr__(name)
+
+    @contextlib.contextmanager
+    def temp_override(self, **overrides):
+        saved = dict(self._overrides)
+        self._overrides.update(overrides)
+        try:
+            yield self
+        finally:
+            object.__setattr__(self, "_overrides", saved)
+
+    def evaluated_depsgraph_get(self):
+        return Record("depsgraph")
+
+def all_collections():
+    return [_state.context.scene.collection] + list(_state.data.collections)
+
+def data_collection(block):
+    for name, factory in DATA_TYPES.items():
+        if isinstance(block, factory):
+            return getattr(_state.data, name)
+    return Collection()
+
+def unlink_everywhere(block):
+    collection = data_collection(block)
+    if block in collection._items:
+        collection._items.remove(block)
+    if isinstance(block, Object):
+        for owner in all_collections():
+            owner.objects.unlink(block)
+        if _state.context.view_layer.objects.active is block:
+            object.__setattr__(_state.context.view_layer.objects, "_values", {"active": None})
+
+def count_users(block):
+    users = 0
+    for owner in all_collections():
+        users += block in owner.objects._items or block in owner.children._items
+    for obj in _state.data.objects:
+        users += obj.data is block
+        users += block in getattr(obj.data, "materials", [])
+        animation_data = obj.__dict__.get("animation_data")
+        users += animation_data is not None and animation_data.action is block
+    return users + bool(block.use_fake_user)
+
+PRIMITIVES = {
+    # operator: (vertex count, face sizes) from the operator's keyword arguments
+    "primitive_cube_add": lambda kw: (8, [4] * 6),
+    "primitive_plane_add": lambda kw: (4, [4]),
+    "primitive_grid_add": lambda kw: (kw.get("x_subdivisions", 10) * kw.get("y_subdivisions", 10), [4] * (kw.get("x_subdivisions", 10) - 1) * (kw.get("y_subdivisions", 10) - 1)),
+    "primitive_circle_add": lambda kw: (kw.get("vertices", 32), [kw.get("vertices", 32)]),
+    "primitive_uv_sphere_add": lambda kw: (kw.get("segments", 32) * (kw.get("ring_count", 16) - 1) + 2, [4] * kw.get("segments", 32) * kw.get("ring_count", 16)),
+    "primitive_ico_sphere_add": lambda kw: (10 * 4 ** (kw.get("subdivisions", 2) - 1) + 2, [3] * 20 * 4 ** (kw.get("subdivisions", 2) - 1)),
+    "primitive_cylinder_add": lambda kw: (2 * kw.get("vertices", 32), [4] * kw.get("vertices", 32) + [kw.get("vertices", 32)] * 2),
+    "primitive_cone_add": lambda kw: (kw.get("vertices", 32) + 1, [3] * kw.get("vertices", 32) + [kw.get("vertices", 32)]),
+    "primitive_torus_add": lambda kw: (48 * 12, [4] * 48 * 12),
+}
+
+def add_object(name, data, kwargs):
+    obj = _state.data.objects.new(name, data)
+    for key in ("location", "rotation", "scale"):
+        if key in kwargs:
+            object.__setattr__(obj, "rotation_euler" if key == "rotation" else key,
+                               (Euler if key == "rotation" else Vector)(kwargs[key]))
+    _state.context.collection.objects.link(obj)
+    for other in _state.context.scene.objects:
+        other.select_set(False)
+    obj.select_set(True)
+    object.__setattr__(_state.context.view_layer.objects, "_values", {"active": obj})
+    return obj
+
+def add_primitive(operator, kwargs):
+    count, faces = PRIMITIVES[operator](kwargs)
+    size = kwargs.get("size", 2 * kwargs.get("radius", kwargs.get("radius1", 1)))
+    # Deterministic points on a sphere stand in for the real vertex layout
+    index = np.arange(count) + 0.5
+    polar = np.arccos(1 - 2 * index / max(count, 1))
+    azimuth = math.pi * (1 + 5 ** 0.5) * index
+    positions = np.stack([np.cos(azimuth) * np.sin(polar), np.sin(azimuth) * np.sin(polar), np.cos(polar)], axis=-1) * size / 2
+    name = operator[len("primitive_"):-len("_add")].replace("_", " ").title().replace(" ", "")
+    mesh = _state.data.meshes.new(name)
+    fill_mesh(mesh, positions.tolist(), faces)
+    return add_object(name, mesh, kwargs)
+
+def select_all(action='TOGGLE', **kwargs):
+    objects = list(_state.context.scene.objects)
+    state = action == 'SELECT' or (action == 'TOGGLE' and not any(obj.select_get() for obj in objects))
+    for obj in objects:
+        obj.select_set(state)
+
+def delete(**kwargs):
+    _state.data.batch_remove([obj for obj in _state.context.scene.objects if obj.select_get()])
+
+def join(**kwargs):
+    target = _state.context.active_object
+    for obj in _state.context.selected_editable_objects:
+        if obj is not target and obj.type == 'MESH':
+            mesh = target.data
+            mesh.vertices._items.extend(obj.data.vertices)
+            mesh.polygons._items.extend(obj.data.polygons)
+            mesh.loops._items.extend(obj.data.loops)
+            _state.data.batch_remove([obj])
+
+def write_placeholder(filepath="", **kwargs):
+    # Exports and renders leave an empty file so callers can stat it
+    path = filepath or _state.context.scene.render.filepath
+    if path and not path.startswith("//") and os.path.isdir(os.path.dirname(path) or "."):
+        if os.path.isdir(path):
+            return
+        with open(path if os.path.splitext(path)[1] else path + ".png", "wb"):
+            pass
+
+def render(write_still=False, **kwargs):
+    if write_still:
+        write_placeholder(_state.context.scene.render.filepath)
+
+def read_factory_settings(use_empty=False, **kwargs):
+    reset(use_empty)
+
+OPERATORS = {
+    "object.select_all": select_all,
+    "object.delete": delete,
+    "object.join": join,
+    "object.mode_set": lambda mode='OBJECT', **kwargs: _state.context.active_object is not None and object.__setattr__(_state.context.active_object, "mode", mode),
+    "object.camera_add": lambda **kwargs: add_object("Camera", _state.data.cameras.new("Camera"), kwargs),
+    "object.light_add": lambda type='POINT', **kwargs: add_object(type.title(), _state.data.lights.new(type.title()), kwargs),
+    "object.empty_add": lambda **kwargs: add_object("Empty", None, kwargs),
+    "object.armature_add": lambda **kwargs: add_object("Armature", _state.data.armatures.new("Armature"), kwargs),
+    "export_scene.fbx": write_placeholder,
+    "export_scene.gltf": write_placeholder,
+    "render.render": render,
+    "wm.save_as_mainfile": write_placeholder,
+    "wm.read_factory_settings": read_factory_settings,
+    "wm.read_homefile": read_factory_settings,
+}
+
+class Operator:
+    def __init__(self, idname):
+        self.idname = idname
+
+    def __call__(self, *args, **kwargs):
+        record("operator_calls", self.idname)
+        module, name = self.idname.split(".")
+        if module == "mesh" and name in PRIMITIVES:
+            add_primitive(name, kwargs)
+        elif self.idname in OPERATORS:
+            OPERATORS[self.idname](**kwargs)
+        return {'FINISHED'}
+
+    def poll(self):
+        return True
+
+class OperatorModule:
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Operator(f"{self._module}.{name}")
+
+class Ops:
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return OperatorModule(name)
+
+class Types(types.ModuleType):
+    # bpy.types.<Name> resolves to a class, so isinstance checks work
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cls = type(name, (Record,), {})
+        setattr(self, name, cls)
+        return cls
+
+class _State:
+    data = None
+    context = None
+
+_state = _State()
+
+def reset(use_empty=False):
+    # Like the factory startup file: a cube, a camera and a light unless empty
+    data = Data()
+    _state.data = data
+    _state.context = Context(data)
+    bpy.data = data
+    bpy.context = _state.context
+    if not use_empty:
+        add_primitive("primitive_cube_add", {"size": 2})
+        OPERATORS["object.camera_add"](location=(7.4, -6.9, 5))
+        OPERATORS["object.light_add"](type='POINT', location=(4, 1, 6))
+
+bpy = types.ModuleType("bpy")
+bpy.ops = Ops()
+bpy.types = Types("bpy.types")
+bpy.app = Record("bpy.app", version=(4, 2, 0), version_string="4.2.0 (stand-in)", background=True)
+bpy.utils = Record("bpy.utils")
+bpy.props = Record("bpy.props")
+bpy.path = Record("bpy.path", abspath=lambda path, **kwargs: path)
+
+mathutils = types.ModuleType("mathutils")
+for cls in (Vector, Euler, Quaternion, Color, Matrix):
+    setattr(mathutils, cls.__name__, cls)
+
+def install(recorder=None):
+    # The factory scene is not the generator's doing, so it is built unrecorded
+    global _recorder
+    _recorder = None
+    reset()
+    _recorder = recorder
+    sys.modules["bpy"] = bpy
+    sys.modules["mathutils"] = mathutils
+    return bpy
@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import runpy
+import sys
+import tempfile
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Counts what a generator asks of Blender: bpy.ops operator calls, RNA property
+# writes, keyframe inserts, datablock creations, frame_set calls and view layer
+# updates, attributed to the generator phase they happen in. A phase is the
+# outermost function of the generator script on the call stack (create_tree,
+# scatter_rocks, ...) that is not one of the DRIVERS that only sequence the
+# phases, or a name set explicitly with Tracer.phase(). Under the
+# bpy_standin module every kind is counted; inside real Blender only operator
+# calls can be hooked, so the other kinds are totals taken from bpy.data.
+KINDS = ("operator_calls", "property_writes", "keyframe_inserts", "datablocks_created", "frame_set", "view_layer_updates")
+TOP_LEVEL = "<module>"
+# Component lambdas handed to scene_rebuild only forward to the phase proper
+DRIVERS = (TOP_LEVEL, "main", "build_scene", "<lambda>")
+# Budgets written by --update-budget allow the measured count times HEADROOM
+# plus SLACK, so a harmless extra call or two does not fail the check while a
+# per-object call sneaking into a loop still does. Checked in CI with
+#   python -m pytest tests/test_call_budgets.py
+HEADROOM = 1.2
+SLACK = 5
+BUDGETED_PHASES = 2
+
+class Tracer:
+    def __init__(self, script):
+        self.script = os.path.abspath(script)
+        self.counts = defaultdict(Counter)
+        self.operators = defaultdict(Counter)
+        self._phase = None
+
+    def current_phase(self):
+        if self._phase:
+            return self._phase
+        frame = sys._getframe(2)
+        phase = TOP_LEVEL
+        while frame is not None:
+            code = frame.f_code
+            qualname = getattr(code, "co_qualname", code.co_name)
+            # Closures inside main (build_and_export for the asset cache) are drivers too
+            if code.co_filename == self.script and code.co_name not in DRIVERS and not qualname.startswith("main.<locals>."):
+                phase = code.co_name
+            frame = frame.f_back
+        return phase
+
+    def record(self, kind, detail=None):
+        phase = self.current_phase()
+        self.counts[phase][kind] += 1
+        if kind == "operator_calls":
+            self.operators[phase][detail] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        previous, self._phase = self._phase, name
+        try:
+            yield
+        finally:
+            self._phase = previous
+
+    def totals(self):
+        totals = Counter()
+        for counts in self.counts.values():
+            totals.update(counts)
+        return totals
+
+    def report(self):
+        return {
+            "script": os.path.basename(self.script),
+            "totals": {kind: self.totals()[kind] for kind in KINDS},
+            "phases": {phase: {kind: counts[kind] for kind in KINDS if counts[kind]} for phase, counts in self.counts.items()},
+            "operators": {phase: dict(operators.most_common()) for phase, operators in self.operators.items()},
+        }
+
+    def budget(self):
+        # Totals for every kind, operator calls for the busiest phases
+        def limit(count):
+            return math.ceil(count * HEADROOM) + SLACK
+        totals = self.totals()
+        busiest = sorted(self.counts, key=lambda phase: -self.counts[phase]["operator_calls"])[:BUDGETED_PHASES]
+        return {
+            "totals": {kind: limit(totals[kind]) for kind in KINDS},
+            "phases": {phase: {"operator_calls": limit(self.counts[phase]["operator_calls"])}
+                       for phase in busiest if self.counts[phase]["operator_calls"]},
+        }
+
+    def check(self, budgets):
+        # budgets: {"totals": {kind: max}, "phases": {phase: {kind: max}}}
+        violations = []
+        totals = self.totals()
+        for kind, limit in budgets.get("totals", {}).items():
+            if totals[kind] > limit:
+                violations.append(f"{kind}: {totals[kind]} > {limit}")
+        for phase, limits in budgets.get("phases", {}).items():
+            for kind, limit in limits.items():
+                if self.counts[phase][kind] > limit:
+                    violations.append(f"{phase} {kind}: {self.counts[phase][kind]} > {limit}")
+        return violations
+
+def datablock_counts(bpy):
+    return Counter({
+        "datablocks_created": sum(len(collection) for collection in (
+            bpy.data.objects, bpy.data.meshes, bpy.data.materials, bpy.data.actions,
+            bpy.data.armatures, bpy.data.collections, bpy.data.node_groups)),
+        "keyframe_inserts": sum(len(fcurve.keyframe_points) for action in bpy.data.actions for fcurve in action.fcurves),
+    })
+
+@contextlib.contextmanager
+def trace_blender(tracer):
+    # Inside Blender: wrap the operator call class, diff bpy.data afterwards
+    import bpy
+    from bpy.ops import _BPyOpsSubModOp as Operator
+
+    call = Operator.__call__
+    def traced_call(self, *args, **kwargs):
+        tracer.record("operator_calls", self.idname_py())
+        return call(self, *args, **kwargs)
+
+    before = datablock_counts(bpy)
+    Operator.__call__ = traced_call
+    try:
+        yield
+    finally:
+        Operator.__call__ = call
+        after = datablock_counts(bpy)
+        after.subtract(before)
+        tracer.counts[TOP_LEVEL].update({kind: max(count, 0) for kind, count in after.items()})
+
+def local_modules(directory):
+    # Modules imported from the script's directory, except the tracing ones
+    return {name: module for name, module in sys.modules.items()
+            if name not in ("bpy_standin", "bpy_trace")
+            and os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "/")) == directory}
+
+@contextlib.contextmanager
+def trace_standin(tracer):
+    # Stand-in .blend, thumbnail and exported asset files must never land in
+    # the real caches (and a cached asset would skip the calls being counted).
+    # Helpers read their cache directories at import, so the script imports
+    # fresh copies of its local modules and the previous ones come back after.
+    import bpy_standin
+    saved = {name: sys.modules.get(name) for name in ("bpy", "mathutils")}
+    saved_modules = local_modules(os.path.dirname(tracer.script))
+    for name in saved_modules:
+        del sys.modules[name]
+    saved_env = {name: os.environ.get(name) for name in ("ARCHETYPE_LIBRARY_DIR", "THUMBNAIL_CACHE_DIR", "ASSET_CACHE_DIR")}
+    cache_dir = tempfile.TemporaryDirectory()
+    for name in saved_env:
+        os.environ[name] = os.path.join(cache_dir.name, name.lower())
+    bpy_standin.install(tracer.record)
+    try:
+        yield
+    finally:
+        bpy_standin.install(None)
+        cache_dir.cleanup()
+        for name in local_modules(os.path.dirname(tracer.script)):
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+def in_blender():
+    try:
+        import bpy
+    except ImportError:
+        return False
+    return hasattr(bpy, "app") and not getattr(bpy.app, "version_string", "").endswith("(stand-in)")
+
+def run_script(script, args=(), standin=None, seed=0):
+    # Runs the script as __main__ with Blender-style "-- args" and returns the
+    # tracer. Global RNGs are seeded so counts of randomized scenes repeat.
+    tracer = Tracer(script)
+    random.seed(seed)
+    np.random.seed(seed)
+    standin = not in_blender() if standin is None else standin
+    saved_argv = sys.argv
+    sys.argv = [script, "--", *args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        with (trace_standin if standin else trace_blender)(tracer):
+            runpy.run_path(tracer.script, run_name="__main__")
+    finally:
+        sys.argv = saved_argv
+        sys.path.pop(0)
+    return tracer
+
+def budget_for(budgets, script, args):
+    # Budgets are keyed by script file name, with the arguments appended if any
+    key = " ".join([os.path.basename(script), *args])
+    return budgets.get(key)
+
+def print_report(report):
+    print(f"{report['script']}: " + ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in report["totals"].items()))
+    for phase, counts in sorted(report["phases"].items(), key=lambda item: -item[1].get("operator_calls", 0)):
+        print(f"  {phase:<32}" + "".join(f"{counts.get(kind, 0):>10}" for kind in KINDS))
+        for operator, count in list(report["operators"].get(phase, {}).items())[:3]:
+            print(f"    {operator:<30}{count:>10}")
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    script_args = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+    parser = argparse.ArgumentParser(description="Count bpy calls per generator phase and check them against a budget")
+    parser.add_argument("script")
+    parser.add_argument("--budget", help="JSON file of call budgets keyed by script name (e.g. call_budgets.json)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--update-budget", action="store_true", help="Write this run's counts plus headroom into the --budget file")
+    args = parser.parse_args(argv)
+
+    tracer = run_script(args.script, script_args)
+    report = tracer.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.budget and args.update_budget:
+        with open(args.budget) as f:
+            budgets = json.load(f)
+        budgets[" ".join([os.path.basename(args.script), *script_args])] = tracer.budget()
+        with open(args.budget, "w") as f:
+            json.dump(budgets, f, indent=2)
+            f.write("\n")
+    elif args.budget:
+        with open(args.budget) as f:
+            budget = budget_for(json.load(f), args.script, script_args)
+        if budget is None:
+            sys.exit(f"No budget for {args.script} {' '.join(script_args)}")
+        violations = tracer.check(budget)
+        for violation in violations:
+            print(f"over budget: {violation}", file=sys.stderr)
+        sys.exit(1 if violations else 0)
@@ -1,6 +1,56 @@
 import bpy
+import argparse
+import json
 import math
-import random
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import asset_cache
+import lod_chain
+import scene_rebuild
+import seeding
+
+# The hard-coded ship; fleet variants draw every entry from PARAMETER_SPACE
+DEFAULT_DESIGN = {
+    "hull": [1, 2, 0.5],
+    "wing_pairs": 1,
+    "wing_size": [0.5, 1.5],
+    "engine_pairs": 1,
+    "weapon_pairs": 1,
+    "antenna": True,
+    "palette": {
+        "body": [0.2, 0.2, 0.8, 1],
+        "cockpit": [0.8, 0.8, 1, 0.5],
+        "wing": [0.5, 0.5, 0.5, 1],
+        "engine": [0.2, 0.2, 0.2, 1],
+        "thruster": [0.8, 0.4, 0.1, 1],
+        "antenna": [0.1, 0.1, 0.1, 1],
+        "weapon": [0.3, 0.3, 0.3, 1],
+    },
+}
+
+PARAMETER_SPACE = {
+    "hull_width": [0.7, 1.4],
+    "hull_length": [1.5, 3.0],
+    "hull_height": [0.3, 0.7],
+    "wing_pairs": [1, 2],
+    "wing_width": [0.3, 0.8],
+    "wing_length": [1.0, 2.0],
+    "engine_pairs": [1, 3],
+    "weapon_pairs": [0, 3],
+    "antenna_chance": 0.7,
+    "palettes": [
+        DEFAULT_DESIGN["palette"],
+        {"body": [0.6, 0.1, 0.1, 1], "cockpit": [1, 0.9, 0.6, 0.5], "wing": [0.3, 0.3, 0.3, 1], "engine": [0.15, 0.15, 0.15, 1],
+         "thruster": [0.2, 0.6, 1, 1], "antenna": [0.1, 0.1, 0.1, 1], "weapon": [0.8, 0.7, 0.2, 1]},
+        {"body": [0.85, 0.85, 0.8, 1], "cockpit": [0.2, 0.3, 0.5, 0.5], "wing": [0.9, 0.4, 0.1, 1], "engine": [0.3, 0.3, 0.35, 1],
+         "thruster": [0.9, 0.2, 0.8, 1], "antenna": [0.9, 0.4, 0.1, 1], "weapon": [0.2, 0.2, 0.2, 1]},
+        {"body": [0.1, 0.35, 0.15, 1], "cockpit": [0.7, 1, 0.7, 0.5], "wing": [0.4, 0.35, 0.25, 1], "engine": [0.1, 0.1, 0.1, 1],
+         "thruster": [1, 0.8, 0.2, 1], "antenna": [0.4, 0.35, 0.25, 1], "weapon": [0.5, 0.5, 0.5, 1]},
+    ],
+}
 
 def clear_scene():
     bpy.ops.object.select_all(action='SELECT')
@@ -12,27 +62,27 @@ def create_material(name, color):
     material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = color
     return material
 
-def create_spaceship_body():
-    bpy.ops.mesh.primitive_uv_sphere_add(segments=16, ring_count=8, radius=1, enter_editmode=False, location=(0, 0, 0))
+def create_spaceship_body(segments=16, proportions=(1, 2, 0.5), color=(0.2, 0.2, 0.8, 1)):
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=segments // 2, radius=1, enter_editmode=False, location=(0, 0, 0))
     body = bpy.context.active_object
     body.name = "SpaceshipBody"
     
     # Flatten the sphere to make it more ship-like
-    body.scale = (1, 2, 0.5)
+    body.scale = proportions
     
     # Add material
-    body_material = create_material("BodyMaterial", (0.2, 0.2, 0.8, 1))
+    body_material = create_material("BodyMaterial", color)
     body.data.materials.append(body_material)
     
     return body
 
-def create_cockpit(body):
-    bpy.ops.mesh.primitive_uv_sphere_add(segments=16, ring_count=8, radius=0.3, enter_editmode=False, location=(0, 0.8, 0.3))
+def create_cockpit(body, segments=16, color=(0.8, 0.8, 1, 0.5)):
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=segments, ring_count=segments // 2, radius=0.3, enter_editmode=False, location=(0, 0.8, 0.3))
     cockpit = bpy.context.active_object
     cockpit.name = "Cockpit"
     
     # Add material
-    cockpit_material = create_material("CockpitMaterial", (0.8, 0.8, 1, 0.5))
+    cockpit_material = create_material("CockpitMaterial", color)
     cockpit.data.materials.append(cockpit_material)
     
     # Parent to body
@@ -40,16 +90,20 @@ def create_cockpit(body):
     
     return cockpit
 
-def create_wing(body, side):
-    bpy.ops.mesh.primitive_cube_add(size=1, enter_editmode=False, location=(side * 0.8, 0, 0))
+def part_name(name, side, index):
+    # Extra pairs get an index suffix; the first pair keeps the original names
+    return f"{name}_{side}" if index == 0 else f"{name}_{side}_{index}"
+
+def create_wing(body, side, index=0, size=(0.5, 1.5), color=(0.5, 0.5, 0.5, 1)):
+    bpy.ops.mesh.primitive_cube_add(size=1, enter_editmode=False, location=(side * (0.8 + 0.1 * index), -0.5 * index, 0.1 * index))
     wing = bpy.context.active_object
-    wing.name = f"Wing_{side}"
+    wing.name = part_name("Wing", side, index)
     
     # Shape the wing
-    wing.scale = (0.5, 1.5, 0.1)
+    wing.scale = (size[0], size[1] * 0.7 ** index, 0.1)
     
     # Add material
-    wing_material = create_material(f"WingMaterial_{side}", (0.5, 0.5, 0.5, 1))
+    wing_material = create_material(part_name("WingMaterial", side, index), color)
     wing.data.materials.append(wing_material)
     
     # Parent to body
@@ -57,13 +111,13 @@ def create_wing(body, side):
     
     return wing
 
-def create_engine(body, side):
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.2, depth=0.5, enter_editmode=False, location=(side * 0.5, -1, -0.1))
+def create_engine(body, side, segments=16, index=0, color=(0.2, 0.2, 0.2, 1)):
+    bpy.ops.mesh.primitive_cylinder_add(vertices=segments * 2, radius=0.2, depth=0.5, enter_editmode=False, location=(side * (0.5 + 0.45 * index), -1, -0.1 - 0.05 * index))
     engine = bpy.context.active_object
-    engine.name = f"Engine_{side}"
+    engine.name = part_name("Engine", side, index)
     
     # Add material
-    engine_material = create_material(f"EngineMaterial_{side}", (0.2, 0.2, 0.2, 1))
+    engine_material = create_material(part_name("EngineMaterial", side, index), color)
     engine.data.materials.append(engine_material)
     
     # Parent to body
@@ -71,13 +125,13 @@ def create_engine(body, side):
     
     return engine
 
-def create_thruster(engine):
-    bpy.ops.mesh.primitive_cone_add(radius1=0.15, radius2=0.1, depth=0.2, enter_editmode=False, location=(engine.location.x, engine.location.y - 0.3, engine.location.z))
+def create_thruster(engine, segments=16, color=(0.8, 0.4, 0.1, 1)):
+    bpy.ops.mesh.primitive_cone_add(vertices=segments * 2, radius1=0.15, radius2=0.1, depth=0.2, enter_editmode=False, location=(engine.location.x, engine.location.y - 0.3, engine.location.z))
     thruster = bpy.context.active_object
     thruster.name = f"Thruster_{engine.name}"
     
     # Add material
-    thruster_material = create_material(f"ThrusterMaterial_{engine.name}", (0.8, 0.4, 0.1, 1))
+    thruster_material = create_material(f"ThrusterMaterial_{engine.name}", color)
     thruster.data.materials.append(thruster_material)
     
     # Parent to engine
@@ -85,13 +139,13 @@ def create_thruster(engine):
     
     return thruster
 
-def create_antenna(body):
-    bpy.ops.mesh.primitive_cylinder_add(radius=0.02, depth=0.3, enter_editmode=False, location=(0, 0, 0.3))
+def create_antenna(body, segments=16, color=(0.1, 0.1, 0.1, 1)):
+    bpy.ops.mesh.primitive_cylinder_add(vertices=segments * 2, radius=0.02, depth=0.3, enter_editmode=False, location=(0, 0, 0.3))
     antenna = bpy.context.active_object
     antenna.name = "Antenna"
     
     # Add material
-    antenna_material = create_material("AntennaMaterial", (0.1, 0.1, 0.1, 1))
+    antenna_material = create_material("AntennaMaterial", color)
     antenna.data.materials.append(antenna_material)
     
     # Parent to body
@@ -99,16 +153,16 @@ def create_antenna(body):
     
     return antenna
 
-def create_weapon(body, side):
-    bpy.ops.mesh.primitive_cube_add(size=0.2, enter_editmode=False, location=(side * 0.5, 0.5, -0.1))
+def create_weapon(body, side, index=0, color=(0.3, 0.3, 0.3, 1)):
+    bpy.ops.mesh.primitive_cube_add(size=0.2, enter_editmode=False, location=(side * (0.5 + 0.25 * index), 0.5 - 0.3 * index, -0.1))
     weapon = bpy.context.active_object
-    weapon.name = f"Weapon_{side}"
+    weapon.name = part_name("Weapon", side, index)
     
     # Shape the weapon
     weapon.scale = (0.1, 0.3, 0.1)
     
     # Add material
-    weapon_material = create_material(f"WeaponMaterial_{side}", (0.3, 0.3, 0.3, 1))
+    weapon_material = create_material(part_name("WeaponMaterial", side, index), color)
     weapon.data.materials.append(weapon_material)
     
     # Parent to body
@@ -151,7 +205,7 @@ def add_weapon_rotation(weapon):
         z_value = math.radians(360 * frame / 100)
         fcurve.keyframe_points.insert(frame, z_value)
 
-def add_thruster_flicker(light):
+def add_thruster_flicker(light, rng):
     light.animation_data_create()
     action = bpy.data.actions.new(name=f"ThrusterFlicker_{light.name}")
     light.animation_data.action = action
@@ -159,7 +213,7 @@ def add_thruster_flicker(light):
     # Animate light energy
     fcurve = action.fcurves.new(data_path="data.energy")
     for frame in range(100):
-        energy = 10 + random.uniform(-2, 2)
+        energy = 10 + rng.uniform(-2, 2)
         fcurve.keyframe_points.insert(frame, energy)
 
 def setup_camera_and_lighting():
@@ -173,40 +227,63 @@ def setup_camera_and_lighting():
     sun = bpy.context.active_object
     sun.data.energy = 2
 
-def main():
-    clear_scene()
+def build_spaceship(segments=16, with_lights=True, design=DEFAULT_DESIGN, seed=0):
+    palette = design["palette"]
     
     # Create spaceship components
-    body = create_spaceship_body()
-    cockpit = create_cockpit(body)
-    
-    wing_left = create_wing(body, -1)
-    wing_right = create_wing(body, 1)
+    body = create_spaceship_body(segments, design["hull"], palette["body"])
+    create_cockpit(body, segments, palette["cockpit"])
     
-    engine_left = create_engine(body, -1)
-    engine_right = create_engine(body, 1)
+    for index in range(design["wing_pairs"]):
+        for side in (-1, 1):
+            create_wing(body, side, index, design["wing_size"], palette["wing"])
     
-    thruster_left = create_thruster(engine_left)
-    thruster_right = create_thruster(engine_right)
+    engines = []
+    for index in range(design["engine_pairs"]):
+        for side in (-1, 1):
+            engine = create_engine(body, side, segments, index, palette["engine"])
+            engines.append((engine, create_thruster(engine, segments, palette["thruster"])))
     
-    antenna = create_antenna(body)
+    if design["antenna"]:
+        create_antenna(body, segments, palette["antenna"])
     
-    weapon_left = create_weapon(body, -1)
-    weapon_right = create_weapon(body, 1)
-    
-    # Add engine glow
-    glow_left = add_engine_glow(engine_left, thruster_left)
-    glow_right = add_engine_glow(engine_right, thruster_right)
+    weapons = [
+        create_weapon(body, side, index, palette["weapon"])
+        for index in range(design["weapon_pairs"])
+        for side in (-1, 1)
+    ]
     
     # Add animations
     add_hover_animation(body)
-    add_weapon_rotation(weapon_left)
-    add_weapon_rotation(weapon_right)
-    add_thruster_flicker(glow_left)
-    add_thruster_flicker(glow_right)
+    for weapon in weapons:
+        add_weapon_rotation(weapon)
     
-    setup_camera_and_lighting()
+    # Add engine glow
+    if with_lights:
+        rng = seeding.stream(seed, "thruster_flicker")
+        for engine, thruster in engines:
+            add_thruster_flicker(add_engine_glow(engine, thruster), rng)
     
+    return body
+
+def random_design(seed, space=PARAMETER_SPACE):
+    rng = seeding.stream(seed, "design")
+    return {
+        "hull": [rng.uniform(*space["hull_width"]), rng.uniform(*space["hull_length"]), rng.uniform(*space["hull_height"])],
+        "wing_pairs": rng.randint(*space["wing_pairs"]),
+        "wing_size": [rng.uniform(*space["wing_width"]), rng.uniform(*space["wing_length"])],
+        "engine_pairs": rng.randint(*space["engine_pairs"]),
+        "weapon_pairs": rng.randint(*space["weapon_pairs"]),
+        "antenna": rng.random() < space["antenna_chance"],
+        "palette": rng.choice(space["palettes"]),
+    }
+
+def reset_scene():
+    # Much cheaper than select/delete: one batch removal of every object and
+    # the meshes, materials, lights and actions only they used
+    scene_rebuild.remove_objects(list(bpy.data.objects))
+
+def configure_scene():
     # Set up animation
     bpy.context.scene.frame_start = 0
     bpy.context.scene.frame_end = 100
@@ -218,8 +295,104 @@ def main():
     bpy.context.scene.render.resolution_x = 1920
     bpy.context.scene.render.resolution_y = 1080
 
+def add_lods(body, levels, lod_mode, design=DEFAULT_DESIGN):
+    # Regenerated levels halve the segment count each time: 16 -> 8 -> 4
+    rebuild = None
+    if lod_mode == "regenerate":
+        rebuild = lambda level, ratio: build_spaceship(max(int(16 * ratio), 4), with_lights=False, design=design)
+    return lod_chain.build_lods([body], lod_chain.lod_ratios(levels), rebuild=rebuild)
+
+def export_fbx(export_path):
+    bpy.ops.export_scene.fbx(filepath=export_path, use_selection=False, use_mesh_modifiers=True)
+
+def generate_fleet(seeds, output_dir, space=PARAMETER_SPACE, lods=0, lod_mode="regenerate", use_cache=True):
+    # Every variant reuses this warm Blender session; only the datablocks of
+    # the previous ship are removed in between. A variant already in the asset
+    # cache (same generator version, design and LOD settings) is copied instead.
+    os.makedirs(output_dir, exist_ok=True)
+    configure_scene()
+    manifest = []
+    for seed in seeds:
+        design = random_design(seed, space)
+        export_path = os.path.join(output_dir, f"spaceship_{seed:05d}.fbx")
+        
+        def build_and_export(path):
+            start = time.perf_counter()
+            reset_scene()
+            body = build_spaceship(design=design, seed=seed)
+            if lods:
+                add_lods(body, lods, lod_mode, design)
+            build_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            export_fbx(path)
+            return {"objects": len(bpy.data.objects), "build_seconds": round(build_seconds, 4),
+                    "export_seconds": round(time.perf_counter() - start, 4)}
+        
+        if use_cache:
+            params = {"design": design, "lods": lods, "lod_mode": lod_mode}
+            stats, cache_hit = asset_cache.memoize(os.path.abspath(__file__), params, seed, export_path, build_and_export)
+        else:
+            stats, cache_hit = build_and_export(export_path), False
+        manifest.append({
+            "seed": seed,
+            "file": os.path.basename(export_path),
+            "bytes": os.path.getsize(export_path),
+            "objects": stats["objects"],
+            "design": design,
+            # A cached variant cost nothing to build this time
+            "build_seconds": 0 if cache_hit else stats["build_seconds"],
+            "export_seconds": 0 if cache_hit else stats["export_seconds"],
+            "cached": cache_hit,
+        })
+    return manifest
+
+def parse_seeds(value):
+    first, _, last = value.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate a detailed animated spaceship")
+    parser.add_argument("--lods", type=int, default=0, help="Number of lower levels of detail to add after LOD0")
+    parser.add_argument("--lod-mode", choices=("decimate", "regenerate"), default="regenerate",
+                        help="Decimate copies of LOD0 or rebuild the ship with fewer segments per level")
+    parser.add_argument("--fleet", type=parse_seeds, metavar="SEEDS", help="Generate one variant per seed in a range such as 0-99")
+    parser.add_argument("--seeds", type=int, nargs="*", help="Explicit seeds for --fleet mode (overrides the range)")
+    parser.add_argument("--space", help="JSON file overriding entries of the fleet parameter space")
+    parser.add_argument("--output-dir", default=os.path.join(os.path.expanduser("~"), "Desktop", "spaceship_fleet"))
+    parser.add_argument("--manifest", help="Write the fleet manifest as JSON to this path (default: manifest.json in the output directory)")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild fleet variants instead of reusing cached exports")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def main():
+    args = parse_args()
+    
+    if args.fleet is not None or args.seeds:
+        space = dict(PARAMETER_SPACE)
+        if args.space:
+            with open(args.space) as f:
+                space.update(json.load(f))
+        manifest = generate_fleet(args.seeds or args.fleet, args.output_dir, space, args.lods, args.lod_mode, not args.no_cache)
+        manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.json")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Generated {len(manifest)} spaceships in {args.output_dir}")
+        return
+    
+    clear_scene()
+    
+    body = build_spaceship()
+    
+    if args.lods:
+        report = add_lods(body, args.lods, args.lod_mode)
+        lod_chain.print_lod_report(report)
+    
+    setup_camera_and_lighting()
+    configure_scene()
+
     # Export as FBX
-    bpy.ops.export_scene.fbx(filepath="//detailed_spaceship.fbx", use_selection=False)
+    export_fbx("//detailed_spaceship.fbx")
     print("Detailed spaceship created and exported as FBX.")
 
 if __name__ == "__main__":
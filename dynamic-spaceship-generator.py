@@ -1,6 +1,12 @@
 import bpy
+import argparse
 import math
+import os
 import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import lod_chain
 
 def clear_scene():
     bpy.ops.object.select_all(action='SELECT')
@@ -134,7 +140,15 @@ def setup_camera_and_lighting():
     sun = bpy.context.active_object
     sun.data.energy = 3
 
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate a spaceship flying a complex path")
+    parser.add_argument("--lods", type=int, default=0, help="Number of decimated levels of detail to add after LOD0")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
 def main():
+    args = parse_args()
     clear_scene()
     
     body = create_spaceship_body()
@@ -147,6 +161,10 @@ def main():
     add_complex_flight_path(body)
     add_engine_pulsing(engine_lights)
     
+    if args.lods:
+        report = lod_chain.build_lods([body], lod_chain.lod_ratios(args.lods))
+        lod_chain.print_lod_report(report)
+    
     setup_camera_and_lighting()
     
     # Set up animation
@@ -161,7 +179,7 @@ def main():
     bpy.context.scene.render.resolution_y = 1080
 
     # Export as FBX
-    bpy.ops.export_scene.fbx(filepath="//dynamic_spaceship.fbx", use_selection=False)
+    bpy.ops.export_scene.fbx(filepath="//dynamic_spaceship.fbx", use_selection=False, use_mesh_modifiers=True)
     print("Dynamic spaceship created and exported as FBX.")
 
 if __name__ == "__main__":
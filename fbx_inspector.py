@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import struct
+from collections import Counter, namedtuple
+
+# Streaming reader for binary FBX. Node records are walked with seeks using
+# their end offsets, so only the handful of records we count are read at all,
+# and array properties (vertex, key time, ...) are measured from their headers
+# without loading or decompressing the data. Used to validate job output
+# without re-importing it in Blender.
+MAGIC = b"Kaydara FBX Binary  \x00"
+HEADER_SIZE = 27
+
+SCALAR_FORMATS = {b"Y": "<h", b"C": "<?", b"I": "<i", b"F": "<f", b"D": "<d", b"L": "<q"}
+ARRAY_TYPES = b"fdlib"
+
+Node = namedtuple("Node", ["name", "start", "end", "properties_start", "num_properties", "properties_size"])
+ArrayProperty = namedtuple("ArrayProperty", ["type", "length", "encoding", "size"])
+
+class FBXError(Exception):
+    pass
+
+def read_header(f):
+    header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+        raise FBXError("Not a binary FBX file")
+    return struct.unpack("<I", header[23:27])[0]
+
+def read_node(f, version):
+    # Node records grew 64-bit offsets in FBX 7.5
+    start = f.tell()
+    if version >= 7500:
+        data = f.read(25)
+        if len(data) < 25:
+            raise FBXError(f"Truncated node record at offset {start}")
+        end, num_properties, properties_size = struct.unpack("<QQQ", data[:24])
+        name_length = data[24]
+    else:
+        data = f.read(13)
+        if len(data) < 13:
+            raise FBXError(f"Truncated node record at offset {start}")
+        end, num_properties, properties_size = struct.unpack("<III", data[:12])
+        name_length = data[12]
+    if end == 0:
+        # Null record closing a node list
+        return None
+    name = f.read(name_length).decode("ascii", "replace")
+    return Node(name, start, end, f.tell(), num_properties, properties_size)
+
+def iter_nodes(f, version, end):
+    # Sibling records from the current position; each is skipped by its end
+    # offset, so callers may read into a node before moving on
+    while f.tell() < end:
+        node = read_node(f, version)
+        if node is None:
+            return
+        if node.end > end:
+            raise FBXError(f"Truncated {node.name} record at offset {node.start}")
+        yield node
+        f.seek(node.end)
+
+def iter_children(f, node, version):
+    f.seek(node.properties_start + node.properties_size)
+    return iter_nodes(f, version, node.end)
+
+def read_properties(f, node, limit=None):
+    f.seek(node.properties_start)
+    properties = []
+    for _ in range(node.num_properties if limit is None else min(limit, node.num_properties)):
+        code = f.read(1)
+        if code in SCALAR_FORMATS:
+            fmt = SCALAR_FORMATS[code]
+            properties.append(struct.unpack(fmt, f.read(struct.calcsize(fmt)))[0])
+        elif code in (b"S", b"R"):
+            length = struct.unpack("<I", f.read(4))[0]
+            data = f.read(length)
+            properties.append(data.decode("utf-8", "replace") if code == b"S" else data)
+        elif code and code in ARRAY_TYPES:
+            length, encoding, size = struct.unpack("<III", f.read(12))
+            properties.append(ArrayProperty(code.decode(), length, encoding, size))
+            f.seek(size, os.SEEK_CUR)
+        else:
+            raise FBXError(f"Unknown property type {code!r} in {node.name} at offset {node.start}")
+    return properties
+
+def object_name(properties):
+    # Object names are stored as "Name\x00\x01Class"
+    if len(properties) > 1 and isinstance(properties[1], str):
+        return properties[1].split("\x00\x01")[0]
+    return ""
+
+def child_array_length(f, node, version, child_name):
+    for child in iter_children(f, node, version):
+        if child.name == child_name:
+            properties = read_properties(f, child, limit=1)
+            if properties and isinstance(properties[0], ArrayProperty):
+                return properties[0].length
+    return 0
+
+def inspect(path, largest=5):
+    file_bytes = os.path.getsize(path)
+    report = {
+        "version": None,
+        "file_bytes": file_bytes,
+        "sections": {},
+        "object_bytes": Counter(),
+        "largest_objects": [],
+        "models": Counter(),
+        "meshes": 0,
+        "vertices": 0,
+        "polygon_vertices": 0,
+        "materials": 0,
+        "animation_stacks": 0,
+        "animation_curves": 0,
+        "keyframes": 0,
+    }
+    sizes = []
+    with open(path, "rb") as f:
+        version = report["version"] = read_header(f)
+        sections_end = HEADER_SIZE
+        for section in iter_nodes(f, version, file_bytes):
+            sections_end = section.end
+            report["sections"][section.name] = report["sections"].get(section.name, 0) + section.end - section.start
+            if section.name != "Objects":
+                continue
+            for node in iter_children(f, section, version):
+                size = node.end - node.start
+                report["object_bytes"][node.name] += size
+                properties = read_properties(f, node, limit=3)
+                kind = properties[2] if len(properties) > 2 and isinstance(properties[2], str) else ""
+                sizes.append((size, node.name, object_name(properties)))
+                if node.name == "Model":
+                    report["models"][kind or "Unknown"] += 1
+                elif node.name == "Geometry" and kind == "Mesh":
+                    report["meshes"] += 1
+                    report["vertices"] += child_array_length(f, node, version, "Vertices") // 3
+                    report["polygon_vertices"] += child_array_length(f, node, version, "PolygonVertexIndex")
+                elif node.name == "Material":
+                    report["materials"] += 1
+                elif node.name == "AnimationStack":
+                    report["animation_stacks"] += 1
+                elif node.name == "AnimationCurve":
+                    report["animation_curves"] += 1
+                    report["keyframes"] += child_array_length(f, node, version, "KeyTime")
+        # Whatever follows the last top-level record (null record, footer)
+        report["sections"]["Footer"] = file_bytes - sections_end
+    report["objects"] = sum(report["models"].values())
+    report["models"] = dict(report["models"])
+    report["object_bytes"] = dict(report["object_bytes"])
+    report["largest_objects"] = [
+        {"type": node_type, "name": name, "bytes": size}
+        for size, node_type, name in sorted(sizes, reverse=True)[:largest]
+    ]
+    return report
+
+def validate(report, expect_animation=False):
+    # Problems worth surfacing to the user; an empty list means the file looks sane
+    problems = []
+    if not report["objects"]:
+        problems.append("the file contains no objects")
+    if report["meshes"] and not report["vertices"]:
+        problems.append("meshes were exported without vertices")
+    if expect_animation and not report["keyframes"]:
+        problems.append("no animation keyframes were exported")
+    return problems
+
+def summary(report):
+    return (f"{report['objects']} objects, {report['meshes']} meshes, {report['vertices']:,} vertices, "
+            f"{report['materials']} materials, {report['animation_curves']} animation curves, "
+            f"{report['keyframes']:,} keyframes")
+
+def print_report(report):
+    print(f"FBX {report['version']}, {report['file_bytes'] / 1024:.0f} KiB: {summary(report)}")
+    for name, size in sorted(report["sections"].items(), key=lambda item: -item[1]):
+        print(f"  {name:<24}{size / 1024:>10.1f} KiB")
+    for name, size in sorted(report["object_bytes"].items(), key=lambda item: -item[1]):
+        print(f"    Objects/{name:<16}{size / 1024:>10.1f} KiB")
+    for entry in report["largest_objects"]:
+        print(f"  largest: {entry['type']} {entry['name']!r} {entry['bytes'] / 1024:.1f} KiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a binary FBX file without loading it")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args()
+    for path in args.paths:
+        report = inspect(path)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_report(report)
@@ -1,11 +1,30 @@
 import bpy
-import random
+import argparse
 import math
 import os
+import sys
+import tempfile
+import time
 
-def create_ground(size):
-    bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=(0, 0, 0))
-    ground = bpy.context.active_object
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import archetype_library
+import asset_cache
+import lod_chain
+import rock_displacement
+import scatter_nodes
+import seeding
+import terrain
+
+# Geometry Nodes instances survive export only where the format can carry
+# instancing (glTF's EXT_mesh_gpu_instancing); everything else is realized
+INSTANCING_FORMATS = {"glb"}
+
+def create_ground(size, heightfield=None):
+    if heightfield is not None:
+        ground = terrain.create_terrain_object(heightfield)
+    else:
+        bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=(0, 0, 0))
+        ground = bpy.context.active_object
     ground.name = "Ground"
     material = bpy.data.materials.new(name="GroundMaterial")
     material.use_nodes = True
@@ -13,7 +32,7 @@ def create_ground(size):
     ground.data.materials.append(material)
     return ground
 
-def create_grass_blade(location, height):
+def create_grass_blade(location, height, rng):
     bpy.ops.mesh.primitive_plane_add(size=0.1, enter_editmode=False, location=location)
     grass = bpy.context.active_object
     grass.name = f"GrassBlade_{location[0]}_{location[1]}"
@@ -26,34 +45,34 @@ def create_grass_blade(location, height):
     bpy.ops.object.mode_set(mode='OBJECT')
     
     # Rotate randomly
-    grass.rotation_euler = (0, 0, random.uniform(0, 2 * math.pi))
+    grass.rotation_euler = (0, 0, rng.uniform(0, 2 * math.pi))
     
     # Add material
     material = bpy.data.materials.new(name=f"GrassMaterial_{grass.name}")
     material.use_nodes = True
-    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.1, 0.5 + random.uniform(0, 0.5), 0.1, 1)  # Varied green
+    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.1, 0.5 + rng.uniform(0, 0.5), 0.1, 1)  # Varied green
     grass.data.materials.append(material)
     
     return grass
 
-def create_rock(location, size):
+def create_rock(location, size, rng):
     bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=2, radius=size, enter_editmode=False, location=location)
     rock = bpy.context.active_object
     rock.name = f"Rock_{location[0]}_{location[1]}"
     
-    # Add some randomness to the shape
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.random_vertex_group(seed=random.randint(0, 1000), count=10)
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
     # Add material
     material = bpy.data.materials.new(name=f"RockMaterial_{rock.name}")
     material.use_nodes = True
-    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.2 + random.uniform(0, 0.1), 0.2 + random.uniform(0, 0.1), 0.2 + random.uniform(0, 0.1), 1)  # Varied dark gray
+    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.2 + rng.uniform(0, 0.1), 0.2 + rng.uniform(0, 0.1), 0.2 + rng.uniform(0, 0.1), 1)  # Varied dark gray
     rock.data.materials.append(material)
     
     return rock
 
+def displace_rocks(rocks, rng):
+    # One vectorized noise pass along the vertex normals for the whole batch
+    seeds = [rng.randrange(1 << 31) for _ in rocks]
+    rock_displacement.displace_meshes([rock.data for rock in rocks], seeds)
+
 def add_swaying_animation(obj, strength, speed):
     action = bpy.data.actions.new(name=f"Sway_{obj.name}")
     obj.animation_data_create()
@@ -74,42 +93,103 @@ def add_swaying_animation(obj, strength, speed):
         for kf in fc.keyframe_points:
             kf.interpolation = 'LINEAR'
 
-def main():
-    # Clear existing scene
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+def scatter_grass(params):
+    ground_size = params["ground_size"]
+    rng = seeding.stream(params["seed"], "grass")
+    blades = []
+    for _ in range(params["num_grass_blades"]):
+        x = rng.uniform(-ground_size/2, ground_size/2)
+        y = rng.uniform(-ground_size/2, ground_size/2)
+        height = rng.uniform(0.1, 0.3)
+        grass_blade = create_grass_blade((x, y, 0), height, rng)
+        add_swaying_animation(grass_blade, rng.uniform(0.1, 0.3), rng.uniform(1, 2))
+        blades.append(grass_blade)
+    return blades
+
+def scatter_rocks(params):
+    ground_size = params["ground_size"]
+    rng = seeding.stream(params["seed"], "rocks")
+    rocks = []
+    for _ in range(params["num_rocks"]):
+        x = rng.uniform(-ground_size/2, ground_size/2)
+        y = rng.uniform(-ground_size/2, ground_size/2)
+        size = rng.uniform(0.2, 0.6)
+        rocks.append(create_rock((x, y, size/2), size, rng))
+    displace_rocks(rocks, seeding.stream(params["seed"], "rock_displacement"))
+    return rocks
+
+def create_grass_archetype(index, rng):
+    grass_blade = create_grass_blade((0, 0, 0), rng.uniform(0.1, 0.3), rng)
+    add_swaying_animation(grass_blade, rng.uniform(0.1, 0.3), rng.uniform(1, 2))
+    return [grass_blade]
+
+def create_rock_archetype(index, rng):
+    size = rng.uniform(0.2, 0.6)
+    rock = create_rock((0, 0, size/2), size, rng)
+    displace_rocks([rock], rng)
+    return [rock]
+
+def instance_from_library(params, kind, count, build, scale_range):
+    # K archetypes are built once per (parameters, seed, generator version) and
+    # linked from the on-disk library on later runs
+    collections, cache_hit = archetype_library.get_archetypes(
+        os.path.abspath(__file__), kind, {}, params["seed"], params["archetypes"], build
+    )
+    print(f"{len(collections)} {kind} archetypes {'loaded from' if cache_hit else 'built into'} {archetype_library.LIBRARY_DIR}")
     
-    # Create ground
-    ground_size = 10
-    ground = create_ground(ground_size)
-    
-    # Create grass
-    num_grass_blades = 500
-    for _ in range(num_grass_blades):
-        x = random.uniform(-ground_size/2, ground_size/2)
-        y = random.uniform(-ground_size/2, ground_size/2)
-        height = random.uniform(0.1, 0.3)
-        grass_blade = create_grass_blade((x, y, 0), height)
-        add_swaying_animation(grass_blade, random.uniform(0.1, 0.3), random.uniform(1, 2))
-    
-    # Create rocks
-    num_rocks = 20
-    for _ in range(num_rocks):
-        x = random.uniform(-ground_size/2, ground_size/2)
-        y = random.uniform(-ground_size/2, ground_size/2)
-        size = random.uniform(0.2, 0.6)
-        create_rock((x, y, size/2), size)
-    
-    # Set up camera
+    ground_size = params["ground_size"]
+    rng = seeding.stream(params["seed"], kind, "placements")
+    placements = [
+        ((rng.uniform(-ground_size/2, ground_size/2), rng.uniform(-ground_size/2, ground_size/2), 0),
+         rng.uniform(0, 2 * math.pi),
+         rng.uniform(*scale_range),
+         rng.randrange(len(collections)))
+        for _ in range(count)
+    ]
+    return archetype_library.instance_archetypes(collections, placements, f"{kind.capitalize()}Instances")
+
+def create_static_grass_archetype(index, rng):
+    # Geometry Nodes drives the sway, so scatter archetypes carry no keyframes
+    return [create_grass_blade((0, 0, 0), rng.uniform(0.1, 0.3), rng)]
+
+def build_geonodes_scatter(ground, params):
+    # Construction cost is a handful of nodes whatever the density; the
+    # instances are only generated when the depsgraph evaluates the modifier
+    archetypes = params["archetypes"] or 8
+    area = params["ground_size"] ** 2
+    grass, _ = archetype_library.get_archetypes(
+        os.path.abspath(__file__), "static_grass", {}, params["seed"], archetypes, create_static_grass_archetype
+    )
+    rocks, _ = archetype_library.get_archetypes(
+        os.path.abspath(__file__), "rock", {}, params["seed"], archetypes, create_rock_archetype
+    )
+    layers = [
+        {
+            "collection": scatter_nodes.archetype_parent("GrassArchetypes", grass),
+            "density": params["num_grass_blades"] / area,
+            "seed": seeding.node_seed(params["seed"], "grass_scatter"),
+            "scale": (0.8, 1.2),
+            "wind": (0.2, 1.5),
+        },
+        {
+            "collection": scatter_nodes.archetype_parent("RockArchetypes", rocks),
+            "density": params["num_rocks"] / area,
+            "seed": seeding.node_seed(params["seed"], "rock_scatter"),
+            "scale": (0.7, 1.3),
+        },
+    ]
+    return scatter_nodes.add_scatter_modifier(ground, layers)
+
+def setup_camera_and_lighting():
     bpy.ops.object.camera_add(location=(5, -5, 3), rotation=(math.radians(60), 0, math.radians(45)))
     camera = bpy.context.active_object
     bpy.context.scene.camera = camera
     
-    # Set up sun light
     bpy.ops.object.light_add(type='SUN', location=(5, 5, 10))
     sun = bpy.context.active_object
     sun.data.energy = 2
-    
+
+def configure_scene():
     # Set up rendering
     bpy.context.scene.render.engine = 'CYCLES'
     bpy.context.scene.cycles.samples = 128
@@ -121,10 +201,29 @@ def main():
     bpy.context.scene.frame_end = 100
     bpy.context.scene.render.fps = 25
 
-    # Export as FBX
-    desktop_path = os.path.expanduser("~/Desktop")
-    export_path = os.path.join(desktop_path, "swaying_grass_and_rocks.fbx")
-    
+def export_scene(export_path, export_format="fbx"):
+    # Realize Geometry Nodes instances only when the format cannot keep them
+    scatter_nodes.set_realize(export_format not in INSTANCING_FORMATS)
+    try:
+        if export_format == "glb":
+            export_glb(export_path)
+        else:
+            export_fbx(export_path)
+    finally:
+        scatter_nodes.set_realize(False)
+
+def export_glb(export_path):
+    # The exporter only sees Geometry Nodes instances with export_gn_mesh
+    # (Blender 4.1+) and the modifiers applied; without that option the
+    # instances are realized so the file still holds the full scatter
+    try:
+        bpy.ops.export_scene.gltf(filepath=export_path, export_format='GLB', use_selection=False, export_apply=True,
+                                  export_gn_mesh=True, export_gpu_instances=True)
+    except TypeError:
+        scatter_nodes.set_realize(True)
+        bpy.ops.export_scene.gltf(filepath=export_path, export_format='GLB', use_selection=False, export_apply=True)
+
+def export_fbx(export_path):
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.export_scene.fbx(
         filepath=export_path,
@@ -137,8 +236,130 @@ def main():
         embed_textures=True,
         use_mesh_modifiers=True
     )
+
+DEFAULT_PARAMS = {
+    "ground_size": 10,
+    "num_grass_blades": 500,
+    "num_rocks": 20,
+    "archetypes": 0,  # 0 builds every blade and rock; K > 0 instances K library archetypes of each
+    "seed": 0,
+    "mode": "objects",  # or "geonodes" to scatter with a Geometry Nodes modifier on the ground
+    "terrain": False,  # fractal heightfield ground instead of a flat plane
+    "lods": 0,  # decimated levels of detail added after LOD0 of every rock
+}
+
+def benchmark_geonodes(params, counts):
+    rows = []
+    # Build (or load) the archetype library once up front, so a cache miss is
+    # reported on its own rather than inflating the first build time
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.object.delete()
+    start = time.perf_counter()
+    build_geonodes_scatter(create_ground(params["ground_size"]), dict(params, num_grass_blades=1, num_rocks=1))
+    print(f"Archetype library ready in {time.perf_counter() - start:.2f}s")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in counts:
+            bpy.ops.object.select_all(action='SELECT')
+            bpy.ops.object.delete()
+            ground = create_ground(params["ground_size"])
+            
+            start = time.perf_counter()
+            build_geonodes_scatter(ground, dict(params, num_grass_blades=count, num_rocks=max(count // 100, 1)))
+            build_seconds = time.perf_counter() - start
+            
+            # First evaluation is where the instances are actually produced
+            start = time.perf_counter()
+            bpy.context.view_layer.update()
+            evaluate_seconds = time.perf_counter() - start
+            
+            row = {"instances": count, "build_seconds": build_seconds, "evaluate_seconds": evaluate_seconds}
+            for export_format in ("glb", "fbx"):
+                export_path = os.path.join(temp_dir, f"scatter_{count}.{export_format}")
+                start = time.perf_counter()
+                export_scene(export_path, export_format)
+                row[f"{export_format}_seconds"] = time.perf_counter() - start
+                row[f"{export_format}_bytes"] = os.path.getsize(export_path)
+            rows.append(row)
+    
+    print(f"{'instances':>10}{'build s':>10}{'eval s':>10}{'glb s':>10}{'glb MiB':>10}{'fbx s':>10}{'fbx MiB':>10}")
+    for row in rows:
+        print(f"{row['instances']:>10}{row['build_seconds']:>10.3f}{row['evaluate_seconds']:>10.2f}"
+              f"{row['glb_seconds']:>10.2f}{row['glb_bytes'] / 2**20:>10.1f}"
+              f"{row['fbx_seconds']:>10.2f}{row['fbx_bytes'] / 2**20:>10.1f}")
+    return rows
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate a swaying grass and rock scene")
+    parser.add_argument("--num-grass", type=int, default=DEFAULT_PARAMS["num_grass_blades"])
+    parser.add_argument("--num-rocks", type=int, default=DEFAULT_PARAMS["num_rocks"])
+    parser.add_argument("--archetypes", type=int, default=DEFAULT_PARAMS["archetypes"], help="Instance this many cached grass and rock archetypes instead of building every object")
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS["seed"], help="Seed every random choice in the scene derives from")
+    parser.add_argument("--mode", choices=("objects", "geonodes"), default=DEFAULT_PARAMS["mode"])
+    parser.add_argument("--terrain", action="store_true", help="Generate a heightfield ground and snap grass and rocks onto it")
+    parser.add_argument("--format", choices=("fbx", "glb"), default="fbx", help="Export format; fbx realizes Geometry Nodes instances")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="COUNT", help="Time Geometry Nodes build and export at these instance counts (default 1k, 100k, 1M)")
+    parser.add_argument("--lods", type=int, default=DEFAULT_PARAMS["lods"], help="Number of decimated levels of detail to add after LOD0 of every rock (objects mode without archetypes)")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild instead of reusing a cached export")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def build_scene(params):
+    # Clear existing scene
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.object.delete()
+    
+    # Create ground
+    heightfield = terrain.Heightfield.generate(params["ground_size"], seed=params["seed"]) if params["terrain"] else None
+    ground = create_ground(params["ground_size"], heightfield)
+    
+    # Create grass and rocks; Geometry Nodes distributes on the surface itself
+    if params["mode"] == "geonodes":
+        build_geonodes_scatter(ground, params)
+    else:
+        if params["archetypes"]:
+            blades = instance_from_library(params, "grass", params["num_grass_blades"], create_grass_archetype, (0.8, 1.2))
+            rocks = instance_from_library(params, "rock", params["num_rocks"], create_rock_archetype, (0.7, 1.3))
+        else:
+            blades = scatter_grass(params)
+            rocks = scatter_rocks(params)
+        if heightfield is not None:
+            # Blades keep their sway keyframes on X/Y rotation, so only rocks tilt to the slope
+            terrain.snap_objects(heightfield, blades, align=False)
+            terrain.snap_objects(heightfield, rocks)
+        # Only rocks built one by one get LOD groups: an instanced archetype
+        # would show every level at once, as in the tree generator
+        if params["lods"] and not params["archetypes"]:
+            report = lod_chain.build_lods(rocks, lod_chain.lod_ratios(params["lods"]))
+            lod_chain.print_lod_report(report)
+    
+    setup_camera_and_lighting()
+    configure_scene()
+
+def main():
+    args = parse_args()
+    params = dict(DEFAULT_PARAMS, num_grass_blades=args.num_grass, num_rocks=args.num_rocks, archetypes=args.archetypes, seed=args.seed, mode=args.mode, terrain=args.terrain, lods=args.lods)
+    
+    if args.benchmark is not None:
+        benchmark_geonodes(params, args.benchmark or (1_000, 100_000, 1_000_000))
+        return
+    
+    desktop_path = os.path.expanduser("~/Desktop")
+    export_path = os.path.join(desktop_path, f"swaying_grass_and_rocks.{args.format}")
+    
+    def build_and_export(path):
+        build_scene(params)
+        export_scene(path, args.format)
+    
+    if args.no_cache:
+        build_and_export(export_path)
+        cache_hit = False
+    else:
+        # Same generator version, parameters and seed: same file
+        _, cache_hit = asset_cache.memoize(os.path.abspath(__file__), params, params["seed"], export_path,
+                                           build_and_export, args.format)
     
-    print(f"Scene exported as FBX to: {export_path}")
+    print(f"Scene {'copied from the asset cache' if cache_hit else 'exported'} as {args.format.upper()} to: {export_path}")
 
 if __name__ == "__main__":
     main()
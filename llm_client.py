@@ -0,0 +1,250 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import httpx
+
+DEFAULT_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class LLMError(Exception):
+    pass
+
+class LLMAuthenticationError(LLMError):
+    pass
+
+class LatencyHistogram:
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        with self.lock:
+            if self.count == 0:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return float("inf")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+                "count": self.count,
+                "sum": self.sum,
+            }
+
+class _Flight:
+    # One upstream request; identical prompts arriving while it runs replay its tokens
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+
+    async def push(self, token):
+        async with self.changed:
+            self.tokens.append(token)
+            self.changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self.changed:
+            self.done = True
+            self.error = error
+            self.changed.notify_all()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.done or len(self.tokens) > index)
+                pending = self.tokens[index:]
+                finished, error = self.done, self.error
+            for token in pending:
+                yield token
+            index += len(pending)
+            if finished and index >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+class AsyncLLMClient:
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model="gpt-4o-mini", max_concurrency=4,
+                 max_connections=8, max_retries=5, backoff_base=0.5, backoff_max=20, timeout=120):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Keep-alive pool shared by every request made through this client
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=60),
+            timeout=httpx.Timeout(timeout, connect=10)
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.flights = {}
+        self.queue_latency = LatencyHistogram()
+        self.first_token_latency = LatencyHistogram()
+        self.total_latency = LatencyHistogram()
+        self.retries = 0
+        self.coalesced = 0
+
+    def _flight_key(self, messages):
+        payload = json.dumps({"model": self.model, "messages": messages}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def stream_chat(self, messages):
+        key = self._flight_key(messages)
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self.flights[key] = flight
+            asyncio.create_task(self._run(key, flight, messages))
+        else:
+            self.coalesced += 1
+        async for token in flight.subscribe():
+            yield token
+
+    async def complete(self, messages):
+        return "".join([token async for token in self.stream_chat(messages)])
+
+    async def _run(self, key, flight, messages):
+        queued = time.perf_counter()
+        try:
+            async with self.semaphore:
+                start = time.perf_counter()
+                self.queue_latency.observe(start - queued)
+                await self._stream_with_retries(messages, flight, start)
+                self.total_latency.observe(time.perf_counter() - start)
+        except Exception as e:
+            await flight.finish(e)
+        else:
+            await flight.finish()
+        finally:
+            self.flights.pop(key, None)
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+        return delay * random.uniform(0.5, 1)
+
+    async def _stream_with_retries(self, messages, flight, start):
+        body = {"model": self.model, "messages": messages, "stream": True}
+        for attempt in range(self.max_retries + 1):
+            delay = None
+            try:
+                async with self.http.stream("POST", "/chat/completions", json=body) as response:
+                    if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._backoff(attempt, response.headers.get("retry-after"))
+                    elif response.status_code == 401:
+                        raise LLMAuthenticationError("Invalid API key")
+                    elif response.status_code >= 400:
+                        detail = (await response.aread()).decode("utf-8", "replace")
+                        raise LLMError(f"HTTP {response.status_code}: {detail[:500]}")
+                    else:
+                        await self._read_events(response, flight, start)
+                        return
+            except httpx.TransportError:
+                # Replaying after tokens went out would duplicate them downstream
+                if attempt >= self.max_retries or flight.tokens:
+                    raise
+                delay = self._backoff(attempt)
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _read_events(self, response, flight, start):
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            token = choices[0].get("delta", {}).get("content")
+            if token:
+                if not flight.tokens:
+                    self.first_token_latency.observe(time.perf_counter() - start)
+                await flight.push(token)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+class LLMClient:
+    # Synchronous facade for Streamlit: the async client lives on its own loop
+    # thread so connections stay warm across reruns and sessions
+    def __init__(self, api_key, **options):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.client = self._call(self._create(api_key, options))
+
+    async def _create(self, api_key, options):
+        return AsyncLLMClient(api_key, **options)
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stream_chat(self, messages):
+        events = queue.Queue()
+
+        async def pump():
+            try:
+                async for token in self.client.stream_chat(messages):
+                    events.put(("token", token))
+            except Exception as e:
+                events.put(("error", e))
+            else:
+                events.put(("done", None))
+
+        asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        while True:
+            kind, value = events.get()
+            if kind == "token":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+
+    def complete(self, messages):
+        return "".join(self.stream_chat(messages))
+
+    def stats(self):
+        return {
+            "queue_latency": self.client.queue_latency,
+            "first_token_latency": self.client.first_token_latency,
+            "total_latency": self.client.total_latency,
+            "retries": self.client.retries,
+            "coalesced": self.client.coalesced,
+        }
+
+    def close(self):
+        self._call(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
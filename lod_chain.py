@@ -0,0 +1,95 @@
+import bpy
+
+import numpy as np
+
+# LOD stage for generated assets. Each asset root ends up under an empty named
+# after the asset with one child hierarchy per level ("Asset_LOD0", "Asset_LOD1",
+# ...), the layout Unity and most FBX importers read as an LOD group. Lower
+# levels are either copies carrying a Decimate modifier (applied on export via
+# use_mesh_modifiers) or hierarchies rebuilt by the generator with fewer segments.
+DEFAULT_NAME_FORMAT = "{name}_LOD{level}"
+
+def lod_ratios(levels, falloff=0.5):
+    return [falloff ** level for level in range(levels + 1)]
+
+def hierarchy(root):
+    return [root] + list(root.children_recursive)
+
+def triangle_count(objects, depsgraph=None):
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+    total = 0
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        total += int((loop_totals - 2).sum())
+        evaluated.to_mesh_clear()
+    return total
+
+def decimated_copy(root, ratio, level, name_format):
+    # Meshes stay shared with LOD0; only the Decimate modifier differs.
+    # Lights, cameras and other non-geometry objects are not duplicated.
+    copies = {}
+    for obj in hierarchy(root):
+        if obj.type not in {'MESH', 'EMPTY'}:
+            continue
+        copy = obj.copy()
+        for collection in obj.users_collection:
+            collection.objects.link(copy)
+        parent = obj.parent
+        while parent is not None and parent not in copies:
+            parent = parent.parent
+        copy.parent = copies.get(parent)
+        copy.name = name_format.format(name=obj.name, level=level)
+        if obj.type == 'MESH' and ratio < 1:
+            modifier = copy.modifiers.new(name="LOD_Decimate", type='DECIMATE')
+            modifier.ratio = ratio
+        copies[obj] = copy
+    return copies[root]
+
+def build_lod_chain(root, ratios, name_format=DEFAULT_NAME_FORMAT, rebuild=None):
+    # rebuild(level, ratio) may return a freshly generated lower-detail root
+    # (e.g. spheres with fewer segments); otherwise levels are decimated copies
+    name = root.name
+    group = bpy.data.objects.new(name, None)
+    for collection in root.users_collection:
+        collection.objects.link(group)
+
+    levels = []
+    for level, ratio in enumerate(ratios):
+        if level == 0:
+            level_root = root
+            level_root.name = name_format.format(name=name, level=0)
+        elif rebuild is not None:
+            level_root = rebuild(level, ratio)
+            for obj in hierarchy(level_root)[1:]:
+                obj.name = name_format.format(name=obj.name.split(".")[0], level=level)
+            level_root.name = name_format.format(name=name, level=level)
+        else:
+            level_root = decimated_copy(root, ratio, level, name_format)
+            level_root.name = name_format.format(name=name, level=level)
+        level_root.parent = group
+        levels.append(level_root)
+    return group, levels
+
+def build_lods(roots, ratios, name_format=DEFAULT_NAME_FORMAT, rebuild=None):
+    chains = [build_lod_chain(root, ratios, name_format, rebuild) for root in roots]
+    return lod_report(chains)
+
+def lod_report(chains):
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    report = []
+    for group, levels in chains:
+        report.append({
+            "asset": group.name,
+            "triangles": [triangle_count(hierarchy(level_root), depsgraph) for level_root in levels],
+        })
+    return report
+
+def print_lod_report(report):
+    for entry in report:
+        counts = ", ".join(f"LOD{level}: {count}" for level, count in enumerate(entry["triangles"]))
+        print(f"{entry['asset']}: {counts} triangles")
@@ -1,13 +1,28 @@
 import bpy
-import random
+import argparse
 import math
 import os
+import sys
+import tempfile
+import time
+from mathutils import Matrix
 
-def generate_tree_color():
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import archetype_library
+import asset_cache
+import lod_chain
+import seeding
+import terrain
+
+# Tree layouts: one object and material per trunk/crown/branch, one vertex
+# colored object per tree, or every tree combined into a single forest mesh
+LAYOUTS = ("separate", "merged", "forest")
+
+def generate_tree_color(rng):
     # Generate vibrant colors for trees
-    hue = random.uniform(0, 1)
-    saturation = random.uniform(0.5, 1)
-    value = random.uniform(0.5, 1)
+    hue = rng.uniform(0, 1)
+    saturation = rng.uniform(0.5, 1)
+    value = rng.uniform(0.5, 1)
     return hue, saturation, value
 
 def hsv_to_rgb(h, s, v):
@@ -25,7 +40,7 @@ def hsv_to_rgb(h, s, v):
     if i == 4: return (t, p, v)
     if i == 5: return (v, p, q)
 
-def create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches):
+def create_tree_geometry(location, trunk_height, trunk_radius, crown_radius, num_branches, rng):
     # Create trunk
     bpy.ops.mesh.primitive_cylinder_add(
         radius=trunk_radius,
@@ -47,8 +62,8 @@ def create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches
     # Create branches
     branches = []
     for i in range(num_branches):
-        angle = random.uniform(0, 2 * math.pi)
-        z = random.uniform(trunk_height * 0.3, trunk_height * 0.8)
+        angle = rng.uniform(0, 2 * math.pi)
+        z = rng.uniform(trunk_height * 0.3, trunk_height * 0.8)
         x = location[0] + math.cos(angle) * trunk_radius
         y = location[1] + math.sin(angle) * trunk_radius
         
@@ -64,11 +79,20 @@ def create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches
         # Rotate branch to point outward
         branch.rotation_euler = (math.pi/2, 0, angle)
         branches.append(branch)
+    
+    return trunk, crown, branches
 
-    # Generate and apply colors
-    trunk_color = (0.3, 0.2, 0.1, 1)  # Brown for trunk
-    leaf_hue, leaf_saturation, leaf_value = generate_tree_color()
+def generate_tree_palette(trunk_color, rng):
+    leaf_hue, leaf_saturation, leaf_value = generate_tree_color(rng)
     leaf_color = hsv_to_rgb(leaf_hue, leaf_saturation, leaf_value) + (1,)  # Add alpha channel
+    branch_color = hsv_to_rgb(leaf_hue, leaf_saturation * 0.8, leaf_value * 0.8) + (1,)
+    return tuple(trunk_color), leaf_color, branch_color
+
+def create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches, rng, trunk_color=(0.3, 0.2, 0.1, 1)):
+    trunk, crown, branches = create_tree_geometry(location, trunk_height, trunk_radius, crown_radius, num_branches, rng)
+
+    # Generate and apply colors
+    trunk_color, leaf_color, branch_color = generate_tree_palette(trunk_color, rng)
     
     trunk_material = create_material("TrunkMaterial", trunk_color)
     leaf_material = create_material("LeafMaterial", leaf_color)
@@ -77,12 +101,52 @@ def create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches
     crown.data.materials.append(leaf_material)
     
     for branch in branches:
-        branch_color = hsv_to_rgb(leaf_hue, leaf_saturation * 0.8, leaf_value * 0.8) + (1,)
         branch_material = create_material(f"BranchMaterial_{branch.name}", branch_color)
         branch.data.materials.append(branch_material)
     
     return trunk, crown, branches
 
+def paint_vertex_colors(obj, color):
+    attribute = obj.data.color_attributes.new(name="Col", type='BYTE_COLOR', domain='CORNER')
+    attribute.data.foreach_set("color", tuple(color) * len(attribute.data))
+
+def get_palette_material():
+    # Shared by every merged tree; the base color comes from the "Col" attribute
+    material = bpy.data.materials.get("TreePaletteMaterial")
+    if material is None:
+        material = bpy.data.materials.new(name="TreePaletteMaterial")
+        material.use_nodes = True
+        nodes = material.node_tree.nodes
+        color_node = nodes.new("ShaderNodeVertexColor")
+        color_node.layer_name = "Col"
+        material.node_tree.links.new(color_node.outputs["Color"], nodes["Principled BSDF"].inputs[0])
+    return material
+
+def join_objects(objects, name):
+    target = objects[0]
+    with bpy.context.temp_override(active_object=target, object=target, selected_objects=objects, selected_editable_objects=objects):
+        bpy.ops.object.join()
+    target.name = name
+    return target
+
+def create_merged_tree(location, trunk_height, trunk_radius, crown_radius, num_branches, rng, trunk_color=(0.3, 0.2, 0.1, 1)):
+    trunk, crown, branches = create_tree_geometry(location, trunk_height, trunk_radius, crown_radius, num_branches, rng)
+    trunk_color, leaf_color, branch_color = generate_tree_palette(trunk_color, rng)
+    
+    paint_vertex_colors(trunk, trunk_color)
+    paint_vertex_colors(crown, leaf_color)
+    for branch in branches:
+        paint_vertex_colors(branch, branch_color)
+    
+    tree = join_objects([trunk, crown] + branches, "Tree")
+    tree.data.materials.append(get_palette_material())
+    
+    # Move the origin from the trunk's center down to its base so the whole tree sways from the ground
+    tree.data.transform(Matrix.Translation((0, 0, trunk_height / 2)))
+    tree.location.z -= trunk_height / 2
+    
+    return tree
+
 def create_material(name, color):
     material = bpy.data.materials.new(name=name)
     material.use_nodes = True
@@ -113,45 +177,103 @@ def add_swaying_animation(obj, strength, speed):
         for kf in fc.keyframe_points:
             kf.interpolation = 'LINEAR'
 
-def main():
-    clear_scene()
-    
-    # Create a simple ground plane
-    bpy.ops.mesh.primitive_plane_add(size=10, location=(0, 0, 0))
-    ground = bpy.context.active_object
+heightfields = {}
+
+def get_heightfield(params):
+    # Deterministic in (ground size, seed), so tree components can look up
+    # heights without depending on the ground component having been built
+    key = (params["ground_size"], params["seed"])
+    if key not in heightfields:
+        heightfields[key] = terrain.Heightfield.generate(size=key[0], seed=key[1])
+    return heightfields[key]
+
+def create_ground(size, heightfield=None):
+    if heightfield is not None:
+        ground = terrain.create_terrain_object(heightfield)
+    else:
+        bpy.ops.mesh.primitive_plane_add(size=size, location=(0, 0, 0))
+        ground = bpy.context.active_object
     ground.name = "Ground"
     ground_material = create_material("GroundMaterial", (0.2, 0.5, 0.2, 1))
     ground.data.materials.append(ground_material)
+    return ground
+
+def create_random_tree(params, rng, location=None):
+    # rng is this tree's own stream, so a tree looks the same whatever else
+    # the scene contains
+    if location is None:
+        extent = params["ground_size"] * 0.4
+        location = (rng.uniform(-extent, extent), rng.uniform(-extent, extent), 0)
+        if params["terrain"]:
+            location = (location[0], location[1], float(get_heightfield(params).height_at(location[0], location[1])))
+    trunk_height = rng.uniform(1, 2)
+    trunk_radius = rng.uniform(0.1, 0.2)
+    crown_radius = rng.uniform(0.5, 1)
+    num_branches = rng.randint(3, 7)
+    # Drawn up front so every layout consumes the same random stream
+    branch_sways = [(rng.uniform(0.1, 0.2), rng.uniform(1, 2)) for _ in range(num_branches)]
     
-    # Create trees
-    num_trees = 5
-    for _ in range(num_trees):
-        x = random.uniform(-4, 4)
-        y = random.uniform(-4, 4)
-        trunk_height = random.uniform(1, 2)
-        trunk_radius = random.uniform(0.1, 0.2)
-        crown_radius = random.uniform(0.5, 1)
-        num_branches = random.randint(3, 7)
-        
-        trunk, crown, branches = create_tree((x, y, 0), trunk_height, trunk_radius, crown_radius, num_branches)
-        
-        # Add swaying animation to crown and branches
-        add_swaying_animation(crown, 0.05, 1.5)
-        for branch in branches:
-            strength = random.uniform(0.1, 0.2)
-            speed = random.uniform(1, 2)
-            add_swaying_animation(branch, strength, speed)
-    
-    # Set up camera
+    if params["layout"] != "separate":
+        tree = create_merged_tree(location, trunk_height, trunk_radius, crown_radius, num_branches, rng, params["trunk_color"])
+        # Branches no longer sway on their own; the tree sways as one piece
+        if params["layout"] == "merged":
+            add_swaying_animation(tree, 0.03, 1.5)
+        return [tree]
+    
+    trunk, crown, branches = create_tree(location, trunk_height, trunk_radius, crown_radius, num_branches, rng, params["trunk_color"])
+    
+    # Add swaying animation to crown and branches
+    add_swaying_animation(crown, 0.05, 1.5)
+    for branch, (strength, speed) in zip(branches, branch_sways):
+        add_swaying_animation(branch, strength, speed)
+    
+    return [trunk, crown] + branches
+
+def setup_camera_and_lighting():
     bpy.ops.object.camera_add(location=(8, -8, 6), rotation=(math.radians(60), 0, math.radians(45)))
     camera = bpy.context.active_object
     bpy.context.scene.camera = camera
     
-    # Set up sun light
     bpy.ops.object.light_add(type='SUN', location=(5, 5, 10))
     sun = bpy.context.active_object
     sun.data.energy = 2
     
+    return [camera, sun]
+
+def create_forest(params):
+    trees = []
+    for i in range(params["num_trees"]):
+        trees.extend(create_random_tree(params, seeding.stream(params["seed"], "tree", i)))
+    return join_objects(trees, "Forest")
+
+def create_tree_instances(params):
+    # Archetypes are built at the origin once per (parameters, seed, generator
+    # version) and reused from the on-disk library on later runs
+    collections, cache_hit = archetype_library.get_archetypes(
+        os.path.abspath(__file__),
+        "tree",
+        {key: params[key] for key in ("trunk_color", "layout")},
+        params["seed"],
+        params["archetypes"],
+        lambda i, rng: create_random_tree(params, rng, location=(0, 0, 0))
+    )
+    print(f"{len(collections)} tree archetypes {'loaded from' if cache_hit else 'built into'} {archetype_library.LIBRARY_DIR}")
+    
+    extent = params["ground_size"] * 0.4
+    rng = seeding.stream(params["seed"], "tree", "placements")
+    placements = [
+        ((rng.uniform(-extent, extent), rng.uniform(-extent, extent), 0),
+         rng.uniform(0, 2 * math.pi),
+         rng.uniform(0.8, 1.2),
+         rng.randrange(len(collections)))
+        for _ in range(params["num_trees"])
+    ]
+    instances = archetype_library.instance_archetypes(collections, placements, "TreeInstances")
+    if params["terrain"]:
+        terrain.snap_objects(get_heightfield(params), instances, align=False)
+    return instances
+
+def configure_scene(params):
     # Set up rendering
     bpy.context.scene.render.engine = 'CYCLES'
     bpy.context.scene.cycles.samples = 128
@@ -163,10 +285,24 @@ def main():
     bpy.context.scene.frame_end = 100
     bpy.context.scene.render.fps = 25
 
-    # Export as FBX
-    desktop_path = os.path.expanduser("~/Desktop")
-    export_path = os.path.join(desktop_path, "colorful_swaying_trees.fbx")
-    
+def scene_components(params):
+    # (name, parameter keys it depends on, build function returning its objects);
+    # used by blender-session-server.py to rebuild only what a tweak touches
+    heightfield = get_heightfield(params) if params["terrain"] else None
+    components = [("ground", ("ground_size", "terrain", "seed"), lambda: [create_ground(params["ground_size"], heightfield)])]
+    if params["archetypes"]:
+        components.append(("tree_instances", ("num_trees", "ground_size", "trunk_color", "layout", "archetypes", "seed", "terrain"), lambda: create_tree_instances(params)))
+    elif params["layout"] == "forest":
+        # The combined mesh depends on every tree, so it is a single component
+        components.append(("forest", ("num_trees", "ground_size", "trunk_color", "layout", "terrain", "seed"), lambda: [create_forest(params)]))
+    else:
+        for i in range(params["num_trees"]):
+            components.append((f"tree_{i}", ("ground_size", "trunk_color", "layout", "terrain", "seed"),
+                               lambda i=i: create_random_tree(params, seeding.stream(params["seed"], "tree", i))))
+    components.append(("camera_and_lighting", (), setup_camera_and_lighting))
+    return components
+
+def export_scene(export_path):
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.export_scene.fbx(
         filepath=export_path,
@@ -179,8 +315,105 @@ def main():
         embed_textures=True,
         use_mesh_modifiers=True
     )
+
+DEFAULT_PARAMS = {
+    "num_trees": 5,
+    "ground_size": 10,
+    "trunk_color": (0.3, 0.2, 0.1, 1),  # Brown for trunk
+    "layout": "separate",
+    "archetypes": 0,  # 0 builds every tree; K > 0 instances K library archetypes
+    "seed": 0,
+    "terrain": False,  # fractal heightfield ground instead of a flat plane
+    "lods": 0,  # decimated levels of detail added after LOD0
+}
+
+def build_scene(params):
+    clear_scene()
+    trees = []
+    for name, keys, build in scene_components(params):
+        objects = build()
+        if name.startswith(("tree_", "forest")):
+            trees.extend(objects)
+    configure_scene(params)
+    
+    # Archetype instances are empties; only real tree meshes get LOD chains
+    if params["lods"] and not params["archetypes"]:
+        report = lod_chain.build_lods([tree for tree in trees if tree.type == 'MESH'], lod_chain.lod_ratios(params["lods"]))
+        lod_chain.print_lod_report(report)
+
+def layout_stats():
+    mesh_objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+    materials = {slot.material for obj in mesh_objects for slot in obj.material_slots if slot.material}
+    return {
+        "objects": len(bpy.context.scene.objects),
+        "materials": len(materials),
+        # One draw call per object per material slot
+        "draw_calls": sum(max(len(obj.material_slots), 1) for obj in mesh_objects),
+    }
+
+def compare_layouts(params):
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for layout in LAYOUTS:
+            # Trees draw from per-tree streams, so every layout contains the same trees
+            start = time.perf_counter()
+            build_scene(dict(params, layout=layout))
+            build_seconds = time.perf_counter() - start
+            
+            stats = layout_stats()
+            export_path = os.path.join(temp_dir, f"{layout}.fbx")
+            start = time.perf_counter()
+            export_scene(export_path)
+            stats["export_seconds"] = time.perf_counter() - start
+            stats["build_seconds"] = build_seconds
+            stats["export_bytes"] = os.path.getsize(export_path)
+            results[layout] = stats
+    
+    print(f"{'layout':<10}{'objects':>9}{'materials':>11}{'draw calls':>12}{'build s':>10}{'export s':>10}{'export KiB':>12}")
+    for layout, stats in results.items():
+        print(f"{layout:<10}{stats['objects']:>9}{stats['materials']:>11}{stats['draw_calls']:>12}"
+              f"{stats['build_seconds']:>10.2f}{stats['export_seconds']:>10.2f}{stats['export_bytes'] / 1024:>12.0f}")
+    return results
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate colorful swaying low-poly trees")
+    parser.add_argument("--num-trees", type=int, default=DEFAULT_PARAMS["num_trees"])
+    parser.add_argument("--layout", choices=LAYOUTS, default=DEFAULT_PARAMS["layout"])
+    parser.add_argument("--archetypes", type=int, default=DEFAULT_PARAMS["archetypes"], help="Instance this many cached tree archetypes instead of building every tree")
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS["seed"], help="Seed every random choice in the scene derives from")
+    parser.add_argument("--terrain", action="store_true", help="Generate a heightfield ground and place trees on it")
+    parser.add_argument("--lods", type=int, default=DEFAULT_PARAMS["lods"], help="Number of decimated levels of detail to add after LOD0")
+    parser.add_argument("--compare", action="store_true", help="Build every layout and print object, draw call and export time comparisons")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild instead of reusing a cached export")
+    args, _ = parser.parse_known_args(argv)
+    if args.archetypes and args.layout == "forest":
+        parser.error("--archetypes instances individual trees and cannot be combined with --layout forest")
+    return args
+
+def main():
+    args = parse_args()
+    params = dict(DEFAULT_PARAMS, num_trees=args.num_trees, layout=args.layout, archetypes=args.archetypes, seed=args.seed, terrain=args.terrain, lods=args.lods)
+    
+    if args.compare:
+        compare_layouts(params)
+        return
+    
+    desktop_path = os.path.expanduser("~/Desktop")
+    export_path = os.path.join(desktop_path, "colorful_swaying_trees.fbx")
+
+    def build_and_export(path):
+        build_scene(params)
+        export_scene(path)
+
+    if args.no_cache:
+        build_and_export(export_path)
+        cache_hit = False
+    else:
+        # Same generator version, parameters and seed: same file
+        _, cache_hit = asset_cache.memoize(os.path.abspath(__file__), params, params["seed"], export_path, build_and_export)
     
-    print(f"Scene exported as FBX to: {export_path}")
+    print(f"Scene {'copied from the asset cache' if cache_hit else 'exported'} as FBX to: {export_path}")
 
 if __name__ == "__main__":
     main()
@@ -1,81 +1,325 @@
 import streamlit as st
-import subprocess
 import os
-import zipfile
 import tempfile
+import time
+import uuid
+import hashlib
+from admission import AdmissionController, AdmissionRejected
+from blender_jobs import cached_job, run_blender_job, failure_class
+from blender_session import SessionPool, BlenderSessionError
+from llm_client import LLMClient, LLMAuthenticationError, LatencyHistogram
+from pipeline_metrics import METRICS, METRICS_PORT, JobLog, cache_lookup, serve
+import asset_cache
+import fbx_inspector
+import thumbnail_cache
 
-def generate_blender_script(prompt, api_key):
-    openai.api_key = api_key
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TREE_GENERATOR = os.path.join(APP_DIR, "low-poly-tree-generator.py")
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus scrapes http://<host>:METRICS_PORT/metrics
+    return serve(METRICS_PORT)
+
+@st.cache_resource
+def get_llm_client(api_key):
+    client = LLMClient(api_key)
+    # Labelled by a key fingerprint, never the key itself
+    labels = {"client": hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]}
+    for name, histogram in client.stats().items():
+        if isinstance(histogram, LatencyHistogram):
+            METRICS.attach(f"llm_{name.replace('latency', 'seconds')}", histogram, labels)
+    return client
+
+def generate_blender_script(prompt, api_key, log):
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant that generates Blender Python scripts."},
+        {"role": "user", "content": f"Generate a complex Blender Python script for creating a {prompt}. Include animations and export as FBX. "
+                                    "Export to the path given after '--' in sys.argv. Multiply every object count by the float in the "
+                                    "BLENDER_THING_COUNT_SCALE environment variable (default 1.0, keep at least one of each). "
+                                    "Only bake animation into the export when the BLENDER_THING_BAKE_ANIM environment variable "
+                                    "is not \"0\"."}
+    ]
+    placeholder = st.empty()
+    start = time.perf_counter()
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates Blender Python scripts."},
-                {"role": "user", "content": f"Generate a complex Blender Python script for creating a {prompt}. Include animations and export as FBX."}
-            ]
-        )
-        return response.choices[0].message.content
-    except openai.error.AuthenticationError:
+        # Tokens are shown as they arrive; identical prompts already in flight share one request
+        with placeholder.container():
+            script = st.write_stream(get_llm_client(api_key).stream_chat(messages))
+        METRICS.observe("llm_request_seconds", time.perf_counter() - start)
+        log.event("llm_finished", seconds=time.perf_counter() - start, script_chars=len(script))
+        return script
+    except LLMAuthenticationError:
+        METRICS.inc("llm_failures_total", {"class": "authentication"})
+        log.event("llm_failed", failure_class="authentication")
         st.sidebar.error("Invalid API key. Please check your OpenAI API key.")
         return None
     except Exception as e:
+        METRICS.inc("llm_failures_total", {"class": type(e).__name__})
+        log.event("llm_failed", failure_class=type(e).__name__, error=str(e))
         st.sidebar.error(f"An error occurred: {str(e)}")
         return None
+    finally:
+        placeholder.empty()
+
+def show_llm_latency(api_key):
+    stats = get_llm_client(api_key).stats()
+    with st.sidebar.expander("LLM latency"):
+        for label, key in [("Queue wait", "queue_latency"), ("First token", "first_token_latency"), ("Total", "total_latency")]:
+            histogram = stats[key]
+            if histogram.count:
+                st.write(f"{label}: p50 ≤ {histogram.quantile(0.5)}s, p95 ≤ {histogram.quantile(0.95)}s ({histogram.count} requests)")
+        st.write(f"Retries: {stats['retries']}, coalesced prompts: {stats['coalesced']}")
+
+@st.cache_resource
+def get_admission_controller():
+    # Every Blender job from every session goes through here; full-quality
+    # builds keep running after the preview has been shown
+    return AdmissionController()
+
+def submit_blender_job(session, script, profile, job_id, seed=0):
+    controller = get_admission_controller()
+    cost = controller.estimate(script, profile)
+    if cached_job(script, profile, seed):
+        # Answered from the asset cache without reserving Blender capacity
+        cost = dict(cost, units=0, seconds=0, cores=0, memory_bytes=0)
+    try:
+        ticket = controller.submit(session, cost, run_blender_job, script, profile, job_id, time.perf_counter(),
+                                   threads=cost["cores"] or None, seed=seed)
+    except AdmissionRejected as e:
+        METRICS.inc("admission_rejections_total", {"profile": profile})
+        JobLog(job_id, profile=profile).event("job_rejected", reason=e.reason, eta=e.eta, cost=cost)
+        raise
+    JobLog(job_id, profile=profile).event("job_admitted", eta=controller.eta(ticket), cost=cost)
+    return ticket
+
+@st.cache_resource
+def get_delivery_stats():
+    return {"time_to_first_result": LatencyHistogram(), "time_to_full_result": LatencyHistogram(),
+            "thumbnail_render": LatencyHistogram()}
+
+def show_thumbnail(thumbnail, seconds):
+    # seconds is None when the thumbnail came from the cache
+    if seconds is None:
+        st.image(thumbnail, caption="Preview (cached)")
+        return
+    st.image(thumbnail, caption=f"Preview rendered in {seconds:.1f}s (budget {thumbnail_cache.RENDER_BUDGET:.0f}s)")
+    if seconds > thumbnail_cache.RENDER_BUDGET:
+        st.caption("Thumbnail render went over budget.")
+
+def show_optimizer_report(report):
+    before, after = report["before"], report["after"]
+    st.caption(f"Optimizer: {before['objects']} → {after['objects']} objects, {before['meshes']} → {after['meshes']} meshes, "
+               f"{before['materials']} → {after['materials']} materials, "
+               f"~{(before['mesh_bytes'] - after['mesh_bytes']) / 1024:.0f} KiB mesh data saved")
 
-def run_blender_script(script):
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_script:
-        temp_script.write(script)
-        temp_script_path = temp_script.name
+def show_inspection(inspection, problems):
+    for problem in problems:
+        st.warning(f"Exported FBX: {problem}.")
+    st.caption(f"FBX: {fbx_inspector.summary(inspection)}")
+    with st.expander("FBX size breakdown"):
+        for name, size in sorted(inspection["sections"].items(), key=lambda item: -item[1]):
+            st.write(f"{name}: {size / 1024:.1f} KiB")
+        for entry in inspection["largest_objects"]:
+            st.write(f"Largest: {entry['type']} \"{entry['name']}\" ({entry['bytes'] / 1024:.1f} KiB)")
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        output_fbx = os.path.join(temp_dir, "output.fbx")
-        blender_command = [
-            "blender",
-            "--background",
-            "--python", temp_script_path,
-            "--",
-            output_fbx
-        ]
-        subprocess.run(blender_command, check=True)
+@st.fragment(run_every=2)
+def wait_for_full_result(job):
+    if job["full"].done():
+        st.rerun()
+    ticket = job["ticket"]
+    if ticket.started is None:
+        st.info(f"Full-quality build queued behind other jobs, starting in about {get_admission_controller().eta(ticket):.0f}s...")
+        return
+    st.info(f"Full-quality build running in the background ({time.perf_counter() - job['started']:.0f}s)...")
 
-        zip_path = os.path.join(temp_dir, "output.zip")
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            zipf.write(output_fbx, arcname="output.fbx")
+def show_job(job):
+    st.text_area("Generated Blender Script:", value=job["script"], height=300)
+    if "time_to_first_result" in job:
+        st.metric("Time to first result", f"{job['time_to_first_result']:.1f}s")
 
-        with open(zip_path, "rb") as f:
-            return f.read()
+    full = job["full"]
+    if full.done():
+        if full.exception() is not None:
+            st.error(f"Error running Blender script ({failure_class(full.exception())}, job {job['id']}). "
+                     "Please check the script for errors.")
+            return
+        result = full.result()
+        if "time_to_full_result" not in job:
+            job["time_to_full_result"] = time.perf_counter() - job["started"]
+            get_delivery_stats()["time_to_full_result"].observe(job["time_to_full_result"])
+        show_optimizer_report(result["report"])
+        show_inspection(result["inspection"], result["problems"])
+        st.download_button(
+            label="Download FBX (Zipped)",
+            data=result["data"],
+            file_name=result["file_name"],
+            mime=result["mime"]
+        )
+        return
+
+    preview = job.get("preview")
+    if preview is not None:
+        if preview["thumbnail"]:
+            show_thumbnail(preview["thumbnail"], preview["thumbnail_seconds"])
+        st.download_button(
+            label="Download preview (GLB)",
+            data=preview["data"],
+            file_name=preview["file_name"],
+            mime=preview["mime"]
+        )
+    wait_for_full_result(job)
+
+def show_delivery_stats():
+    with st.sidebar.expander("Delivery"):
+        for label, histogram in get_delivery_stats().items():
+            if histogram.count:
+                st.write(f"{label.replace('_', ' ').capitalize()}: p50 ≤ {histogram.quantile(0.5)}s, p95 ≤ {histogram.quantile(0.95)}s ({histogram.count} jobs)")
+        status = get_admission_controller().status()
+        st.write(f"Blender jobs: {status['running']} running on {status['cores']}/{status['cpu_slots']} cores "
+                 f"({status['memory_bytes'] / 2**30:.1f}/{status['memory_limit'] / 2**30:.1f} GiB reserved), {status['queued']} queued")
+        if get_metrics_server() is not None:
+            st.caption(f"Prometheus metrics on port {METRICS_PORT} at /metrics")
+
+@st.cache_resource
+def get_session_pool():
+    return SessionPool()
+
+def hex_to_rgba(value):
+    value = value.lstrip("#")
+    return [int(value[i:i + 2], 16) / 255 for i in (0, 2, 4)] + [1]
 
-    os.unlink(temp_script_path)
+def tweak_builtin_scene():
+    # Rebuilds happen in a warm per-user Blender session, so only the trees,
+    # ground or lights touched by a change are regenerated
+    st.subheader("Low-poly trees")
+    params = {
+        "num_trees": st.slider("Number of trees", 1, 50, 5),
+        "ground_size": st.slider("Ground size", 5, 50, 10),
+        "trunk_color": hex_to_rgba(st.color_picker("Trunk color", "#4d331a")),
+        "seed": int(st.number_input("Seed", min_value=0, value=0, step=1)),
+    }
+    if st.button("Rebuild and Download"):
+        user_id = st.session_state.setdefault("user_id", uuid.uuid4().hex)
+        export_path = os.path.join(tempfile.gettempdir(), f"blender_thing_{user_id}.fbx")
+        thumbnail_key = thumbnail_cache.generator_key(TREE_GENERATOR, params)
+        thumbnail = thumbnail_cache.lookup(thumbnail_key)
+        thumbnail_path = os.path.join(tempfile.gettempdir(), f"blender_thing_{user_id}.png")
+        log = JobLog(uuid.uuid4().hex, profile="session", user=user_id)
+        cache_lookup("thumbnail", thumbnail is not None, log)
+        # The generator is deterministic in its parameters and seed, so a scene
+        # built before by anyone is served without touching the session
+        asset_key = asset_cache.generator_key(TREE_GENERATOR, params, params["seed"])
+        asset = asset_cache.lookup(asset_key, "fbx")
+        cache_lookup("asset", asset is not None, log)
+        if asset is not None and thumbnail is not None:
+            log.event("job_finished", cached=True)
+            st.caption("Served from the asset cache")
+            show_thumbnail(thumbnail, None)
+            with open(asset[0], "rb") as f:
+                st.download_button(
+                    label="Download FBX",
+                    data=f.read(),
+                    file_name="colorful_swaying_trees.fbx",
+                    mime="application/octet-stream"
+                )
+            return
+        with st.spinner("Rebuilding scene..."):
+            try:
+                report = get_session_pool().get(user_id).rebuild(
+                    TREE_GENERATOR, params, export_path,
+                    thumbnail=thumbnail_cache.render_settings(thumbnail_path) if thumbnail is None else None,
+                    log=log
+                )
+            except BlenderSessionError as e:
+                METRICS.inc("job_failures_total", {"profile": "session", "class": "session_error"})
+                log.event("job_failed", failure_class="session_error", error=str(e))
+                st.error(f"Error rebuilding scene: {e}")
+                return
+        METRICS.inc("jobs_total", {"profile": "session"})
+        METRICS.observe("blender_wall_seconds", report["rebuild_seconds"] + report["export_seconds"], {"profile": "session"})
+        log.event("job_finished", **{key: report[key] for key in ("rebuild_seconds", "export_seconds")},
+                  rebuilt=len(report["rebuilt"]), kept=len(report["kept"]))
+        asset_cache.store(asset_key, "fbx", export_path, {key: report[key] for key in ("rebuild_seconds", "export_seconds")})
+        st.caption(f"Rebuilt {len(report['rebuilt'])}, kept {len(report['kept'])}, removed {len(report['removed'])} components "
+                   f"in {report['rebuild_seconds']:.2f}s (export {report['export_seconds']:.2f}s)")
+        thumbnail_seconds = report.get("thumbnail_seconds")
+        if thumbnail is None:
+            with open(thumbnail_path, "rb") as f:
+                thumbnail = f.read()
+            thumbnail_cache.store(thumbnail_key, thumbnail, thumbnail_seconds)
+            get_delivery_stats()["thumbnail_render"].observe(thumbnail_seconds)
+        show_thumbnail(thumbnail, thumbnail_seconds)
+        with open(export_path, "rb") as f:
+            st.download_button(
+                label="Download FBX",
+                data=f.read(),
+                file_name="colorful_swaying_trees.fbx",
+                mime="application/octet-stream"
+            )
 
+get_metrics_server()
 st.title("Blender Script Generator")
 
 # Sidebar for API key input
 st.sidebar.header("Configuration")
 api_key = st.sidebar.text_input("Enter your OpenAI API key:", type="password")
 
+mode = st.sidebar.radio("Source:", ["Describe with AI", "Tweak built-in scene"])
+
 # Main app
+if mode == "Tweak built-in scene":
+    tweak_builtin_scene()
+    st.stop()
+
 user_input = st.text_input("Enter a description (e.g., 'spaceship'):")
+# Seeds the random and numpy RNGs the generated script uses; the same script
+# and seed give the same file
+seed = int(st.number_input("Seed", min_value=0, value=0, step=1))
 
 if st.button("Generate and Download"):
     if user_input and api_key:
+        started = time.perf_counter()
+        job_id = uuid.uuid4().hex
+        log = JobLog(job_id)
+        log.event("job_requested", prompt=user_input)
         with st.spinner("Generating Blender script..."):
-            blender_script = generate_blender_script(user_input, api_key)
+            blender_script = generate_blender_script(user_input, api_key, log)
         
+        session = st.session_state.setdefault("user_id", uuid.uuid4().hex)
         if blender_script:
-            st.text_area("Generated Blender Script:", value=blender_script, height=300)
-
-            with st.spinner("Running Blender script and generating FBX..."):
+            # The full-quality build is admitted first and replaces the preview
+            # when done; both wait for capacity behind other sessions' jobs
+            job = {"id": job_id, "script": blender_script, "started": started}
+            try:
+                job["ticket"] = submit_blender_job(session, blender_script, "full", job_id, seed)
+            except AdmissionRejected as e:
+                st.warning(f"The server is busy ({e.reason}). Please try again in about {e.eta:.0f}s.")
+                job = None
+        if blender_script and job:
+            job["full"] = job["ticket"].future
+            with st.spinner("Building a quick preview..."):
                 try:
-                    zip_data = run_blender_script(blender_script)
-                    st.download_button(
-                        label="Download FBX (Zipped)",
-                        data=zip_data,
-                        file_name="blender_output.zip",
-                        mime="application/zip"
-                    )
-                except subprocess.CalledProcessError:
-                    st.error("Error running Blender script. Please check the script for errors.")
+                    job["preview"] = submit_blender_job(session, blender_script, "preview", job_id, seed).future.result()
+                    job["time_to_first_result"] = time.perf_counter() - started
+                    get_delivery_stats()["time_to_first_result"].observe(job["time_to_first_result"])
+                    if job["preview"]["thumbnail_seconds"] is not None:
+                        get_delivery_stats()["thumbnail_render"].observe(job["preview"]["thumbnail_seconds"])
+                except AdmissionRejected:
+                    st.info("Skipping the quick preview while the server is busy; waiting for the full build.")
+                except Exception as e:
+                    # Whatever went wrong, the full build is already admitted
+                    job.pop("preview", None)
+                    st.warning(f"The preview build failed ({failure_class(e)}); waiting for the full build.")
+            st.session_state["job"] = job
     elif not user_input:
         st.warning("Please enter a description.")
     elif not api_key:
         st.warning("Please enter your OpenAI API key in the sidebar.")
+
+if "job" in st.session_state:
+    show_job(st.session_state["job"])
+
+if api_key:
+    show_llm_latency(api_key)
+show_delivery_stats()
@@ -1,15 +1,25 @@
 import bpy
+import argparse
 import math
-import random
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import asset_cache
+import seeding
+import skinning
+import terrain
 
 def clear_scene():
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.object.delete()
 
-def create_ground(size):
-    bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=(0, 0, 0))
-    ground = bpy.context.active_object
+def create_ground(size, heightfield=None):
+    if heightfield is not None:
+        ground = terrain.create_terrain_object(heightfield)
+    else:
+        bpy.ops.mesh.primitive_plane_add(size=size, enter_editmode=False, location=(0, 0, 0))
+        ground = bpy.context.active_object
     ground.name = "Ground"
     material = bpy.data.materials.new(name="GroundMaterial")
     material.use_nodes = True
@@ -17,7 +27,7 @@ def create_ground(size):
     ground.data.materials.append(material)
     return ground
 
-def create_grass_patch(num_blades, area_size):
+def create_grass_patch(num_blades, area_size, rng):
     bpy.ops.mesh.primitive_plane_add(size=1, enter_editmode=True)
     bpy.ops.mesh.subdivide(number_cuts=int(math.sqrt(num_blades))-1)
     bpy.ops.object.mode_set(mode='OBJECT')
@@ -25,9 +35,9 @@ def create_grass_patch(num_blades, area_size):
     grass_patch.name = "GrassPatch"
 
     for v in grass_patch.data.vertices:
-        v.co.x += random.uniform(-0.5, 0.5) * 0.1
-        v.co.y += random.uniform(-0.5, 0.5) * 0.1
-        v.co.z = random.uniform(0.1, 0.3)
+        v.co.x += rng.uniform(-0.5, 0.5) * 0.1
+        v.co.y += rng.uniform(-0.5, 0.5) * 0.1
+        v.co.z = rng.uniform(0.1, 0.3)
 
     material = bpy.data.materials.new(name="GrassMaterial")
     material.use_nodes = True
@@ -37,7 +47,7 @@ def create_grass_patch(num_blades, area_size):
     grass_patch.scale = (area_size, area_size, 1)
     return grass_patch
 
-def create_simple_tree(location, scale):
+def create_simple_tree(location, scale, rng):
     bpy.ops.mesh.primitive_cone_add(radius1=0.5, radius2=0, depth=2, location=(location[0], location[1], location[2]+1))
     tree = bpy.context.active_object
     tree.name = f"Tree_{location[0]}_{location[1]}"
@@ -45,7 +55,7 @@ def create_simple_tree(location, scale):
 
     material = bpy.data.materials.new(name=f"TreeMaterial_{tree.name}")
     material.use_nodes = True
-    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.1, 0.3 + random.uniform(0, 0.2), 0.1, 1)  # Varied green
+    material.node_tree.nodes["Principled BSDF"].inputs[0].default_value = (0.1, 0.3 + rng.uniform(0, 0.2), 0.1, 1)  # Varied green
     tree.data.materials.append(material)
 
     return tree
@@ -88,8 +98,9 @@ def parent_to_armature(obj, armature):
     obj.parent = armature
     obj.modifiers.new(name="Armature", type='ARMATURE')
     obj.modifiers["Armature"].object = armature
+    skinning.skin_mesh(obj, armature)
 
-def add_walk_animation(armature, distance=5):
+def add_walk_animation(armature, distance=5, heightfield=None):
     armature.animation_data_create()
     action = bpy.data.actions.new(name="WalkAction")
     armature.animation_data.action = action
@@ -97,32 +108,53 @@ def add_walk_animation(armature, distance=5):
     frames = 50
     bpy.context.scene.frame_end = frames
 
+    # Ground height along the whole path in one lookup
+    ground_heights = [0] * (frames + 1)
+    if heightfield is not None:
+        ground_heights = heightfield.height_at([frame / frames * distance for frame in range(frames + 1)], [0] * (frames + 1)).tolist()
+
     for frame in range(frames + 1):
         bpy.context.scene.frame_set(frame)
         t = frame / frames
-        armature.location = (t * distance, 0, math.sin(t * 2 * math.pi) * 0.1)
+        armature.location = (t * distance, 0, ground_heights[frame] + math.sin(t * 2 * math.pi) * 0.1)
         armature.keyframe_insert(data_path="location", frame=frame)
 
-def main():
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Generate a nature scene with a walking figure")
+    parser.add_argument("--terrain", action="store_true", help="Generate a heightfield ground and snap the scene onto it")
+    parser.add_argument("--seed", type=int, default=0, help="Seed every random choice in the scene derives from")
+    parser.add_argument("--no-cache", action="store_true", help="Always rebuild instead of reusing a cached export")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def build_scene(args):
     clear_scene()
 
     ground_size = 10
-    ground = create_ground(ground_size)
+    heightfield = terrain.Heightfield.generate(size=ground_size, seed=args.seed) if args.terrain else None
+    ground = create_ground(ground_size, heightfield)
 
-    grass_patch = create_grass_patch(500, ground_size)
+    grass_patch = create_grass_patch(500, ground_size, seeding.stream(args.seed, "grass"))
 
     num_trees = 5
+    trees = []
+    rng = seeding.stream(args.seed, "trees")
     for _ in range(num_trees):
-        x = random.uniform(-ground_size/2, ground_size/2)
-        y = random.uniform(-ground_size/2, ground_size/2)
-        scale = random.uniform(0.5, 1.5)
-        create_simple_tree((x, y, 0), scale)
+        x = rng.uniform(-ground_size/2, ground_size/2)
+        y = rng.uniform(-ground_size/2, ground_size/2)
+        scale = rng.uniform(0.5, 1.5)
+        trees.append(create_simple_tree((x, y, 0), scale, rng))
+
+    if heightfield is not None:
+        terrain.snap_mesh_vertices(heightfield, grass_patch)
+        terrain.snap_objects(heightfield, trees, align=False)
 
     human = create_simple_human()
     armature = create_human_armature()
     parent_to_armature(human, armature)
 
-    add_walk_animation(armature)
+    add_walk_animation(armature, heightfield=heightfield)
 
     bpy.ops.object.camera_add(location=(5, -5, 3), rotation=(math.radians(60), 0, math.radians(45)))
     camera = bpy.context.active_object
@@ -141,9 +173,7 @@ def main():
     bpy.context.scene.frame_end = 50
     bpy.context.scene.render.fps = 24
 
-    desktop_path = os.path.expanduser("~/Desktop")
-    export_path = os.path.join(desktop_path, "optimized_nature_scene.fbx")
-
+def export_scene(export_path):
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.export_scene.fbx(
         filepath=export_path,
@@ -157,7 +187,23 @@ def main():
         use_mesh_modifiers=True
     )
 
-    print(f"Optimized nature scene exported as FBX to: {export_path}")
+def main():
+    args = parse_args()
+    desktop_path = os.path.expanduser("~/Desktop")
+    export_path = os.path.join(desktop_path, "optimized_nature_scene.fbx")
+
+    def build_and_export(path):
+        build_scene(args)
+        export_scene(path)
+
+    if args.no_cache:
+        build_and_export(export_path)
+        cache_hit = False
+    else:
+        # Same generator version, parameters and seed: same file
+        _, cache_hit = asset_cache.memoize(os.path.abspath(__file__), {"terrain": args.terrain}, args.seed, export_path, build_and_export)
+
+    print(f"Optimized nature scene {'copied from the asset cache' if cache_hit else 'exported'} as FBX to: {export_path}")
 
 if __name__ == "__main__":
     main()
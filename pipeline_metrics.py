@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import LatencyHistogram
+
+# Process-wide metrics in the Prometheus text format and structured JSON job
+# logs. Histograms are the LatencyHistogram already used for LLM latency, so
+# the client's own histograms can be exported as they are. Metrics are served
+# on METRICS_PORT from a background thread; logs are one JSON object per line
+# in LOG_PATH ("-" for stderr).
+METRICS_PORT = int(os.environ.get("BLENDER_THING_METRICS_PORT", "9464"))
+LOG_PATH = os.environ.get(
+    "BLENDER_THING_LOG",
+    os.path.join(os.path.expanduser("~"), ".cache", "blender_thing", "jobs.jsonl")
+)
+
+SECONDS_BUCKETS = LatencyHistogram.BUCKETS + (300, 600, 1800)
+BYTE_BUCKETS = tuple(2 ** power for power in range(16, 36, 2))
+
+def _labels(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.help = {}
+        self.counters = {}
+        self.histograms = {}
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, labels=None, value=1):
+        key = _labels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, labels=None, buckets=SECONDS_BUCKETS):
+        self.histogram(name, labels, buckets).observe(value)
+
+    def histogram(self, name, labels=None, buckets=SECONDS_BUCKETS):
+        key = _labels(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = LatencyHistogram(buckets)
+            return series[key]
+
+    def attach(self, name, histogram, labels=None):
+        # Exports a histogram owned by someone else (e.g. the LLM client)
+        with self.lock:
+            self.histograms.setdefault(name, {})[_labels(labels)] = histogram
+
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: dict(series) for name, series in self.histograms.items()}
+        for name, series in sorted(counters.items()):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in sorted(histograms.items()):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(series.items()):
+                snapshot = histogram.snapshot()
+                cumulative = 0
+                for bound, count in snapshot["buckets"].items():
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+METRICS = Registry()
+for name, text in [
+    ("llm_request_seconds", "Wall time from prompt to complete script"),
+    ("llm_queue_seconds", "Time an LLM request waited for a concurrency slot"),
+    ("llm_first_token_seconds", "Time from sending an LLM request to its first token"),
+    ("llm_total_seconds", "Time from sending an LLM request to its last token"),
+    ("llm_failures_total", "LLM requests that failed, by class"),
+    ("job_queue_wait_seconds", "Time a Blender job waited for an executor slot"),
+    ("blender_wall_seconds", "Wall time of a Blender job process"),
+    ("blender_cpu_seconds", "User plus system CPU time of a Blender job process"),
+    ("blender_peak_rss_bytes", "Peak resident set size of a Blender job process"),
+    ("export_bytes", "Size of the file delivered to the user"),
+    ("cache_requests_total", "Cache lookups by cache and result (hit or miss)"),
+    ("job_failures_total", "Blender jobs that failed, by profile and failure class"),
+    ("jobs_total", "Blender jobs finished, by profile"),
+    ("admission_rejections_total", "Blender jobs turned away by admission control, by profile"),
+]:
+    METRICS.describe(name, text)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=METRICS_PORT):
+    # Returns the server, or None if the port is taken (another app instance)
+    try:
+        server = ThreadingHTTPServer(("", port), _Handler)
+    except OSError:
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class JobLog:
+    # Appends {"time", "job", "event", ...} lines; the files are opened once and
+    # shared by every job in the process
+    lock = threading.Lock()
+    files = {}
+
+    def __init__(self, job_id, path=LOG_PATH, **context):
+        self.job_id = job_id
+        self.path = path
+        self.context = context
+
+    def event(self, event, **fields):
+        entry = {"time": round(time.time(), 3), "job": self.job_id, "event": event, **self.context, **fields}
+        line = json.dumps(entry, default=str) + "\n"
+        with JobLog.lock:
+            if self.path == "-":
+                sys.stderr.write(line)
+                return
+            f = JobLog.files.get(self.path)
+            if f is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                f = JobLog.files[self.path] = open(self.path, "a", buffering=1)
+            f.write(line)
+
+def cache_lookup(cache, hit, log=None):
+    METRICS.inc("cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+    if log is not None:
+        log.event("cache_lookup", cache=cache, hit=hit)
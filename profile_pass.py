@@ -0,0 +1,99 @@
+import bpy
+import json
+import math
+import os
+import time
+from mathutils import Vector
+
+# Runs after a generated script and before scene_optimizer.py to apply the job
+# profile chosen by blender_jobs.py (BLENDER_THING_* environment variables):
+# caps the frame range and renders a low-cost CPU Cycles thumbnail for preview
+# jobs. The session server reuses render_thumbnail for built-in scenes.
+
+def cap_frame_range(scene, max_frames):
+    scene.frame_end = min(scene.frame_end, scene.frame_start + max_frames - 1)
+
+def scene_bounds(scene):
+    corners = [obj.matrix_world @ Vector(corner) for obj in scene.objects if obj.type == 'MESH' for corner in obj.bound_box]
+    if not corners:
+        return Vector((0, 0, 0)), 1.0
+    low = Vector((min(c.x for c in corners), min(c.y for c in corners), min(c.z for c in corners)))
+    high = Vector((max(c.x for c in corners), max(c.y for c in corners), max(c.z for c in corners)))
+    return (low + high) / 2, max((high - low).length / 2, 0.1)
+
+def ensure_camera(scene):
+    # Generated scripts do not always add a camera; frame everything from above-front
+    if scene.camera is not None:
+        return scene.camera
+    center, radius = scene_bounds(scene)
+    camera_data = bpy.data.cameras.new("ThumbnailCamera")
+    camera = bpy.data.objects.new("ThumbnailCamera", camera_data)
+    scene.collection.objects.link(camera)
+    distance = radius / math.tan(camera_data.angle / 2) * 1.2
+    camera.location = center + Vector((1, -1, 0.7)).normalized() * distance
+    camera.rotation_euler = (center - camera.location).to_track_quat('-Z', 'Y').to_euler()
+    scene.camera = camera
+    return camera
+
+def thumbnail_settings(scene, width, samples, time_limit, threads):
+    # Low-cost CPU Cycles: a handful of adaptive samples at thumbnail size, one
+    # tile covering the whole image and every core of the worker
+    render, cycles = scene.render, scene.cycles
+    height = width * 9 // 16
+    return [
+        (render, "engine", 'CYCLES'),
+        (cycles, "device", 'CPU'),
+        (cycles, "samples", samples),
+        (cycles, "use_adaptive_sampling", True),
+        (cycles, "adaptive_threshold", 0.1),
+        (cycles, "time_limit", time_limit),
+        (cycles, "max_bounces", 4),
+        (cycles, "use_denoising", False),
+        (cycles, "use_auto_tile", False),
+        (cycles, "tile_size", max(width, height)),
+        (render, "threads_mode", 'FIXED'),
+        (render, "threads", threads),
+        (render, "resolution_x", width),
+        (render, "resolution_y", height),
+        (render, "resolution_percentage", 100),
+        (render.image_settings, "file_format", 'PNG'),
+    ]
+
+def render_thumbnail(scene, path, width=320, samples=16, time_limit=0, threads=None):
+    ensure_camera(scene)
+    settings = thumbnail_settings(scene, width, samples, time_limit, threads or os.cpu_count() or 1)
+    saved = [(owner, name, getattr(owner, name)) for owner, name, _ in settings]
+    saved.append((scene.render, "filepath", scene.render.filepath))
+    for owner, name, value in settings:
+        setattr(owner, name, value)
+    scene.render.filepath = path
+    start = time.perf_counter()
+    try:
+        bpy.ops.render.render(write_still=True)
+    finally:
+        for owner, name, value in saved:
+            setattr(owner, name, value)
+    return time.perf_counter() - start
+
+def main():
+    scene = bpy.context.scene
+    max_frames = os.environ.get("BLENDER_THING_MAX_FRAMES")
+    if max_frames:
+        cap_frame_range(scene, int(max_frames))
+    thumbnail = os.environ.get("BLENDER_THING_THUMBNAIL")
+    if thumbnail:
+        seconds = render_thumbnail(
+            scene,
+            thumbnail,
+            width=int(os.environ.get("BLENDER_THING_THUMBNAIL_WIDTH", "320")),
+            samples=int(os.environ.get("BLENDER_THING_THUMBNAIL_SAMPLES", "16")),
+            time_limit=float(os.environ.get("BLENDER_THING_THUMBNAIL_TIME_LIMIT", "0")),
+            threads=int(os.environ.get("BLENDER_THING_THUMBNAIL_THREADS", "0"))
+        )
+        report_path = os.environ.get("BLENDER_THING_THUMBNAIL_REPORT")
+        if report_path:
+            with open(report_path, "w") as f:
+                json.dump({"seconds": seconds}, f)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+
+from bpy.ops import _BPyOpsSubModOp as Operator
+
+# Runs before a generated script. Generated scripts export on their own, and
+# only the optimizer's final export is delivered; in a profile without
+# animation baking (BLENDER_THING_BAKE_ANIM=0) the script's exports are made
+# without baking, so a preview does not pay for a bake it throws away.
+
+EXPORT_OPTIONS = {
+    "export_scene.fbx": {"bake_anim": False},
+    "export_scene.gltf": {"export_animations": False},
+}
+
+def without_baking(call):
+    def call_without_baking(self, *args, **kwargs):
+        kwargs.update(EXPORT_OPTIONS.get(self.idname_py(), {}))
+        return call(self, *args, **kwargs)
+    return call_without_baking
+
+if os.environ.get("BLENDER_THING_BAKE_ANIM", "1") == "0":
+    Operator.__call__ = without_baking(Operator.__call__)
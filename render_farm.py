@@ -0,0 +1,234 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT = os.path.join(APP_DIR, "render_worker.py")
+
+# Splits a scene's frame range into chunks and renders them on several headless
+# Blender processes. The queue is a directory: the scheduler writes chunk files
+# to pending/, workers claim them by renaming into claimed/ and report to done/.
+# Chunk sizes follow the measured time per frame so every chunk takes about
+# target_chunk_seconds, shrinking towards the end so workers finish together.
+# Claims whose heartbeat goes stale and chunks that fail are retried.
+
+class RenderFarmError(Exception):
+    pass
+
+def prepare_scene(source, queue_dir, blender="blender"):
+    # Runs a generator script (or opens a .blend) once and saves the result
+    # where every worker can load it
+    blend_path = os.path.join(queue_dir, "scene.blend")
+    command = [blender, "--background"]
+    if source.endswith(".blend"):
+        command.append(source)
+    else:
+        command += ["--python", source]
+    command += ["--python", WORKER_SCRIPT]
+    # Generator scripts may export next to the working directory
+    subprocess.run(command, check=True, cwd=queue_dir, env=dict(os.environ, RENDER_FARM_PREPARE=blend_path))
+    with open(os.path.splitext(blend_path)[0] + ".json") as f:
+        return blend_path, json.load(f)
+
+class RenderFarm:
+    def __init__(self, queue_dir, workers=None, remote_workers=0, blender="blender", target_chunk_seconds=30,
+                 max_attempts=3, stale_after=900, poll=0.5):
+        # workers: local Blender processes; remote_workers: how many workers
+        # other hosts are expected to run against the same queue directory
+        self.queue_dir = os.path.abspath(queue_dir)
+        self.workers = max(1, (os.cpu_count() or 1) // 4) if workers is None else workers
+        self.slots = max(1, self.workers + remote_workers)
+        self.blender = blender
+        self.target_chunk_seconds = target_chunk_seconds
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.poll = poll
+        for name in ("pending", "claimed", "done", "frames"):
+            os.makedirs(os.path.join(self.queue_dir, name), exist_ok=True)
+
+    def start_workers(self):
+        # Split the cores between local workers instead of letting each
+        # Blender process spawn one thread per core
+        threads = max(1, (os.cpu_count() or 1) // max(1, self.workers))
+        return [
+            subprocess.Popen([self.blender, "--background", "--python", WORKER_SCRIPT, "--",
+                              self.queue_dir, "--worker-id", f"local-{index}", "--threads", str(threads)],
+                             stdout=subprocess.DEVNULL)
+            for index in range(self.workers)
+        ]
+
+    def chunk_size(self, frame_seconds, remaining):
+        if not frame_seconds:
+            # Nothing measured yet: single-frame probes
+            return 1
+        per_frame = statistics.median(frame_seconds)
+        size = max(1, round(self.target_chunk_seconds / per_frame))
+        return max(1, min(size, -(-remaining // (2 * self.slots))))
+
+    def enqueue(self, chunk):
+        path = os.path.join(self.queue_dir, "pending", f"{chunk['id']}.json")
+        with open(path + ".partial", "w") as f:
+            json.dump(chunk, f)
+        os.replace(path + ".partial", path)
+
+    def retry(self, chunk, error):
+        chunk["errors"].append(error)
+        if chunk["attempt"] + 1 >= self.max_attempts:
+            raise RenderFarmError(f"Chunk {chunk['id']} (frames {chunk['frame_start']}-{chunk['frame_end']}) "
+                                  f"failed {self.max_attempts} times:\n{error}")
+        chunk["attempt"] += 1
+        self.enqueue(chunk)
+
+    def requeue_stale(self, outstanding):
+        now = time.time()
+        for path in glob.glob(os.path.join(self.queue_dir, "claimed", "*.json")):
+            chunk_id, worker = os.path.basename(path)[:-5].split("@", 1)
+            try:
+                stale = now - os.path.getmtime(path) > self.stale_after
+            except FileNotFoundError:
+                continue
+            if stale and chunk_id in outstanding:
+                os.remove(path)
+                self.retry(outstanding[chunk_id], f"worker {worker} stopped responding")
+
+    def collect(self, outstanding, results):
+        for path in glob.glob(os.path.join(self.queue_dir, "done", "*.json")):
+            with open(path) as f:
+                result = json.load(f)
+            os.remove(path)
+            chunk = outstanding.get(result["id"])
+            # Late results from a chunk that was already retried are dropped
+            if chunk is None or result["attempt"] != chunk["attempt"]:
+                continue
+            if result["ok"]:
+                del outstanding[result["id"]]
+                results.append(dict(chunk, **result))
+            else:
+                self.retry(chunk, result["error"])
+
+    def render(self, blend_path, frame_start, frame_end):
+        prefix = f"{int(time.time() * 1000):x}"
+        stop = os.path.join(self.queue_dir, "stop")
+        if os.path.exists(stop):
+            os.remove(stop)
+        output = os.path.join(self.queue_dir, "frames", "frame_####")
+        processes = self.start_workers()
+        outstanding, results, frame_seconds = {}, [], []
+        next_frame = frame_start
+        start = time.perf_counter()
+        try:
+            while next_frame <= frame_end or outstanding:
+                self.collect(outstanding, results)
+                frame_seconds = [seconds for result in results for seconds in result["frame_seconds"].values()]
+                self.requeue_stale(outstanding)
+                pending = len(os.listdir(os.path.join(self.queue_dir, "pending")))
+                while next_frame <= frame_end and pending < self.slots:
+                    size = self.chunk_size(frame_seconds, frame_end - next_frame + 1)
+                    chunk = {
+                        "id": f"{prefix}-{next_frame:06d}",
+                        "blend": blend_path,
+                        "frame_start": next_frame,
+                        "frame_end": min(frame_end, next_frame + size - 1),
+                        "output": output,
+                        "attempt": 0,
+                        "errors": [],
+                    }
+                    outstanding[chunk["id"]] = chunk
+                    self.enqueue(chunk)
+                    next_frame = chunk["frame_end"] + 1
+                    pending += 1
+                if processes and all(process.poll() is not None for process in processes):
+                    raise RenderFarmError("All local render workers exited")
+                time.sleep(self.poll)
+        finally:
+            open(stop, "w").close()
+            for process in processes:
+                try:
+                    process.wait(timeout=60)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        results.sort(key=lambda result: result["frame_start"])
+        return {"seconds": time.perf_counter() - start, "workers": self.workers, "chunks": timing_report(results)}
+
+def timing_report(results):
+    return [
+        {
+            "frames": [result["frame_start"], result["frame_end"]],
+            "worker": result["worker"],
+            "host": result["host"],
+            "seconds": round(result["seconds"], 3),
+            "per_frame": round(result["seconds"] / len(result["frame_seconds"]), 3),
+            "attempts": result["attempt"] + 1,
+        }
+        for result in results
+    ]
+
+def assemble(queue_dir, output_dir, frame_start, frame_end):
+    # Frames are written under the queue by whichever worker rendered them;
+    # gather them into one contiguous sequence
+    os.makedirs(output_dir, exist_ok=True)
+    missing = []
+    for frame in range(frame_start, frame_end + 1):
+        rendered = glob.glob(os.path.join(queue_dir, "frames", f"frame_{frame:04d}.*"))
+        if not rendered:
+            missing.append(frame)
+            continue
+        shutil.move(rendered[0], os.path.join(output_dir, os.path.basename(rendered[0])))
+    return missing
+
+def print_report(report):
+    for chunk in report["chunks"]:
+        first, last = chunk["frames"]
+        retried = f", {chunk['attempts']} attempts" if chunk["attempts"] > 1 else ""
+        print(f"Frames {first}-{last}: {chunk['seconds']:.1f}s ({chunk['per_frame']:.2f}s/frame) on {chunk['worker']}@{chunk['host']}{retried}")
+    frames = sum(chunk["frames"][1] - chunk["frames"][0] + 1 for chunk in report["chunks"])
+    print(f"{frames} frames in {report['seconds']:.1f}s with {report['workers']} local workers")
+
+def parse_frames(value):
+    first, _, last = value.partition("-")
+    return int(first), int(last or first)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render a scene's frame range on several Blender processes")
+    parser.add_argument("source", help="Generator script or .blend file")
+    parser.add_argument("output", help="Directory for the assembled frame sequence")
+    parser.add_argument("--frames", type=parse_frames, help="Frame range such as 1-250 (default: the scene's)")
+    parser.add_argument("--workers", type=int, help="Local Blender processes (0 to rely on other hosts only)")
+    parser.add_argument("--remote-workers", type=int, default=0, help="Workers expected from other hosts")
+    parser.add_argument("--queue", help="Queue directory; put it on shared storage to add remote workers")
+    parser.add_argument("--target-chunk-seconds", type=float, default=30)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--stale-after", type=float, default=900, help="Seconds without a finished frame before a chunk is retried")
+    parser.add_argument("--report", help="Write the timing report as JSON to this path")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    queue_dir = os.path.abspath(args.queue or tempfile.mkdtemp(prefix="render_farm_"))
+    farm = RenderFarm(queue_dir, args.workers, args.remote_workers, target_chunk_seconds=args.target_chunk_seconds,
+                      max_attempts=args.max_attempts, stale_after=args.stale_after)
+
+    blend_path, info = prepare_scene(os.path.abspath(args.source), queue_dir)
+    frame_start, frame_end = args.frames or (info["frame_start"], info["frame_end"])
+    try:
+        report = farm.render(blend_path, frame_start, frame_end)
+    except RenderFarmError as e:
+        sys.exit(str(e))
+    missing = assemble(queue_dir, args.output, frame_start, frame_end)
+    report["missing_frames"] = missing
+    print_report(report)
+    if missing:
+        print(f"Missing frames: {missing}")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
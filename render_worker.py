@@ -0,0 +1,103 @@
+import bpy
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+# Blender side of render_farm.py. With RENDER_FARM_PREPARE set it runs after a
+# generator script (or on an opened .blend) and saves the scene plus its frame
+# range for the workers. Otherwise it is a worker: it claims chunk files from
+# the queue directory by renaming them, renders their frames and writes a
+# result file per chunk. Any host that sees the queue directory (e.g. over
+# NFS) can join with:
+#   blender --background --python render_worker.py -- QUEUE_DIR --worker-id NAME
+
+def prepare(blend_path):
+    scene = bpy.context.scene
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+    with open(os.path.splitext(blend_path)[0] + ".json", "w") as f:
+        json.dump({"frame_start": scene.frame_start, "frame_end": scene.frame_end,
+                   "file_format": scene.render.image_settings.file_format}, f)
+
+def claim(queue_dir, worker_id):
+    pending = os.path.join(queue_dir, "pending")
+    for name in sorted(os.listdir(pending)):
+        if not name.endswith(".json"):
+            continue
+        claimed = os.path.join(queue_dir, "claimed", f"{name[:-5]}@{worker_id}.json")
+        try:
+            os.rename(os.path.join(pending, name), claimed)
+        except FileNotFoundError:
+            # Another worker got there first
+            continue
+        # rename keeps the mtime from when the chunk was queued; the claim is
+        # fresh now, not when it entered pending/
+        os.utime(claimed)
+        with open(claimed) as f:
+            return claimed, json.load(f)
+    return None, None
+
+def render_chunk(chunk, claimed, threads):
+    if bpy.data.filepath != chunk["blend"]:
+        bpy.ops.wm.open_mainfile(filepath=chunk["blend"])
+    scene = bpy.context.scene
+    if threads:
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = threads
+    frame_seconds = {}
+    for frame in range(chunk["frame_start"], chunk["frame_end"] + 1):
+        start = time.perf_counter()
+        scene.frame_set(frame)
+        scene.render.filepath = chunk["output"].replace("####", f"{frame:04d}")
+        bpy.ops.render.render(write_still=True)
+        frame_seconds[frame] = time.perf_counter() - start
+        # Heartbeat: the scheduler requeues claims that stop being touched
+        os.utime(claimed)
+    return frame_seconds
+
+def write_result(queue_dir, chunk, result):
+    done = os.path.join(queue_dir, "done", f"{chunk['id']}.{chunk['attempt']}.json")
+    with open(done + ".partial", "w") as f:
+        json.dump(result, f)
+    os.replace(done + ".partial", done)
+
+def work(queue_dir, worker_id, threads=0, poll=0.5):
+    while not os.path.exists(os.path.join(queue_dir, "stop")):
+        claimed, chunk = claim(queue_dir, worker_id)
+        if chunk is None:
+            time.sleep(poll)
+            continue
+        result = {"id": chunk["id"], "attempt": chunk["attempt"], "worker": worker_id, "host": socket.gethostname()}
+        start = time.perf_counter()
+        try:
+            result["frame_seconds"] = render_chunk(chunk, claimed, threads)
+            result["ok"] = True
+        except Exception:
+            result["ok"] = False
+            result["error"] = traceback.format_exc()
+        result["seconds"] = time.perf_counter() - start
+        write_result(queue_dir, chunk, result)
+        if os.path.exists(claimed):
+            os.remove(claimed)
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Render frame chunks from a render_farm.py queue")
+    parser.add_argument("queue", help="Queue directory shared with the scheduler")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--threads", type=int, default=0, help="Render threads (0 keeps the scene setting)")
+    return parser.parse_args(argv)
+
+def main():
+    prepare_path = os.environ.get("RENDER_FARM_PREPARE")
+    if prepare_path:
+        prepare(prepare_path)
+        return
+    args = parse_args()
+    work(os.path.abspath(args.queue), args.worker_id, args.threads)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import bpy
+import math
+
+# Builds a Geometry Nodes scatter on a ground mesh: points are distributed over
+# its faces and each layer instances one of its archetype collections with a
+# random heading and scale, optionally swaying with scene time. Construction
+# cost does not depend on the instance count; the instances only become real
+# geometry when the Realize Instances node is enabled for export.
+REALIZE_NODE = "Realize For Export"
+
+RANDOM_SOCKET_TYPES = {'FLOAT': 'VALUE', 'FLOAT_VECTOR': 'VECTOR', 'INT': 'INT'}
+
+def find_socket(sockets, name, socket_type):
+    # Random Value exposes one Min/Max/Value socket per data type
+    return next(socket for socket in sockets if socket.name == name and socket.type == socket_type)
+
+def random_value(tree, data_type, minimum, maximum, seed):
+    node = tree.nodes.new("FunctionNodeRandomValue")
+    node.data_type = data_type
+    socket_type = RANDOM_SOCKET_TYPES[data_type]
+    find_socket(node.inputs, "Min", socket_type).default_value = minimum
+    find_socket(node.inputs, "Max", socket_type).default_value = maximum
+    node.inputs["Seed"].default_value = seed
+    return find_socket(node.outputs, "Value", socket_type)
+
+def math_node(tree, operation, *inputs):
+    node = tree.nodes.new("ShaderNodeMath")
+    node.operation = operation
+    for socket, value in zip(node.inputs, inputs):
+        if isinstance(value, bpy.types.NodeSocket):
+            tree.links.new(value, socket)
+        else:
+            socket.default_value = value
+    return node.outputs[0]
+
+def add_wind(tree, instances, strength, speed):
+    # Same motion as add_swaying_animation, phase-shifted by instance position
+    links = tree.links
+    time = tree.nodes.new("GeometryNodeInputSceneTime")
+    position = tree.nodes.new("GeometryNodeInputPosition")
+    separate = tree.nodes.new("ShaderNodeSeparateXYZ")
+    links.new(position.outputs["Position"], separate.inputs[0])
+
+    phase = math_node(tree, 'ADD', separate.outputs["X"], separate.outputs["Y"])
+    angle = math_node(tree, 'MULTIPLY_ADD', time.outputs["Seconds"], speed, phase)
+    sway_x = math_node(tree, 'MULTIPLY', math_node(tree, 'SINE', angle), strength)
+    sway_y = math_node(tree, 'MULTIPLY', math_node(tree, 'COSINE', math_node(tree, 'MULTIPLY', angle, 0.7)), strength * 0.5)
+
+    combine = tree.nodes.new("ShaderNodeCombineXYZ")
+    links.new(sway_x, combine.inputs["X"])
+    links.new(sway_y, combine.inputs["Y"])
+
+    rotate = tree.nodes.new("GeometryNodeRotateInstances")
+    links.new(instances, rotate.inputs["Instances"])
+    links.new(combine.outputs["Vector"], rotate.inputs["Rotation"])
+    return rotate.outputs["Instances"]
+
+def add_layer(tree, geometry, layer):
+    # layer: collection (whose child collections are the archetypes), density
+    # per square unit, seed, scale range and optional (strength, speed) wind
+    links = tree.links
+    distribute = tree.nodes.new("GeometryNodeDistributePointsOnFaces")
+    distribute.distribute_method = 'RANDOM'
+    distribute.inputs["Density"].default_value = layer["density"]
+    distribute.inputs["Seed"].default_value = layer["seed"]
+    links.new(geometry, distribute.inputs["Mesh"])
+
+    collection_info = tree.nodes.new("GeometryNodeCollectionInfo")
+    collection_info.inputs["Collection"].default_value = layer["collection"]
+    collection_info.inputs["Separate Children"].default_value = True
+    collection_info.inputs["Reset Children"].default_value = True
+
+    instance = tree.nodes.new("GeometryNodeInstanceOnPoints")
+    instance.inputs["Pick Instance"].default_value = True
+    links.new(distribute.outputs["Points"], instance.inputs["Points"])
+    links.new(collection_info.outputs[0], instance.inputs["Instance"])
+    links.new(random_value(tree, 'INT', 0, 1 << 20, layer["seed"]), instance.inputs["Instance Index"])
+    links.new(random_value(tree, 'FLOAT_VECTOR', (0, 0, 0), (0, 0, 2 * math.pi), layer["seed"] + 1), instance.inputs["Rotation"])
+    links.new(random_value(tree, 'FLOAT', layer["scale"][0], layer["scale"][1], layer["seed"] + 2), instance.inputs["Scale"])
+
+    instances = instance.outputs["Instances"]
+    if layer.get("wind"):
+        instances = add_wind(tree, instances, *layer["wind"])
+    return instances
+
+def build_scatter_tree(name, layers):
+    tree = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    tree.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    tree.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    group_input = tree.nodes.new("NodeGroupInput")
+    group_output = tree.nodes.new("NodeGroupOutput")
+    join = tree.nodes.new("GeometryNodeJoinGeometry")
+    tree.links.new(group_input.outputs["Geometry"], join.inputs["Geometry"])
+    for layer in layers:
+        tree.links.new(add_layer(tree, group_input.outputs["Geometry"], layer), join.inputs["Geometry"])
+
+    realize = tree.nodes.new("GeometryNodeRealizeInstances")
+    realize.name = REALIZE_NODE
+    realize.mute = True
+    tree.links.new(join.outputs["Geometry"], realize.inputs["Geometry"])
+    tree.links.new(realize.outputs["Geometry"], group_output.inputs["Geometry"])
+    return tree
+
+def add_scatter_modifier(obj, layers):
+    modifier = obj.modifiers.new(name="Scatter", type='NODES')
+    modifier.node_group = build_scatter_tree(f"Scatter_{obj.name}", layers)
+    return modifier
+
+def archetype_parent(name, collections):
+    # Collection Info with "Separate Children" yields one instance per child collection
+    parent = bpy.data.collections.new(name)
+    for collection in collections:
+        parent.children.link(collection)
+    return parent
+
+def set_realize(realize, objects=None):
+    for obj in objects if objects is not None else bpy.context.scene.objects:
+        for modifier in obj.modifiers:
+            if modifier.type == 'NODES' and modifier.node_group and REALIZE_NODE in modifier.node_group.nodes:
+                modifier.node_group.nodes[REALIZE_NODE].mute = not realize
@@ -0,0 +1,250 @@
+import bpy
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+# Optimizer pass for any generated scene, run before export:
+#   blender --background --python generator.py --python scene_optimizer.py -- out.fbx
+# Identical materials are collapsed, meshes with identical geometry become
+# linked duplicates of one mesh datablock, and static objects sharing a parent
+# and material set are joined.
+
+COORD_PRECISION = 1e-5
+# (data property, values per element, dtype) of each attribute type; meshes
+# carrying an attribute of any other type are never shared
+ATTRIBUTE_LAYOUT = {
+    "FLOAT": ("value", 1, np.float32),
+    "INT": ("value", 1, np.int32),
+    "INT8": ("value", 1, np.int32),
+    "BOOLEAN": ("value", 1, bool),
+    "FLOAT2": ("vector", 2, np.float32),
+    "INT32_2D": ("value", 2, np.int32),
+    "FLOAT_VECTOR": ("vector", 3, np.float32),
+    "FLOAT_COLOR": ("color", 4, np.float32),
+    "BYTE_COLOR": ("color", 4, np.float32),
+    "QUATERNION": ("value", 4, np.float32),
+}
+# Attributes already covered by the topology and UV buffers above
+HASHED_ATTRIBUTES = {"position", "material_index", "sharp_face"}
+
+def material_signature(material):
+    parts = [tuple(material.diffuse_color), material.blend_method]
+    if material.use_nodes and material.node_tree:
+        for node in sorted(material.node_tree.nodes, key=lambda node: node.name):
+            parts.append(node.bl_idname)
+            image = getattr(node, "image", None)
+            if image is not None:
+                parts.append(image.filepath or image.name)
+            for socket in node.inputs:
+                value = getattr(socket, "default_value", None)
+                if hasattr(value, "__len__"):
+                    value = tuple(round(v, 6) for v in value)
+                elif isinstance(value, float):
+                    value = round(value, 6)
+                parts.append((socket.identifier, value))
+        for link in material.node_tree.links:
+            parts.append((link.from_node.bl_idname, link.from_socket.identifier, link.to_node.bl_idname, link.to_socket.identifier))
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+def dedupe_materials():
+    canonical = {}
+    replacements = {}
+    for material in bpy.data.materials:
+        signature = material_signature(material)
+        replacements[material] = canonical.setdefault(signature, material)
+
+    for mesh in bpy.data.meshes:
+        for i, material in enumerate(mesh.materials):
+            if material is not None and replacements.get(material, material) is not material:
+                mesh.materials[i] = replacements[material]
+    for obj in bpy.data.objects:
+        for slot in obj.material_slots:
+            if slot.link == 'OBJECT' and slot.material is not None:
+                slot.material = replacements.get(slot.material, slot.material)
+
+    unused = {material for material in bpy.data.materials if material.users == 0}
+    if unused:
+        bpy.data.batch_remove(unused)
+    return len(unused)
+
+def read_buffer(collection, attribute, dtype, width=1):
+    buffer = np.empty(len(collection) * width, dtype=dtype)
+    collection.foreach_get(attribute, buffer)
+    return buffer
+
+def geometry_hash(mesh):
+    digest = hashlib.sha1()
+    co = read_buffer(mesh.vertices, "co", np.float32, 3)
+    digest.update(np.round(co / COORD_PRECISION).astype(np.int64).tobytes())
+    digest.update(read_buffer(mesh.edges, "vertices", np.int32, 2).tobytes())
+    digest.update(read_buffer(mesh.loops, "vertex_index", np.int32).tobytes())
+    digest.update(read_buffer(mesh.polygons, "loop_total", np.int32).tobytes())
+    digest.update(read_buffer(mesh.polygons, "material_index", np.int32).tobytes())
+    digest.update(read_buffer(mesh.polygons, "use_smooth", bool).tobytes())
+    uv_names = set()
+    for uv_layer in mesh.uv_layers:
+        uv_names.add(uv_layer.name)
+        digest.update(uv_layer.name.encode("utf-8"))
+        uv = read_buffer(uv_layer.data, "uv", np.float32, 2)
+        digest.update(np.round(uv / COORD_PRECISION).astype(np.int64).tobytes())
+    # Color attributes and any other user-visible attribute (crease, custom
+    # per-face data, ...); internal ones start with "."
+    for attribute in sorted(mesh.attributes, key=lambda attribute: attribute.name):
+        if attribute.name.startswith(".") or attribute.name in HASHED_ATTRIBUTES or attribute.name in uv_names:
+            continue
+        layout = ATTRIBUTE_LAYOUT.get(attribute.data_type)
+        if layout is None:
+            return None
+        digest.update(f"{attribute.name}:{attribute.domain}:{attribute.data_type}".encode("utf-8"))
+        values = read_buffer(attribute.data, *layout)
+        if values.dtype == np.float32:
+            values = np.round(values / COORD_PRECISION).astype(np.int64)
+        digest.update(values.tobytes())
+    for material in mesh.materials:
+        digest.update((material.name if material else "").encode("utf-8"))
+    return digest.hexdigest()
+
+def mesh_bytes(mesh):
+    # Rough in-memory footprint: positions, edges, corners, faces and UVs
+    return (len(mesh.vertices) * 12 + len(mesh.edges) * 8 + len(mesh.loops) * 8
+            + len(mesh.polygons) * 12 + len(mesh.uv_layers) * len(mesh.loops) * 8)
+
+def can_share_mesh(obj):
+    # Vertex weights and shape keys live on the mesh but belong to one object
+    return obj.type == 'MESH' and not obj.vertex_groups and obj.data.shape_keys is None
+
+def link_duplicate_meshes(objects):
+    canonical = {}
+    linked = 0
+    # A mesh can hold vertex weights for another object using it; those are
+    # not part of the hash, so such meshes are never shared either
+    weighted = {obj.data for obj in bpy.data.objects if obj.type == 'MESH' and obj.vertex_groups}
+    for obj in objects:
+        if not can_share_mesh(obj) or obj.data in weighted:
+            continue
+        key = geometry_hash(obj.data)
+        if key is None:
+            continue
+        mesh = canonical.setdefault(key, obj.data)
+        if obj.data is not mesh:
+            obj.data = mesh
+            linked += 1
+
+    unused = {mesh for mesh in bpy.data.meshes if mesh.users == 0}
+    if unused:
+        bpy.data.batch_remove(unused)
+    return linked
+
+def is_animated(datablock):
+    animation_data = getattr(datablock, "animation_data", None)
+    return animation_data is not None and (
+        animation_data.action is not None or len(animation_data.drivers) > 0 or len(animation_data.nla_tracks) > 0
+    )
+
+def can_merge(obj):
+    return (
+        can_share_mesh(obj)
+        and obj.data.users == 1
+        and not obj.children
+        and not obj.modifiers
+        and not obj.constraints
+        and not is_animated(obj)
+        and not is_animated(obj.data)
+    )
+
+def merge_static_objects(objects):
+    groups = defaultdict(list)
+    for obj in objects:
+        if can_merge(obj):
+            materials = tuple(material.name if material else "" for material in obj.data.materials)
+            groups[(obj.parent, obj.parent_type, obj.parent_bone, materials)].append(obj)
+
+    merged = 0
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        with bpy.context.temp_override(active_object=group[0], object=group[0], selected_objects=group, selected_editable_objects=group):
+            bpy.ops.object.join()
+        merged += len(group) - 1
+    return merged
+
+def scene_stats(scene):
+    meshes = {obj.data for obj in scene.objects if obj.type == 'MESH'}
+    return {
+        "objects": len(scene.objects),
+        "meshes": len(meshes),
+        "materials": len(bpy.data.materials),
+        "mesh_bytes": sum(mesh_bytes(mesh) for mesh in meshes),
+    }
+
+def export_fbx(export_path, bake_anim=True):
+    bpy.ops.export_scene.fbx(filepath=export_path, use_selection=False, bake_anim=bake_anim)
+
+def export_output(export_path, bake_anim=True):
+    if export_path.lower().endswith(".glb"):
+        bpy.ops.export_scene.gltf(filepath=export_path, export_format='GLB', use_selection=False, export_animations=bake_anim)
+    else:
+        export_fbx(export_path, bake_anim)
+
+def export_size(bake_anim=True):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "measure.fbx")
+        export_fbx(path, bake_anim)
+        return os.path.getsize(path)
+
+def optimize_scene(scene=None, merge=True, measure_export=False):
+    scene = scene or bpy.context.scene
+    start = time.perf_counter()
+    report = {"before": scene_stats(scene)}
+    if measure_export:
+        report["before"]["export_bytes"] = export_size()
+
+    report["materials_removed"] = dedupe_materials()
+    report["meshes_linked"] = link_duplicate_meshes(list(scene.objects))
+    report["objects_merged"] = merge_static_objects(list(scene.objects)) if merge else 0
+
+    report["after"] = scene_stats(scene)
+    if measure_export:
+        report["after"]["export_bytes"] = export_size()
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def print_report(report):
+    before, after = report["before"], report["after"]
+    print(f"Materials removed: {report['materials_removed']}, meshes linked: {report['meshes_linked']}, objects merged: {report['objects_merged']}")
+    for key in before:
+        saved = before[key] - after.get(key, before[key])
+        print(f"  {key}: {before[key]} -> {after.get(key)} (saved {saved})")
+    print(f"Optimizer pass took {report['seconds']:.3f}s")
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Deduplicate and merge scene geometry, then export FBX or GLB")
+    parser.add_argument("output", nargs="?", help="FBX or GLB path to (re-)export the optimized scene to")
+    parser.add_argument("--no-merge", action="store_true", help="Only link duplicates, never join objects")
+    parser.add_argument("--measure-export", action="store_true", help="Export before and after to compare file sizes")
+    parser.add_argument("--report", default=os.environ.get("SCENE_OPTIMIZER_REPORT"), help="Write the optimizer report as JSON to this path")
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def main():
+    args = parse_args()
+    report = optimize_scene(merge=not args.no_merge, measure_export=args.measure_export)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.output:
+        # Preview jobs skip animation baking (see blender_jobs.py)
+        export_output(args.output, bake_anim=os.environ.get("BLENDER_THING_BAKE_ANIM", "1") != "0")
+        print(f"Optimized scene exported to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import bpy
+import hashlib
+import json
+from collections import namedtuple
+
+# Every generated datablock is tagged with the component that built it and a
+# key derived from the parameters that component depends on. A rebuild only
+# touches components whose key changed.
+COMPONENT_PROP = "rebuild_component"
+KEY_PROP = "rebuild_key"
+
+Component = namedtuple("Component", ["name", "key", "build"])
+
+def component_key(params, keys, version=""):
+    payload = json.dumps({key: params.get(key) for key in sorted(keys)}, sort_keys=True, default=str)
+    return hashlib.sha1(f"{version}:{payload}".encode("utf-8")).hexdigest()
+
+def owned_datablocks(obj):
+    owned = []
+    if obj.data is not None:
+        owned.append(obj.data)
+        for material in getattr(obj.data, "materials", []):
+            if material is not None:
+                owned.append(material)
+    for slot in obj.material_slots:
+        if slot.material is not None:
+            owned.append(slot.material)
+    for holder in (obj, obj.data):
+        animation_data = getattr(holder, "animation_data", None)
+        if animation_data is None:
+            continue
+        if animation_data.action is not None:
+            owned.append(animation_data.action)
+        for track in animation_data.nla_tracks:
+            for strip in track.strips:
+                if strip.action is not None:
+                    owned.append(strip.action)
+    return owned
+
+def tag(obj, name, key):
+    for block in [obj] + owned_datablocks(obj):
+        block[COMPONENT_PROP] = name
+        block[KEY_PROP] = key
+
+def scan_components(scene):
+    index = {}
+    for obj in scene.objects:
+        name = obj.get(COMPONENT_PROP)
+        if name is None:
+            continue
+        entry = index.setdefault(name, {"key": obj.get(KEY_PROP), "objects": []})
+        entry["objects"].append(obj)
+    return index
+
+def remove_objects(objects):
+    owned = []
+    for obj in objects:
+        owned.extend(owned_datablocks(obj))
+    bpy.data.batch_remove(set(objects))
+    # Meshes, materials and actions go only once nothing else uses them, so
+    # data shared with a kept component survives.
+    orphans = {block for block in owned if block.users == 0}
+    if orphans:
+        bpy.data.batch_remove(orphans)
+
+def rebuild(components, scene=None):
+    scene = scene or bpy.context.scene
+    index = scan_components(scene)
+    declared = {component.name for component in components}
+    report = {"kept": [], "rebuilt": [], "removed": []}
+
+    stale = []
+    for name, entry in index.items():
+        if name not in declared:
+            stale.extend(entry["objects"])
+            report["removed"].append(name)
+
+    pending = []
+    for component in components:
+        entry = index.get(component.name)
+        if entry is not None and entry["key"] == component.key:
+            report["kept"].append(component.name)
+            continue
+        if entry is not None:
+            stale.extend(entry["objects"])
+        pending.append(component)
+
+    if stale:
+        remove_objects(stale)
+
+    for component in pending:
+        for obj in component.build() or ():
+            tag(obj, component.name, component.key)
+        report["rebuilt"].append(component.name)
+
+    return report
@@ -0,0 +1,19 @@
+import hashlib
+import random
+
+# Generators take an explicit seed and never touch the global random module.
+# Each component (grass, rocks, tree 3, ...) draws from its own stream derived
+# from the seed and the component's name, so drawing more or fewer values in
+# one component never shifts the values another one gets.
+
+def stream_seed(seed, *names):
+    payload = ":".join(str(part) for part in (seed, *names))
+    return int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest()[:8], "little")
+
+def stream(seed, *names):
+    return random.Random(stream_seed(seed, *names))
+
+def node_seed(seed, *names):
+    # Geometry Nodes seeds are 32-bit signed ints; scatter_nodes adds small
+    # offsets per socket, so leave headroom below the limit
+    return stream_seed(seed, *names) % (1 << 30)
@@ -0,0 +1,65 @@
+import bpy
+
+import numpy as np
+
+# Vertex-to-bone weights computed in NumPy instead of parent_set with automatic
+# weights: each vertex is weighted by inverse distance to every deform bone
+# segment, only the closest influences are kept and rows are normalized. The
+# result is written with one vertex_group.add call per (bone, weight) pair,
+# weights being quantized to WEIGHT_STEPS levels so those pairs stay few.
+WEIGHT_STEPS = 255
+
+def bone_segments(armature):
+    bones = [bone for bone in armature.data.bones if bone.use_deform]
+    heads = np.array([bone.head_local for bone in bones], dtype=np.float64).reshape(-1, 3)
+    tails = np.array([bone.tail_local for bone in bones], dtype=np.float64).reshape(-1, 3)
+    return [bone.name for bone in bones], heads, tails
+
+def segment_distances(points, heads, tails):
+    # (V, B) distance from every point to every head-tail segment
+    axis = tails - heads
+    length_sq = np.maximum((axis * axis).sum(axis=1), 1e-12)
+    offsets = points[:, None, :] - heads[None, :, :]
+    t = np.clip((offsets * axis[None]).sum(axis=2) / length_sq, 0, 1)
+    return np.linalg.norm(offsets - t[..., None] * axis[None], axis=2)
+
+def compute_weights(points, heads, tails, influences=4, falloff=2.0, epsilon=1e-4):
+    # Returns (V, k) bone indices and normalized weights, k = min(influences, B)
+    distances = segment_distances(np.asarray(points, dtype=np.float64), heads, tails)
+    k = min(influences, distances.shape[1])
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    weights = 1 / (np.take_along_axis(distances, nearest, axis=1) + epsilon) ** falloff
+    return nearest, weights / weights.sum(axis=1, keepdims=True)
+
+def mesh_points(obj, armature):
+    # Vertex positions in armature space, where bone head_local/tail_local live
+    bpy.context.view_layer.update()
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    matrix = np.array(armature.matrix_world.inverted() @ obj.matrix_world, dtype=np.float64)
+    return co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+def write_vertex_groups(obj, bone_names, nearest, weights):
+    groups = [obj.vertex_groups.get(name) or obj.vertex_groups.new(name=name) for name in bone_names]
+    vertices = np.repeat(np.arange(len(nearest)), nearest.shape[1])
+    bones = nearest.ravel()
+    levels = np.rint(weights.ravel() * WEIGHT_STEPS).astype(np.int64)
+    keep = levels > 0
+    vertices, bones, levels = vertices[keep], bones[keep], levels[keep]
+
+    keys = bones * (WEIGHT_STEPS + 1) + levels
+    order = np.argsort(keys, kind="stable")
+    keys, vertices = keys[order], vertices[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    for start, end in zip(starts, np.r_[starts[1:], len(keys)]):
+        bone, level = divmod(int(keys[start]), WEIGHT_STEPS + 1)
+        groups[bone].add(vertices[start:end].tolist(), level / WEIGHT_STEPS, 'REPLACE')
+    return len(starts)
+
+def skin_mesh(obj, armature, influences=4, falloff=2.0):
+    bone_names, heads, tails = bone_segments(armature)
+    if not bone_names or not len(obj.data.vertices):
+        return 0
+    nearest, weights = compute_weights(mesh_points(obj, armature), heads, tails, influences, falloff)
+    return write_vertex_groups(obj, bone_names, nearest, weights)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR = os.path.join(APP_DIR, "detailed-spaceship-generator.py")
+
+# Fans a seed range out over a pool of Blender processes. Each process takes a
+# batch of seeds and builds them one after another in fleet mode, so Blender
+# startup is paid once per batch instead of once per ship; the per-batch
+# manifests are merged into one manifest for the whole fleet.
+
+def batches(seeds, size):
+    return [seeds[start:start + size] for start in range(0, len(seeds), size)]
+
+def run_batch(seeds, output_dir, extra_args, blender="blender"):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        manifest_path = f.name
+    try:
+        start = time.perf_counter()
+        subprocess.run(
+            [blender, "--background", "--factory-startup", "--python", GENERATOR, "--",
+             "--seeds", *map(str, seeds), "--output-dir", output_dir, "--manifest", manifest_path, *extra_args],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+        seconds = time.perf_counter() - start
+        with open(manifest_path) as f:
+            variants = json.load(f)
+    finally:
+        os.remove(manifest_path)
+    # Whatever the ships themselves did not account for is startup and teardown
+    work = sum(variant["build_seconds"] + variant["export_seconds"] for variant in variants)
+    return {"seeds": [seeds[0], seeds[-1]], "seconds": seconds, "overhead_seconds": seconds - work}, variants
+
+def generate_fleet(seeds, output_dir, workers=None, batch_size=25, space=None, lods=0, blender="blender", use_cache=True):
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    extra_args = []
+    if space:
+        extra_args += ["--space", os.path.abspath(space)]
+    if lods:
+        extra_args += ["--lods", str(lods)]
+    if not use_cache:
+        extra_args.append("--no-cache")
+
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_batch, batch, output_dir, extra_args, blender) for batch in batches(list(seeds), batch_size)]
+        results = [future.result() for future in futures]
+
+    manifest = {
+        "generator": os.path.basename(GENERATOR),
+        "workers": workers,
+        "batch_size": batch_size,
+        "seconds": time.perf_counter() - start,
+        "batches": [batch for batch, _ in results],
+        "variants": sorted((variant for _, variants in results for variant in variants), key=lambda variant: variant["seed"]),
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def parse_seeds(value):
+    first, _, last = value.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a fleet of spaceship variants on a pool of Blender processes")
+    parser.add_argument("seeds", type=parse_seeds, help="Seed range such as 0-299")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, help="Concurrent Blender processes (default: half the cores)")
+    parser.add_argument("--batch-size", type=int, default=25, help="Ships built per Blender launch")
+    parser.add_argument("--space", help="JSON file overriding entries of the parameter space")
+    parser.add_argument("--lods", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true", help="Rebuild every variant instead of copying cached exports")
+    args = parser.parse_args()
+    manifest = generate_fleet(args.seeds, args.output_dir, args.workers, args.batch_size, args.space, args.lods,
+                              use_cache=not args.no_cache)
+    overhead = sum(batch["overhead_seconds"] for batch in manifest["batches"])
+    cached = sum(variant["cached"] for variant in manifest["variants"])
+    print(f"{len(manifest['variants'])} spaceships ({cached} from the asset cache) in {manifest['seconds']:.1f}s with {manifest['workers']} workers "
+          f"({overhead:.1f}s Blender startup across {len(manifest['batches'])} batches)")
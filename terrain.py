@@ -0,0 +1,104 @@
+import bpy
+
+import numpy as np
+
+from rock_displacement import fbm
+
+# Heightfield terrain: fractal noise heights on a regular grid, written into a
+# mesh with foreach_set, plus vectorized bilinear height and normal lookups
+# used to snap scattered objects onto the surface in one pass.
+
+class Heightfield:
+    def __init__(self, size, heights):
+        # heights[row, column] covers [-size/2, size/2] on both axes; rows run along y
+        self.size = size
+        self.heights = np.asarray(heights, dtype=np.float64)
+        self.resolution = self.heights.shape[0]
+        self.cell = size / (self.resolution - 1)
+
+    @classmethod
+    def generate(cls, size=10, resolution=65, seed=0, amplitude=0.6, frequency=0.2, octaves=5):
+        axis = np.linspace(-size / 2, size / 2, resolution)
+        grid_x, grid_y = np.meshgrid(axis, axis)
+        points = np.stack([grid_x, grid_y, np.zeros_like(grid_x)], axis=-1) * frequency
+        return cls(size, fbm(points, seed, octaves) * amplitude)
+
+    def _cells(self, x, y):
+        u = np.clip((np.asarray(x, dtype=np.float64) + self.size / 2) / self.cell, 0, self.resolution - 1)
+        v = np.clip((np.asarray(y, dtype=np.float64) + self.size / 2) / self.cell, 0, self.resolution - 1)
+        column = np.minimum(np.floor(u).astype(np.int64), self.resolution - 2)
+        row = np.minimum(np.floor(v).astype(np.int64), self.resolution - 2)
+        h = self.heights
+        corners = (h[row, column], h[row, column + 1], h[row + 1, column], h[row + 1, column + 1])
+        return u - column, v - row, corners
+
+    def height_at(self, x, y):
+        fu, fv, (h00, h10, h01, h11) = self._cells(x, y)
+        return (h00 * (1 - fu) + h10 * fu) * (1 - fv) + (h01 * (1 - fu) + h11 * fu) * fv
+
+    def normal_at(self, x, y):
+        fu, fv, (h00, h10, h01, h11) = self._cells(x, y)
+        dx = ((h10 - h00) * (1 - fv) + (h11 - h01) * fv) / self.cell
+        dy = ((h01 - h00) * (1 - fu) + (h11 - h10) * fu) / self.cell
+        normals = np.stack([-dx, -dy, np.ones_like(dx)], axis=-1)
+        return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+    def vertex_positions(self):
+        axis = np.linspace(-self.size / 2, self.size / 2, self.resolution)
+        grid_x, grid_y = np.meshgrid(axis, axis)
+        return np.stack([grid_x, grid_y, self.heights], axis=-1).reshape(-1, 3)
+
+def create_terrain_object(heightfield, name="Ground"):
+    resolution = heightfield.resolution
+    index = np.arange(resolution * resolution).reshape(resolution, resolution)
+    # Counter-clockwise quads seen from above so normals point up
+    quads = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]], axis=-1).ravel()
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(resolution * resolution)
+    mesh.vertices.foreach_set("co", heightfield.vertex_positions().astype(np.float32).ravel())
+    mesh.loops.add(len(quads))
+    mesh.loops.foreach_set("vertex_index", quads.astype(np.int32))
+    mesh.polygons.add((resolution - 1) ** 2)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, len(quads), 4, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+    terrain = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(terrain)
+    return terrain
+
+def surface_rotations(normals, headings):
+    # Euler XYZ angles that tilt +Z onto each normal while keeping the heading
+    # about world Z: R = Rz(heading) Ry(b) Rx(a)
+    cos_h, sin_h = np.cos(headings), np.sin(headings)
+    local_x = cos_h * normals[:, 0] + sin_h * normals[:, 1]
+    local_y = -sin_h * normals[:, 0] + cos_h * normals[:, 1]
+    local_z = normals[:, 2]
+    a = np.arctan2(-local_y, np.sqrt(local_x ** 2 + local_z ** 2))
+    b = np.arctan2(local_x, local_z)
+    return np.stack([a, b, headings], axis=-1)
+
+def snap_objects(heightfield, objects, align=True):
+    # An object's current z is kept as its height above the surface
+    if not objects:
+        return
+    locations = np.array([obj.location for obj in objects], dtype=np.float64)
+    locations[:, 2] += heightfield.height_at(locations[:, 0], locations[:, 1])
+    if align:
+        headings = np.array([obj.rotation_euler.z for obj in objects])
+        rotations = surface_rotations(heightfield.normal_at(locations[:, 0], locations[:, 1]), headings)
+        for obj, rotation in zip(objects, rotations.tolist()):
+            obj.rotation_euler = rotation
+    for obj, location in zip(objects, locations.tolist()):
+        obj.location = location
+
+def snap_mesh_vertices(heightfield, obj):
+    # Raise every vertex of a flat mesh (e.g. a grass patch) onto the surface
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+    world = co * np.array(obj.scale) + np.array(obj.location)
+    co[:, 2] += heightfield.height_at(world[:, 0], world[:, 1]) / obj.scale.z
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.update()
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+def cost(seconds=1.0, cores=1, memory_bytes=100):
+    return {"profile": "full", "units": 0, "geometry": 0, "seconds": seconds, "cores": cores, "memory_bytes": memory_bytes}
+
+class Jobs:
+    # Job functions that block until released and record the order they start in
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    def __call__(self, name):
+        self.started.append(name)
+        self.gates.setdefault(name, threading.Event()).wait(5)
+        return name
+
+    def release(self, *names):
+        for name in names:
+            self.gates.setdefault(name, threading.Event()).set()
+
+@pytest.fixture
+def jobs():
+    jobs = Jobs()
+    yield jobs
+    jobs.release(*jobs.gates)
+
+def controller(**options):
+    return AdmissionController(**dict({"cpu_slots": 4, "memory_bytes": 1000, "max_wait": 3600}, **options))
+
+def test_jobs_start_while_cores_and_memory_fit(jobs):
+    admission = controller()
+    big = admission.submit("a", cost(cores=3, memory_bytes=500), jobs, "big")
+    too_many_cores = admission.submit("b", cost(cores=2), jobs, "too_many_cores")
+    too_much_memory = admission.submit("c", cost(cores=1, memory_bytes=600), jobs, "too_much_memory")
+    fits = admission.submit("d", cost(cores=1, memory_bytes=400), jobs, "fits")
+    assert big.started is not None and fits.started is not None
+    assert too_many_cores.started is None and too_much_memory.started is None
+    status = admission.status()
+    assert (status["running"], status["queued"], status["cores"], status["memory_bytes"]) == (2, 2, 4, 900)
+
+def test_cached_jobs_need_no_cores(jobs):
+    admission = controller()
+    admission.submit("a", cost(cores=4), jobs, "big")
+    cached = admission.submit("b", cost(seconds=0, cores=0, memory_bytes=0), jobs, "cached")
+    assert cached.started is not None
+
+def test_oversized_job_runs_on_an_idle_machine(jobs):
+    admission = controller()
+    huge = admission.submit("a", cost(cores=16, memory_bytes=10**6), jobs, "huge")
+    assert huge.started is not None
+
+def test_completion_releases_capacity_and_dispatches(jobs):
+    admission = controller()
+    first = admission.submit("a", cost(cores=4), jobs, "first")
+    second = admission.submit("b", cost(cores=4), jobs, "second")
+    assert second.started is None
+    jobs.release("first")
+    assert first.future.result(5) == "first"
+    jobs.release("second")
+    assert second.future.result(5) == "second"
+    assert second.started is not None
+    assert admission.status()["running"] == 0 and admission.status()["queued"] == 0
+
+def test_short_jobs_first_then_fifo_within_a_session(jobs):
+    admission = controller()
+    blocker = admission.submit("a", cost(cores=4), jobs, "blocker")
+    tickets = [admission.submit("b", cost(seconds=seconds, cores=4), jobs, name)
+               for name, seconds in (("long", 10), ("short_1", 5), ("short_2", 5))]
+    jobs.release("blocker", "long", "short_1", "short_2")
+    for ticket in [blocker, *tickets]:
+        ticket.future.result(5)
+    assert jobs.started == ["blocker", "short_1", "short_2", "long"]
+
+def test_sessions_with_less_recent_work_go_first(jobs):
+    admission = controller()
+    blocker = admission.submit("busy", cost(cores=4), jobs, "blocker")
+    busy = admission.submit("busy", cost(seconds=1, cores=4), jobs, "busy_again")
+    fresh = admission.submit("fresh", cost(seconds=50, cores=4), jobs, "fresh")
+    assert admission.eta(fresh) < admission.eta(busy)
+    jobs.release("blocker", "busy_again", "fresh")
+    for ticket in (blocker, busy, fresh):
+        ticket.future.result(5)
+    assert jobs.started == ["blocker", "fresh", "busy_again"]
+
+def test_rejects_past_the_per_session_queue_limit(jobs):
+    admission = controller(max_queued_per_session=2)
+    admission.submit("a", cost(seconds=30, cores=4), jobs, "running")
+    admission.submit("a", cost(seconds=30, cores=4), jobs, "queued_1")
+    admission.submit("a", cost(seconds=30, cores=4), jobs, "queued_2")
+    with pytest.raises(AdmissionRejected, match="too many jobs queued") as rejected:
+        admission.submit("a", cost(seconds=30, cores=4), jobs, "queued_3")
+    assert rejected.value.eta > 0
+    # Other sessions are still admitted
+    admission.submit("b", cost(seconds=30, cores=4), jobs, "other")
+
+def test_rejects_with_eta_when_saturated(jobs):
+    admission = controller(max_wait=10)
+    admission.submit("a", cost(seconds=60, cores=4), jobs, "running")
+    with pytest.raises(AdmissionRejected, match="saturated") as rejected:
+        admission.submit("b", cost(seconds=60, cores=4), jobs, "waiting")
+    # About 60s of work ahead on every core, less the 10s the job may wait
+    assert 45 < rejected.value.eta <= 50
+    assert admission.status()["queued"] == 0
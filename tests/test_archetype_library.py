@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+try:
+    import bpy
+except ImportError:
+    import bpy_standin
+    bpy_standin.install(None)
+    import bpy
+
+import archetype_library
+from asset_cache import local_imports
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    # A generator next to a helper module it imports, as in the repository
+    monkeypatch.setattr(archetype_library, "LIBRARY_DIR", str(tmp_path / "library"))
+    (tmp_path / "helper.py").write_text("AMPLITUDE = 0.25\n")
+    (tmp_path / "nested.py").write_text("import helper\n")
+    path = tmp_path / "rock-generator.py"
+    path.write_text("import os\nimport nested\n")
+    return str(path)
+
+def library(generator):
+    return archetype_library.library_path(generator, "rock", {"size": 1}, 0, 4)
+
+def test_library_path_is_stable(generator):
+    assert library(generator) == library(generator)
+    assert library(generator) != archetype_library.library_path(generator, "rock", {"size": 1}, 1, 4)
+
+@pytest.mark.parametrize("changed", ["rock-generator.py", "nested.py", "helper.py"])
+def test_changing_the_generator_or_an_imported_module_invalidates(generator, changed):
+    before = library(generator)
+    path = os.path.join(os.path.dirname(generator), changed)
+    with open(path, "a") as f:
+        f.write("# changed\n")
+    assert library(generator) != before
+
+def test_unrelated_modules_do_not_invalidate(generator):
+    before = library(generator)
+    with open(os.path.join(os.path.dirname(generator), "unrelated.py"), "w") as f:
+        f.write("VALUE = 1\n")
+    assert library(generator) == before
+
+def test_prune_removes_only_stale_versions(generator):
+    os.makedirs(archetype_library.LIBRARY_DIR)
+    stale = library(generator)
+    open(stale, "w").close()
+    with open(os.path.join(os.path.dirname(generator), "helper.py"), "a") as f:
+        f.write("AMPLITUDE = 0.5\n")
+    current = library(generator)
+    open(current, "w").close()
+    assert archetype_library.prune_stale_versions(generator, "rock") == 1
+    assert os.path.exists(current) and not os.path.exists(stale)
+
+def test_repository_generators_cover_their_helpers():
+    app_dir = os.path.dirname(os.path.abspath(archetype_library.__file__))
+    imports = [os.path.basename(path) for path in local_imports(os.path.join(app_dir, "grass-rock-scene-generator.py"))]
+    assert {"rock_displacement.py", "scatter_nodes.py", "archetype_library.py", "seeding.py"} <= set(imports)
+
+def test_cached_library_keeps_build_order(generator):
+    def build(index, rng):
+        return [bpy.data.objects.new(f"rock_{index}", bpy.data.meshes.new(f"rock_{index}"))]
+
+    built, hit = archetype_library.get_archetypes(generator, "rock", {"size": 1}, 0, 12, build)
+    assert not hit
+    loaded, hit = archetype_library.get_archetypes(generator, "rock", {"size": 1}, 0, 12, build)
+    assert hit
+    assert [collection.name for collection in loaded] == [collection.name for collection in built]
+    assert [archetype_library.archetype_index(collection) for collection in loaded] == list(range(12))
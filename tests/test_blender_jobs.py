@@ -0,0 +1,19 @@
+import subprocess
+
+import pytest
+
+from blender_jobs import BlenderUnavailable, failure_class, run_blender
+from pipeline_metrics import JobLog
+
+def test_missing_blender_is_not_a_missing_output(tmp_path):
+    with pytest.raises(BlenderUnavailable) as error:
+        run_blender([str(tmp_path / "no-such-blender"), "--background"], {}, JobLog("test"))
+    assert failure_class(error.value) == "blender_unavailable"
+    with pytest.raises(FileNotFoundError) as error:
+        open(tmp_path / "export.fbx", "rb")
+    assert failure_class(error.value) == "missing_output"
+
+def test_blender_exit_classes():
+    assert failure_class(subprocess.CalledProcessError(-9, ["blender"])) == "blender_killed"
+    assert failure_class(subprocess.CalledProcessError(1, ["blender"], output="Traceback (most recent call last):")) == "script_error"
+    assert failure_class(subprocess.CalledProcessError(1, ["blender"], output="")) == "blender_error"
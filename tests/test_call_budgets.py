@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+import bpy_trace
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+with open(os.path.join(APP_DIR, "call_budgets.json")) as f:
+    BUDGETS = json.load(f)
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    # Generators export to ~/Desktop
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / "Desktop").mkdir()
+    return tmp_path
+
+@pytest.mark.parametrize("key", sorted(BUDGETS))
+def test_generator_stays_within_budget(key, home):
+    script, *args = key.split()
+    tracer = bpy_trace.run_script(os.path.join(APP_DIR, script), args, standin=True)
+    assert tracer.check(BUDGETS[key]) == []
+
+def test_counts_repeat_between_runs(home):
+    script = os.path.join(APP_DIR, "low-poly-tree-generator.py")
+    first = bpy_trace.run_script(script, standin=True).report()
+    assert bpy_trace.run_script(script, standin=True).report() == first
+
+def test_check_reports_totals_and_phases():
+    tracer = bpy_trace.Tracer("generator.py")
+    with tracer.phase("scatter"):
+        for _ in range(3):
+            tracer.record("operator_calls", "mesh.primitive_cube_add")
+    assert tracer.check({"totals": {"operator_calls": 3}, "phases": {"scatter": {"operator_calls": 3}}}) == []
+    assert tracer.check({"totals": {"operator_calls": 2}, "phases": {"scatter": {"operator_calls": 1}}}) == [
+        "operator_calls: 3 > 2", "scatter operator_calls: 3 > 1"]
+
+def test_budget_leaves_headroom():
+    tracer = bpy_trace.Tracer("generator.py")
+    tracer.record("operator_calls", "object.delete")
+    budget = tracer.budget()
+    assert budget["totals"]["operator_calls"] > 1
+    assert budget["totals"]["frame_set"] > 0
+    assert tracer.check(budget) == []
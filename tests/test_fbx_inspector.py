@@ -0,0 +1,130 @@
+import struct
+import zlib
+
+import pytest
+
+import fbx_inspector
+from fbx_inspector import FBXError, MAGIC
+
+# Minimal binary FBX writer: nodes are (name, properties, children) tuples;
+# properties are ints ("I"), floats ("D"), strings ("S") or ("array", code,
+# values) tuples written zlib-compressed
+def encode_property(value):
+    if isinstance(value, tuple):
+        _, code, values = value
+        raw = struct.pack(f"<{len(values)}{code}", *values)
+        data = zlib.compress(raw)
+        return code.encode() + struct.pack("<III", len(values), 1, len(data)) + data
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return b"S" + struct.pack("<I", len(data)) + data
+    if isinstance(value, float):
+        return b"D" + struct.pack("<d", value)
+    return b"L" + struct.pack("<q", value)
+
+def null_record(version):
+    return b"\x00" * (25 if version >= 7500 else 13)
+
+def encode_node(node, offset, version):
+    name, properties, children = node
+    properties = b"".join(encode_property(value) for value in properties)
+    header_size = (25 if version >= 7500 else 13) + len(name)
+    body = properties
+    child_offset = offset + header_size + len(properties)
+    for child in children:
+        encoded = encode_node(child, child_offset, version)
+        body += encoded
+        child_offset += len(encoded)
+    if children:
+        body += null_record(version)
+    end = offset + header_size + len(body)
+    fields = struct.pack("<QQQ" if version >= 7500 else "<III", end, len(node[1]), len(properties))
+    return fields + bytes([len(name)]) + name.encode("ascii") + body
+
+def encode_file(nodes, version):
+    data = MAGIC + b"\x1a\x00" + struct.pack("<I", version)
+    for node in nodes:
+        data += encode_node(node, len(data), version)
+    return data + null_record(version) + b"\xfa\xbc" * 8
+
+def scene(animated=True, vertices=4):
+    objects = [
+        ("Model", [1, "Ship\x00\x01Model", "Mesh"], []),
+        ("Model", [2, "Root\x00\x01Model", "Null"], []),
+        ("Geometry", [3, "Hull\x00\x01Geometry", "Mesh"], [
+            ("Vertices", [("array", "d", [0.0] * (vertices * 3))], []),
+            ("PolygonVertexIndex", [("array", "i", [0, 1, 2, -4])], []),
+        ]),
+        ("Material", [4, "Paint\x00\x01Material", ""], []),
+    ]
+    if animated:
+        objects += [
+            ("AnimationStack", [5, "Take\x00\x01AnimStack", ""], []),
+            ("AnimationCurve", [6, "\x00\x01AnimCurve", ""], [
+                ("KeyTime", [("array", "l", [0, 10, 20])], []),
+                ("KeyValueFloat", [("array", "f", [0.0, 1.0, 0.0])], []),
+            ]),
+        ]
+    return [
+        ("FBXHeaderExtension", [], [("FBXVersion", [7400], [])]),
+        ("Objects", [], objects),
+        ("Connections", [], [("C", ["OO", 1, 2], [])]),
+    ]
+
+@pytest.fixture(params=[7400, 7500])
+def version(request):
+    return request.param
+
+def write(tmp_path, data):
+    path = tmp_path / "scene.fbx"
+    path.write_bytes(data)
+    return str(path)
+
+def test_counts_objects_geometry_and_animation(tmp_path, version):
+    report = fbx_inspector.inspect(write(tmp_path, encode_file(scene(), version)))
+    assert report["version"] == version
+    assert report["models"] == {"Mesh": 1, "Null": 1}
+    assert report["objects"] == 2
+    assert report["meshes"] == 1
+    assert report["vertices"] == 4
+    assert report["polygon_vertices"] == 4
+    assert report["materials"] == 1
+    assert report["animation_stacks"] == 1
+    assert report["animation_curves"] == 1
+    assert report["keyframes"] == 3
+    assert report["object_bytes"].keys() == {"Model", "Geometry", "Material", "AnimationStack", "AnimationCurve"}
+    assert {entry["name"] for entry in report["largest_objects"]} >= {"Hull", "Ship"}
+
+def test_sections_add_up_to_the_file(tmp_path, version):
+    data = encode_file(scene(), version)
+    report = fbx_inspector.inspect(write(tmp_path, data))
+    assert set(report["sections"]) == {"FBXHeaderExtension", "Objects", "Connections", "Footer"}
+    assert sum(report["sections"].values()) == len(data) - fbx_inspector.HEADER_SIZE
+    assert report["sections"]["Objects"] > report["sections"]["Connections"]
+
+def test_validate(tmp_path, version):
+    report = fbx_inspector.inspect(write(tmp_path, encode_file(scene(), version)))
+    assert fbx_inspector.validate(report, expect_animation=True) == []
+
+    still = fbx_inspector.inspect(write(tmp_path, encode_file(scene(animated=False), version)))
+    assert fbx_inspector.validate(still) == []
+    assert fbx_inspector.validate(still, expect_animation=True) == ["no animation keyframes were exported"]
+
+    empty = fbx_inspector.inspect(write(tmp_path, encode_file(scene(vertices=0), version)))
+    assert "meshes were exported without vertices" in fbx_inspector.validate(empty)
+
+    nothing = fbx_inspector.inspect(write(tmp_path, encode_file([("Objects", [], [])], version)))
+    assert fbx_inspector.validate(nothing) == ["the file contains no objects"]
+
+def test_bad_magic(tmp_path):
+    data = encode_file(scene(), 7400)
+    with pytest.raises(FBXError, match="Not a binary FBX"):
+        fbx_inspector.inspect(write(tmp_path, b"; FBX 7.4.0 project file" + data[25:]))
+    with pytest.raises(FBXError):
+        fbx_inspector.inspect(write(tmp_path, data[:10]))
+
+@pytest.mark.parametrize("keep", [0.3, 0.6, 0.9])
+def test_truncated_file(tmp_path, version, keep):
+    data = encode_file(scene(), version)
+    with pytest.raises(FBXError, match="Truncated"):
+        fbx_inspector.inspect(write(tmp_path, data[:int(len(data) * keep)]))
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import AsyncLLMClient, LLMAuthenticationError, LLMClient, LLMError
+
+MESSAGES = [{"role": "user", "content": "spaceship"}]
+
+class StubServer:
+    # Local stand-in for /chat/completions. Each request takes the next entry
+    # of responses: an int is an error status, a list is streamed as tokens.
+    def __init__(self, responses, gate=None):
+        self.responses = list(responses)
+        self.requests = []
+        self.gate = gate
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                stub.requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                response = stub.responses.pop(0)
+                if isinstance(response, int):
+                    self.send_response(response)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "5")
+                    self.end_headers()
+                    self.wfile.write(b"error")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for i, token in enumerate(response):
+                    if i == 1 and stub.gate is not None:
+                        stub.gate.wait(5)
+                    event = {"choices": [{"delta": {"content": token}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    servers = []
+    def start(responses, gate=None):
+        servers.append(StubServer(responses, gate))
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.close()
+
+def make_client(url, **options):
+    return LLMClient("test-key", base_url=url, backoff_base=0.01, **options)
+
+def test_streams_tokens_in_order(stub):
+    server = stub([["import ", "bpy", "\n"]])
+    client = make_client(server.url)
+    try:
+        assert list(client.stream_chat(MESSAGES)) == ["import ", "bpy", "\n"]
+        stats = client.stats()
+    finally:
+        client.close()
+    assert server.requests[0]["stream"] is True
+    assert server.requests[0]["messages"] == MESSAGES
+    assert stats["first_token_latency"].count == 1
+    assert stats["total_latency"].count == 1
+
+def test_retries_retryable_statuses(stub):
+    server = stub([503, 429, ["ok"]])
+    client = make_client(server.url)
+    try:
+        assert client.complete(MESSAGES) == "ok"
+        assert client.stats()["retries"] == 2
+    finally:
+        client.close()
+    assert len(server.requests) == 3
+
+def test_gives_up_after_max_retries(stub):
+    server = stub([503, 503, 503])
+    client = make_client(server.url, max_retries=2)
+    try:
+        with pytest.raises(LLMError, match="HTTP 503"):
+            client.complete(MESSAGES)
+    finally:
+        client.close()
+    assert len(server.requests) == 3
+
+def test_client_errors_are_not_retried(stub):
+    server = stub([401, 400])
+    client = make_client(server.url)
+    try:
+        with pytest.raises(LLMAuthenticationError):
+            client.complete(MESSAGES)
+        with pytest.raises(LLMError, match="HTTP 400"):
+            client.complete(MESSAGES)
+        assert client.stats()["retries"] == 0
+    finally:
+        client.close()
+    assert len(server.requests) == 2
+
+def test_backoff_honours_retry_after_and_caps():
+    client = AsyncLLMClient.__new__(AsyncLLMClient)
+    client.backoff_base, client.backoff_max = 0.5, 4
+    assert client._backoff(0, "2") == 2
+    assert client._backoff(0, "60") == 4
+    assert 0.25 <= client._backoff(0) <= 0.5
+    assert 2 <= client._backoff(10) <= 4
+
+def test_identical_prompts_share_one_request(stub):
+    gate = threading.Event()
+    server = stub([["a", "b", "c"]], gate)
+
+    async def run():
+        client = AsyncLLMClient("test-key", base_url=server.url)
+        try:
+            first = asyncio.ensure_future(client.complete(MESSAGES))
+            # Let the first request reach the server before the second arrives
+            while not server.requests:
+                await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(client.complete(MESSAGES))
+            await asyncio.sleep(0.05)
+            gate.set()
+            return await asyncio.gather(first, second), client.coalesced
+        finally:
+            await client.aclose()
+
+    results, coalesced = asyncio.run(run())
+    assert results == ["abc", "abc"]
+    assert coalesced == 1
+    assert len(server.requests) == 1
+
+def test_different_prompts_are_not_coalesced(stub):
+    server = stub([["one"], ["two"]])
+    client = make_client(server.url)
+    try:
+        assert client.complete(MESSAGES) == "one"
+        assert client.complete([{"role": "user", "content": "tree"}]) == "two"
+        assert client.stats()["coalesced"] == 0
+    finally:
+        client.close()
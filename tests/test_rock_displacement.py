@@ -0,0 +1,54 @@
+import numpy as np
+
+from rock_displacement import displace, fbm, lattice_values, value_noise
+
+def sample_points(count=2000, seed=0):
+    return np.random.default_rng(seed).uniform(-20, 20, size=(count, 3))
+
+def test_noise_is_deterministic_per_seed():
+    points = sample_points()
+    assert np.array_equal(value_noise(points, 7), value_noise(points, 7))
+    assert np.array_equal(fbm(points, 7), fbm(points, 7))
+    assert not np.allclose(fbm(points, 7), fbm(points, 8))
+
+def test_noise_stays_in_range():
+    points = sample_points(20000)
+    for values in (value_noise(points, 3), fbm(points, 3, octaves=6)):
+        assert values.min() >= -1 and values.max() <= 1
+        # Not degenerate: the values actually spread over the range
+        assert values.std() > 0.1
+
+def test_noise_matches_the_lattice_at_integer_points():
+    corners = np.random.default_rng(1).integers(-50, 50, size=(500, 3))
+    expected = lattice_values(corners[:, 0], corners[:, 1], corners[:, 2], np.full(len(corners), 5, dtype=np.int64))
+    assert np.allclose(value_noise(corners.astype(np.float64), 5), expected)
+
+def test_noise_is_continuous():
+    points = sample_points(1000)
+    assert np.abs(fbm(points + 1e-6, 2) - fbm(points, 2)).max() < 1e-4
+
+def test_per_vertex_seeds_match_separate_calls():
+    points = sample_points(300)
+    seeds = np.repeat([11, 12, 13], 100)
+    batched = fbm(points, seeds)
+    for seed in (11, 12, 13):
+        assert np.allclose(batched[seeds == seed], fbm(points[seeds == seed], seed))
+
+def test_displacement_moves_along_normals_within_amplitude():
+    rng = np.random.default_rng(2)
+    normals = rng.normal(size=(1000, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    co = normals * 2.0
+    displaced = displace(co, normals, seed=4, scale=2.0, amplitude=0.25)
+    offsets = displaced - co
+    assert np.allclose(np.cross(offsets, normals), 0)
+    assert np.linalg.norm(offsets, axis=1).max() <= 0.25 * 2.0 + 1e-9
+    assert np.array_equal(displace(co, normals, seed=4, scale=2.0), displace(co, normals, seed=4, scale=2.0))
+    assert np.allclose(displace(co, normals, seed=4, amplitude=0), co)
+
+def test_displacement_scales_with_rock_size():
+    normals = np.tile([0.0, 0.0, 1.0], (200, 1))
+    co = sample_points(200) / 20
+    small = displace(co, normals, seed=9, scale=1.0) - co
+    large = displace(co * 3, normals, seed=9, scale=3.0) - co * 3
+    assert np.allclose(large, small * 3)
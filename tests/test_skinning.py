@@ -0,0 +1,60 @@
+import numpy as np
+
+try:
+    import bpy  # noqa: F401
+except ImportError:
+    import bpy_standin
+    bpy_standin.install(None)
+
+from skinning import compute_weights, segment_distances
+
+# A simple leg: hip -> knee -> ankle -> toe, plus a spine going up
+HEADS = np.array([[0, 0, 1.0], [0, 0, 0.5], [0, 0, 0.0], [0, 0, 1.0], [0, 0, 1.5]])
+TAILS = np.array([[0, 0, 0.5], [0, 0, 0.0], [0, 0.2, 0.0], [0, 0, 1.5], [0, 0, 2.0]])
+
+def random_points(count=500, seed=0):
+    return np.random.default_rng(seed).uniform([-0.5, -0.5, -0.2], [0.5, 0.5, 2.2], size=(count, 3))
+
+def test_segment_distances():
+    points = np.array([[1.0, 0, 0.75], [0, 0, 3.0], [0, 0.1, 0.0]])
+    distances = segment_distances(points, HEADS, TAILS)
+    assert distances.shape == (3, 5)
+    assert np.isclose(distances[0, 0], 1.0)  # beside the thigh
+    assert np.isclose(distances[1, 4], 1.0)  # past the end of the upper spine
+    assert np.isclose(distances[2, 2], 0.0)  # on the foot
+
+def test_weights_sum_to_one():
+    _, weights = compute_weights(random_points(), HEADS, TAILS)
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert (weights >= 0).all()
+
+def test_influences_are_capped():
+    for influences in (1, 2, 4):
+        nearest, weights = compute_weights(random_points(), HEADS, TAILS, influences=influences)
+        assert nearest.shape == weights.shape == (500, influences)
+        # Each vertex names distinct bones
+        assert all(len(set(row)) == influences for row in nearest.tolist())
+    # Never more influences than bones
+    nearest, _ = compute_weights(random_points(), HEADS[:2], TAILS[:2], influences=4)
+    assert nearest.shape == (500, 2)
+
+def test_kept_influences_are_the_nearest_bones():
+    points = random_points()
+    nearest, _ = compute_weights(points, HEADS, TAILS, influences=2)
+    distances = segment_distances(points, HEADS, TAILS)
+    kept = np.sort(np.take_along_axis(distances, nearest, axis=1), axis=1)
+    assert np.allclose(kept, np.sort(distances, axis=1)[:, :2])
+
+def test_vertex_on_a_bone_follows_that_bone():
+    # Midpoints of every bone segment
+    points = (HEADS + TAILS) / 2
+    nearest, weights = compute_weights(points, HEADS, TAILS)
+    for bone, (bones, row) in enumerate(zip(nearest, weights)):
+        assert bones[np.argmax(row)] == bone
+        assert row.max() > 0.999
+
+def test_closer_bones_weigh_more():
+    point = np.array([[0.1, 0, 0.75]])  # beside the thigh, further from the shin
+    nearest, weights = compute_weights(point, HEADS, TAILS)
+    by_bone = dict(zip(nearest[0].tolist(), weights[0].tolist()))
+    assert by_bone[0] > by_bone[1]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+try:
+    import bpy  # noqa: F401
+except ImportError:
+    import bpy_standin
+    bpy_standin.install(None)
+
+from terrain import Heightfield, create_terrain_object, surface_rotations
+
+@pytest.fixture
+def heightfield():
+    return Heightfield.generate(size=10, resolution=33, seed=5)
+
+def test_generate_is_deterministic_per_seed():
+    first = Heightfield.generate(size=10, resolution=33, seed=5)
+    assert np.array_equal(first.heights, Heightfield.generate(size=10, resolution=33, seed=5).heights)
+    assert not np.allclose(first.heights, Heightfield.generate(size=10, resolution=33, seed=6).heights)
+
+def test_heights_stay_within_amplitude():
+    field = Heightfield.generate(size=20, resolution=65, seed=1, amplitude=0.6)
+    assert np.abs(field.heights).max() <= 0.6
+    assert field.heights.std() > 0.01
+
+def test_height_lookup_matches_mesh_vertices(heightfield):
+    vertices = heightfield.vertex_positions()
+    assert np.allclose(heightfield.height_at(vertices[:, 0], vertices[:, 1]), vertices[:, 2])
+
+def test_height_lookup_interpolates_inside_cells(heightfield):
+    h, cell = heightfield.heights, heightfield.cell
+    row, column = 4, 7
+    x = -heightfield.size / 2 + (column + 0.5) * cell
+    y = -heightfield.size / 2 + (row + 0.5) * cell
+    corners = h[row:row + 2, column:column + 2]
+    assert heightfield.height_at(x, y) == pytest.approx(corners.mean())
+    # Bilinear values never leave the range of the cell's corners
+    xs = np.random.default_rng(0).uniform(x - cell / 2, x + cell / 2, 200)
+    ys = np.random.default_rng(1).uniform(y - cell / 2, y + cell / 2, 200)
+    heights = heightfield.height_at(xs, ys)
+    assert heights.min() >= corners.min() - 1e-12 and heights.max() <= corners.max() + 1e-12
+
+def test_lookup_clamps_outside_the_field(heightfield):
+    edge = heightfield.size / 2
+    assert heightfield.height_at(edge + 5, 0) == pytest.approx(heightfield.height_at(edge, 0))
+    assert heightfield.height_at(0, -edge - 5) == pytest.approx(heightfield.height_at(0, -edge))
+
+def test_planar_field_is_exact():
+    size, resolution = 8, 9
+    axis = np.linspace(-size / 2, size / 2, resolution)
+    grid_x, grid_y = np.meshgrid(axis, axis)
+    field = Heightfield(size, 0.3 * grid_x - 0.2 * grid_y + 1)
+    xs, ys = np.random.default_rng(3).uniform(-size / 2, size / 2, (2, 100))
+    assert np.allclose(field.height_at(xs, ys), 0.3 * xs - 0.2 * ys + 1)
+    expected = np.array([-0.3, 0.2, 1.0]) / np.linalg.norm([-0.3, 0.2, 1.0])
+    assert np.allclose(field.normal_at(xs, ys), expected)
+
+def test_normals_match_the_mesh_faces(heightfield):
+    # At a cell centre the lookup normal is the quad's normal from its diagonals
+    resolution, cell = heightfield.resolution, heightfield.cell
+    vertices = heightfield.vertex_positions().reshape(resolution, resolution, 3)
+    p00, p10 = vertices[:-1, :-1], vertices[:-1, 1:]
+    p01, p11 = vertices[1:, :-1], vertices[1:, 1:]
+    face_normals = np.cross(p11 - p00, p01 - p10).reshape(-1, 3)
+    face_normals /= np.linalg.norm(face_normals, axis=1, keepdims=True)
+    centres = ((p00 + p11) / 2).reshape(-1, 3)
+    normals = heightfield.normal_at(centres[:, 0], centres[:, 1])
+    assert np.allclose(normals, face_normals)
+    assert np.allclose(np.linalg.norm(normals, axis=1), 1)
+    assert (normals[:, 2] > 0).all()
+
+def test_terrain_object_carries_the_heightfield(heightfield):
+    mesh = create_terrain_object(heightfield).data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    assert np.allclose(co.reshape(-1, 3), heightfield.vertex_positions(), atol=1e-6)
+    assert len(mesh.polygons) == (heightfield.resolution - 1) ** 2
+
+def test_surface_rotations_tilt_up_onto_the_normal():
+    normals = np.array([[0.0, 0.0, 1.0], [0.3, -0.2, 1.0], [-0.5, 0.4, 0.8]])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    headings = np.array([0.0, 1.2, -2.0])
+    for (a, b, c), normal in zip(surface_rotations(normals, headings), normals):
+        rx = np.array([[1, 0, 0], [0, np.cos(a), -np.sin(a)], [0, np.sin(a), np.cos(a)]])
+        ry = np.array([[np.cos(b), 0, np.sin(b)], [0, 1, 0], [-np.sin(b), 0, np.cos(b)]])
+        rz = np.array([[np.cos(c), -np.sin(c), 0], [np.sin(c), np.cos(c), 0], [0, 0, 1]])
+        assert np.allclose(rz @ ry @ rx @ [0, 0, 1], normal)
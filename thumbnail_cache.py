@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import time
+
+from asset_cache import code_version
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_PASS = os.path.join(APP_DIR, "profile_pass.py")
+
+# Rendered thumbnails are stored as PNGs keyed by a hash of what was rendered
+# (generated script text, or the code version of a generator and the local
+# modules it imports plus parameters) and of the render settings, so the same
+# scene is never rendered twice. Every render is appended to renders.jsonl with
+# its time against RENDER_BUDGET.
+CACHE_DIR = os.environ.get(
+    "THUMBNAIL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "blender_thing", "thumbnails")
+)
+RENDER_BUDGET = float(os.environ.get("THUMBNAIL_BUDGET_SECONDS", "5"))
+SETTINGS = {"width": 320, "samples": 16}
+
+def renderer_version():
+    return code_version(PROFILE_PASS)
+
+def spec_key(source, **spec):
+    payload = json.dumps({"source": source, "spec": spec, "settings": SETTINGS, "renderer": renderer_version()},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def generator_key(generator_path, params):
+    return spec_key(code_version(generator_path), generator=os.path.basename(generator_path), params=params)
+
+def thumbnail_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.png")
+
+def render_settings(path):
+    # Keyword arguments for profile_pass.render_thumbnail; the time limit keeps
+    # a slow scene from overrunning the budget by more than its setup time
+    return {"path": path, "width": SETTINGS["width"], "samples": SETTINGS["samples"], "time_limit": RENDER_BUDGET}
+
+def render_env(path, report_path):
+    # The same settings for profile_pass.py as a --python post-pass
+    settings = render_settings(path)
+    return {
+        "BLENDER_THING_THUMBNAIL": path,
+        "BLENDER_THING_THUMBNAIL_WIDTH": str(settings["width"]),
+        "BLENDER_THING_THUMBNAIL_SAMPLES": str(settings["samples"]),
+        "BLENDER_THING_THUMBNAIL_TIME_LIMIT": str(settings["time_limit"]),
+        "BLENDER_THING_THUMBNAIL_REPORT": report_path,
+    }
+
+def lookup(key):
+    path = thumbnail_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+def store(key, data, seconds):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    partial = thumbnail_path(key) + ".partial"
+    with open(partial, "wb") as f:
+        f.write(data)
+    os.replace(partial, thumbnail_path(key))
+    record_render(key, seconds)
+
+def record_render(key, seconds):
+    entry = {"key": key, "seconds": round(seconds, 3), "budget": RENDER_BUDGET,
+             "over_budget": seconds > RENDER_BUDGET, "time": time.time()}
+    with open(os.path.join(CACHE_DIR, "renders.jsonl"), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry